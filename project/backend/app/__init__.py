@@ -5,10 +5,13 @@
 #   开发模式启用CORS
 #   注册路由蓝图
 
+import os
 from flask import Flask
 from .config import config_dict
 from .extensions import cors, db, executor
-from .routes import user_bp, static_bp, auth_bp, frames_bp, video_bp, upload_bp, history_bp, rag_bp
+from .utils.scheduler import pipeline_scheduler
+from .routes import user_bp, static_bp, auth_bp, frames_bp, video_bp, upload_bp, history_bp, rag_bp, metrics_bp, status_bp, \
+    kinematics_bp
 
 
 def create_app(config_name='development'):
@@ -18,6 +21,7 @@ def create_app(config_name='development'):
     # 加载配置
     app.config.from_object(config_dict[config_name])
     executor.init_app(app)
+    pipeline_scheduler.init_app(app)
 
     db.init_app(app)
     from .utils.models import User
@@ -42,6 +46,24 @@ def create_app(config_name='development'):
     app.register_blueprint(upload_bp, url_prefix='/api')
     app.register_blueprint(history_bp, url_prefix='/api')
     app.register_blueprint(rag_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+    app.register_blueprint(status_bp, url_prefix='/api')
+    app.register_blueprint(kinematics_bp, url_prefix='/api')
     app.register_blueprint(static_bp)
 
+    # 调试模式下 reloader 的监控进程不处理任务，只在实际服务进程中启动后台任务
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return app
+
+    # 预热常驻推理模型
+    if app.config.get('PIPELINE_WARMUP'):
+        from .utils.worker import pipeline_worker
+        pipeline_worker.warm_up_async()
+
+    # 恢复进程退出前未完成的视频处理任务
+    if app.config.get('PIPELINE_RESUME'):
+        from .utils.task import resume_pipeline_jobs
+        with app.app_context():
+            resume_pipeline_jobs()
+
     return app
\ No newline at end of file
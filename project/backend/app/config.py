@@ -19,6 +19,59 @@ class BaseConfig:
     POSE_FOLDER = str(BASE_DIR / 'app/utils/video/output_pose')  # 骨骼路径
     UPLOAD_FOLDER = str(BASE_DIR / 'app/utils/video/input')  # 上传视频路径
     RESULT_FOLDER = str(BASE_DIR / 'app/utils/video/result')  # 最终处理视频路径
+    BALL_TRACK_FOLDER = str(BASE_DIR / 'app/utils/video/other')  # 球轨迹CSV路径
+
+    # 模型配置（由常驻工作进程加载一次后复用）
+    BALL_MODEL_PATH = str(BASE_DIR / 'app/utils/balldetect_pos_vel/ball_detect.pt')
+    DET_CONFIG = str(BASE_DIR / 'app/utils/mmpose/utils/coco_person.py')
+    DET_CHECKPOINT = str(BASE_DIR / 'app/utils/mmpose/utils/model1.pth')
+    POSE_CONFIG = str(BASE_DIR / 'app/utils/mmpose/utils/config.py')
+    POSE_CHECKPOINT = str(BASE_DIR / 'app/utils/mmpose/utils/model2.pth')
+    ACTION_CONFIG = str(BASE_DIR / 'app/utils/mmaction/utils/configs.py')
+    ACTION_CHECKPOINT = str(BASE_DIR / 'app/utils/mmaction/utils/model.pth')
+    ACTION_LABEL_MAP = str(BASE_DIR / 'app/utils/mmaction/utils/label_map.txt')
+    PIPELINE_DEVICE = os.getenv('PIPELINE_DEVICE', 'cuda:0')  # 推理设备
+    BALL_BATCH_SIZE = int(os.getenv('BALL_BATCH_SIZE', '8'))  # 球检测每次前向的三帧组数量
+    POSE_BATCH_SIZE = int(os.getenv('POSE_BATCH_SIZE', '8'))  # 人体检测每次前向的帧数（1 为逐帧推理）
+    POSE_CROP_BATCH_SIZE = int(os.getenv('POSE_CROP_BATCH_SIZE', '64'))  # 姿态估计每次前向的人体框数量上限
+    POSE_DET_INTERVAL = int(os.getenv('POSE_DET_INTERVAL', '1'))  # 人体检测间隔帧数，>1 时中间帧由关键点推框并输出 track_id
+    POSE_REDETECT_THR = float(os.getenv('POSE_REDETECT_THR', '0.5'))  # 跳帧模式下平均关键点置信度低于此值时下一帧重新检测
+    POSE_MAX_PERSONS = int(os.getenv('POSE_MAX_PERSONS', '2'))  # 每帧只对排序最靠前的 K 人做姿态估计（0 为不限）
+    KINEMATICS_PLAYERS = int(os.getenv('KINEMATICS_PLAYERS', '2'))  # 运动学索引统计的运动员数
+    # 骨骼绘制：pool 为线程池并行绘制（与推理解耦），visualizer 为 mmpose 可视化器逐帧绘制。
+    # 命令行的 --render none 只输出关键点；流水线依赖骨骼视频，设为 none 时按 pool 处理
+    POSE_RENDER = os.getenv('POSE_RENDER', 'pool')
+    POSE_RENDER_WORKERS = int(os.getenv('POSE_RENDER_WORKERS', str(min(os.cpu_count() or 1, 4))))
+    BALL_POSTPROCESS = os.getenv('BALL_POSTPROCESS', 'centroid')  # 热图后处理：centroid（批量向量化）/ hough
+    PIPELINE_WARMUP = os.getenv('PIPELINE_WARMUP', '1') == '1'  # 启动时预加载模型
+    PIPELINE_SHARED_DECODE = os.getenv('PIPELINE_SHARED_DECODE', '0') == '1'  # 共享帧流模式（视频只解码一次）
+    PIPELINE_RESUME = os.getenv('PIPELINE_RESUME', '1') == '1'  # 启动时恢复未完成的处理任务
+    PIPELINE_MAX_ATTEMPTS = int(os.getenv('PIPELINE_MAX_ATTEMPTS', '3'))  # 单个任务最多执行次数
+    PIPELINE_JOB_LEASE = int(os.getenv('PIPELINE_JOB_LEASE', '0'))  # 执行中任务超过该秒数未更新才视为中断（多进程部署时设置）
+    PIPELINE_STAGE_WORKERS = int(os.getenv('PIPELINE_STAGE_WORKERS', '3'))  # 单个视频内并发执行的阶段数
+    PIPELINE_SLOTS = max(int(os.getenv('PIPELINE_SLOTS', '2')), 1)  # 同时处理的视频数（处理槽位）
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '16'))  # 等待队列上限，超出时上传返回429
+    APP_RELEASE = os.getenv('APP_RELEASE', 'dev')  # 版本号，随阶段指标一起记录，用于跨版本对比性能
+    PIPELINE_ETA_DEFAULT = float(os.getenv('PIPELINE_ETA_DEFAULT', '300'))  # 尚无历史耗时时的单视频预计处理秒数
+
+    FRAME_EXTRACTION = os.getenv('FRAME_EXTRACTION', 'lazy')  # lazy：帧接口按需从视频解码 / eager：流水线预先导出全部帧
+    FRAME_CACHE_DIR = str(BASE_DIR / 'app/utils/frames/.cache')  # 按需抽帧的磁盘缓存目录
+    FRAME_CACHE_MEMORY_MB = int(os.getenv('FRAME_CACHE_MEMORY_MB', '256'))  # 内存缓存上限
+    FRAME_CACHE_DISK_MB = int(os.getenv('FRAME_CACHE_DISK_MB', '2048'))  # 磁盘缓存上限
+    FRAME_SEEK_THRESHOLD = int(os.getenv('FRAME_SEEK_THRESHOLD', '30'))  # 目标帧在当前位置之后多少帧以内时顺序读取而不重新定位
+    FRAME_ARCHIVE = os.getenv('FRAME_ARCHIVE', '1') == '1'  # eager 模式下帧写入单个归档文件（.frames）而非逐帧JPEG
+    FRAME_ENCODE_WORKERS = int(os.getenv('FRAME_ENCODE_WORKERS', str(min(os.cpu_count() or 1, 8))))  # 帧导出并行编码线程数
+    FRAME_JPEG_QUALITY = int(os.getenv('FRAME_JPEG_QUALITY', '95'))  # 帧导出JPEG质量
+    FRAME_SCALE = float(os.getenv('FRAME_SCALE')) if os.getenv('FRAME_SCALE') else None  # 帧导出缩放比例（默认原尺寸）
+    FRAMES_PAGE_MAX = int(os.getenv('FRAMES_PAGE_MAX', '500'))  # 帧接口单页最多返回帧数
+    FRAME_URL_TTL = int(os.getenv('FRAME_URL_TTL', '3600'))  # 帧访问链接有效期（秒）
+    STATUS_HEARTBEAT = int(os.getenv('STATUS_HEARTBEAT', '15'))  # 状态推送（SSE）无变化时的心跳间隔（秒）
+
+    # 视频分发
+    VIDEO_CACHE_MAX_AGE = int(os.getenv('VIDEO_CACHE_MAX_AGE', '3600'))  # 视频文件浏览器缓存时间（秒），过期后按 ETag 协商
+    VIDEO_SENDFILE = os.getenv('VIDEO_SENDFILE', '')  # 空：由 Flask 发送 / x-sendfile：Apache、lighttpd / x-accel：nginx
+    VIDEO_ACCEL_PREFIX = os.getenv('VIDEO_ACCEL_PREFIX', '/protected-video/')  # nginx internal location，对应 UTILS_FOLDER
+    VIDEO_FASTSTART = os.getenv('VIDEO_FASTSTART', '1') == '1'  # 生成的视频把 moov 移到文件开头，边下载边播放
 
     ALLOWED_EXTENSIONS = {'mp4', 'mov', 'avi'}  # 允许的视频格式
     MAX_CONTENT_LENGTH = 1024 * 1024 * 1024  # 1GB限制
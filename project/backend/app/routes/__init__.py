@@ -10,6 +10,9 @@ from .history import history_bp
 from .video import video_bp
 from .frames import frames_bp
 from .rag import rag_bp
+from .metrics import metrics_bp
+from .status import status_bp
+from .kinematics import kinematics_bp
 
 __all__ = ['static_bp',
            'auth_bp',
@@ -18,5 +21,8 @@ __all__ = ['static_bp',
            'history_bp',
            'frames_bp',
            'video_bp',
-           'rag_bp'
+           'rag_bp',
+           'metrics_bp',
+           'status_bp',
+           'kinematics_bp'
            ]
\ No newline at end of file
@@ -1,68 +1,139 @@
 import base64
+import gzip
 import os
-from flask import Blueprint, jsonify, g, json, Response
+from flask import Blueprint, jsonify, g, json, Response, request, url_for, stream_with_context
 from json.decoder import JSONDecodeError
-from ..utils.models import User, UserVideo
-from ..utils.security import jwt_required
+from ..utils.models import User, UserVideo, UserVideoProcess
+from ..utils.security import jwt_required, generate_frame_token, verify_frame_token
+from ..utils.frame_archive import open_frames
+from ..utils.frame_cache import LazyVideoFrames, frame_cache
+from ..utils.mmpose.pose_store import find_pose_data
+from ..utils.pose_payload import pose_payload, payload_etag
 from ..config import BaseConfig
 
 frames_bp = Blueprint('frames', __name__)
 
-def convert_ndarray(obj):
-    if isinstance(obj, dict):
-        if '__ndarray__' in obj:
-            return obj['__ndarray__']
-        return {k: convert_ndarray(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_ndarray(item) for item in obj]
-    return obj
+# 帧类型 -> 帧目录后缀（processed：处理视频帧，pose：骨骼帧）
+FRAME_KINDS = {'processed': '', 'pose': '_pose'}
+
+
+def _frame_base(user_id, video_id, kind):
+    # 帧存储路径（不含后缀）：<路径>.frames 为帧归档，<路径>/ 为旧版逐帧目录
+    return os.path.join(BaseConfig.FRAMES_FOLDER, f"user_{user_id}", f"{video_id}{FRAME_KINDS[kind]}")
+
+
+def _open_frames(user_id, video_id, kind):
+    """打开帧存储：预先导出的帧归档/帧目录优先，否则从处理视频或骨骼视频按需解码"""
+    frames = open_frames(_frame_base(user_id, video_id, kind))
+    if frames is not None:
+        return frames
+
+    processed = UserVideoProcess.query.filter_by(video_id=video_id, user_id=user_id).first()
+    if not processed:
+        return None
+    video_root = BaseConfig.POSE_FOLDER if kind == 'pose' else BaseConfig.PROCESSED_FOLDER
+    video_path = os.path.join(video_root, processed.video_path_process)
+    if not os.path.exists(video_path):
+        return None
+    return LazyVideoFrames(video_path, cache=frame_cache)
+
+
+def _data_url(data, mime_type):
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def _frames_response(user_id, video_id, kind):
+    """帧列表响应
+
+    查询参数：
+    offset: 起始帧序号（从0开始），默认0
+    limit: 返回帧数，省略时返回 offset 之后的全部帧（兼容不分页的旧版前端）；
+           指定时最多 FRAMES_PAGE_MAX，按 next_offset 继续请求下一页（ndjson 格式逐帧发送，不受该上限限制）
+    mode: inline（Base64内联，默认）/ url（返回带签名的单帧访问地址）
+    format: json（默认）/ ndjson（流式逐行返回：首行为分页信息，之后每行一帧）
+    """
+    frames = _open_frames(user_id, video_id, kind)
+    if frames is None:
+        return jsonify(success=False, message="未找到骨骼帧数据" if kind == 'pose' else "未找到帧数据"), 404
+
+    total = len(frames)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(limit, 1)
+        if request.args.get('format') != 'ndjson':
+            limit = min(limit, BaseConfig.FRAMES_PAGE_MAX)
+    stop = total if limit is None else min(offset + limit, total)
+    count = max(stop - offset, 0)
+    next_offset = stop if stop < total else None
+
+    mode = request.args.get('mode', 'inline')
+    token = generate_frame_token(user_id, video_id, kind) if mode == 'url' else None
+
+    def entries():
+        # 帧归档按块连续读取，url 模式不读取帧数据
+        if mode == 'url':
+            for index in range(offset, stop):
+                yield index, url_for('frames.get_frame_file', video_id=video_id, kind=kind, index=index, token=token)
+        else:
+            for index, data in enumerate(frames.iter_range(offset, stop), offset):
+                yield index, _data_url(data, frames.mime(index))
+
+    page_info = {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "count": count,
+        "next_offset": next_offset
+    }
+
+    if request.args.get('format') == 'ndjson':
+        # 逐帧编码逐帧发送，内存占用与帧数无关，首批帧可立即到达客户端
+        def generate():
+            try:
+                yield json.dumps(page_info) + "\n"
+                for index, frame in entries():
+                    yield json.dumps({"index": index, "frame": frame}) + "\n"
+            finally:
+                frames.close()
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    with frames:
+        frame_data = [frame for _, frame in entries()]
+    return jsonify({
+        "success": True,
+        "data": {
+            **page_info,
+            "frames": frame_data
+        }
+    })
+
+
+def _owned_video(video_id):
+    current_user = g.current_user
+    user = User.query.get(current_user.user_id)
+    if not user:
+        return None, (jsonify(success=False, message="用户不存在"), 404)
+
+    video = UserVideo.query.filter_by(
+        video_id=video_id,
+        user_id=user.user_id
+    ).first()
+    if not video:
+        return None, (jsonify(success=False, message="无权访问"), 403)
+    return user, None
+
 
 @frames_bp.route('/frames-batch/<string:video_id>')
 @jwt_required
 def get_frames_batch(video_id):
-    """批量获取帧数据（Base64编码）"""
+    """批量获取帧数据（Base64编码或访问地址，支持分页与流式返回）"""
     try:
-        current_user = g.current_user
-        user = User.query.get(current_user.user_id)
-        if not user:
-            return jsonify(success=False, message="用户不存在"), 404
-
-        video = UserVideo.query.filter_by(
-            video_id=video_id,
-            user_id=user.user_id
-        ).first()
-        if not video:
-            return jsonify(success=False, message="无权访问"), 403
-
-        user_dir = f"user_{user.user_id}"
-        frame_dir = os.path.join(
-            BaseConfig.FRAMES_FOLDER,
-            user_dir,
-            video_id
-        )
-
-        files = sorted([
-            f for f in os.listdir(frame_dir)
-            if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-        ])
-
-        # 批量读取并编码图片
-        frame_data = []
-        for filename in files:
-            filepath = os.path.join(frame_dir, filename)
-            with open(filepath, "rb") as img_file:
-                # 根据实际图片类型修改MIME类型
-                mime_type = 'image/jpeg' if filename.lower().endswith('.jpg') else 'image/png'
-                base64_data = base64.b64encode(img_file.read()).decode('utf-8')
-                frame_data.append(f"data:{mime_type};base64,{base64_data}")
-
-        return jsonify({
-            "success": True,
-            "data": {
-                "total": len(files),
-                "frames": frame_data
-            }
-        })
+        user, error = _owned_video(video_id)
+        if error:
+            return error
+        return _frames_response(user.user_id, video_id, 'processed')
 
     except Exception as e:
         return jsonify(success=False, message=str(e)), 500
@@ -71,54 +142,39 @@ def get_frames_batch(video_id):
 @frames_bp.route('/pose-frames/<string:video_id>')
 @jwt_required
 def get_pose_frames(video_id):
-    """获取处理后的骨骼帧（Base64编码）"""
+    """获取处理后的骨骼帧（Base64编码或访问地址，支持分页与流式返回）"""
     try:
-        current_user = g.current_user
-        user = User.query.get(current_user.user_id)
-        if not user:
-            return jsonify(success=False, message="用户不存在"), 404
+        user, error = _owned_video(video_id)
+        if error:
+            return error
+        return _frames_response(user.user_id, video_id, 'pose')
 
-        video = UserVideo.query.filter_by(
-            video_id=video_id,
-            user_id=user.user_id
-        ).first()
-        if not video:
-            return jsonify(success=False, message="无权访问"), 403
+    except Exception as e:
+        return jsonify(success=False, message=str(e)), 500
 
-        # 骨骼帧存储路径规则
-        user_dir = f"user_{user.user_id}"
-        frame_dir = os.path.join(
-            BaseConfig.FRAMES_FOLDER,
-            user_dir,
-            f"{video_id}_pose"  # 骨骼帧专用目录
-        )
 
-        if not os.path.exists(frame_dir):
-            return jsonify(success=False, message="未找到骨骼帧数据"), 404
-
-        files = sorted([
-            f for f in os.listdir(frame_dir)
-            if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-        ])
-
-        frame_data = []
-        for filename in files:
-            filepath = os.path.join(frame_dir, filename)
-            with open(filepath, "rb") as img_file:
-                mime_type = 'image/jpeg' if filename.lower().endswith('.jpg') else 'image/png'
-                base64_data = base64.b64encode(img_file.read()).decode('utf-8')
-                frame_data.append(f"data:{mime_type};base64,{base64_data}")
-
-        return jsonify({
-            "success": True,
-            "data": {
-                "total": len(files),
-                "frames": frame_data
-            }
-        })
+@frames_bp.route('/frame/<string:video_id>/<string:kind>/<int:index>')
+def get_frame_file(video_id, kind, index):
+    """单帧图片（url 模式返回的地址，凭签名令牌访问）"""
+    if kind not in FRAME_KINDS:
+        return jsonify(success=False, message="未知帧类型"), 404
 
-    except Exception as e:
-        return jsonify(success=False, message=str(e)), 500
+    user_id = verify_frame_token(request.args.get('token', ''), video_id, kind)
+    if user_id is None:
+        return jsonify(success=False, message="链接无效或已过期"), 403
+
+    frames = _open_frames(user_id, video_id, kind)
+    if frames is None:
+        return jsonify(success=False, message="未找到帧数据"), 404
+    with frames:
+        if index >= len(frames):
+            return jsonify(success=False, message="帧不存在"), 404
+        data, mime_type = frames.read(index), frames.mime(index)
+
+    response = Response(data, mimetype=mime_type)
+    response.cache_control.private = True
+    response.cache_control.max_age = BaseConfig.FRAME_URL_TTL
+    return response
 
 
 @frames_bp.route('/pose-data/<string:video_id>')
@@ -137,42 +193,26 @@ def get_pose_data(video_id):
         if not video:
             return jsonify(success=False, message="无权访问"), 403
 
-        user_dir = f"user_{user.user_id}"
-        pose_data_path = os.path.join(
-            BaseConfig.POSE_FOLDER,
-            user_dir,
-            f"results_{video_id}.json"
-        )
-
-        if not os.path.exists(pose_data_path):
+        pose_path = find_pose_data(os.path.join(BaseConfig.POSE_FOLDER, f"user_{user.user_id}"), video_id)
+        if pose_path is None:
             return jsonify(success=False, message="未找到骨骼数据"), 404
 
-        with open(pose_data_path, 'r') as f:
-            raw_data = json.load(f)
-
-            # 深度转换数据结构
-            converted_data = {
-                'meta_info': convert_ndarray(raw_data.get('meta_info', {})),
-                'instance_info': [
-                    {
-                        'frame_id': frame.get('frame_id'),
-                        'instances': [
-                            {
-                                'bbox': convert_ndarray(inst.get('bbox', [])),
-                                'keypoints': convert_ndarray(inst.get('keypoints', [])),
-                                'keypoint_scores': convert_ndarray(inst.get('keypoint_scores', []))
-                            }
-                            for inst in frame.get('instances', [])
-                        ]
-                    }
-                    for frame in raw_data.get('instance_info', [])
-                ]
-            }
-
-            return jsonify({
-                "success": True,
-                "data": converted_data
-            })
+        # 预计算的压缩响应：未修改时返回 304，客户端支持时直接发送压缩文件
+        payload, encoding = pose_payload(pose_path, request.accept_encodings)
+        etag = payload_etag(payload) if encoding else f"{payload_etag(payload)}-identity"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            with open(payload, 'rb') as f:
+                data = f.read()
+            response = Response(data if encoding else gzip.decompress(data), mimetype="application/json")
+            if encoding:
+                response.content_encoding = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
 
     except JSONDecodeError:
         return jsonify(success=False, message="骨骼数据格式错误"), 500
@@ -3,8 +3,14 @@ from pathlib import Path
 from flask import jsonify, request, Blueprint, g, current_app
 from ..config import BaseConfig
 from ..utils.security import jwt_required
-from ..utils.models import History, UserVideo, VideoFramesProcess, VideoFramesPose, UserVideoProcess
+from ..utils.models import (History, UserVideo, VideoFramesProcess, VideoFramesPose, UserVideoProcess, PipelineJob,
+                            PlayerKinematics)
 from ..extensions import db
+from ..utils.frame_archive import archive_path
+from ..utils.frame_cache import frame_cache
+from ..utils.mmpose.pose_store import pose_data_path
+from ..utils.pose_payload import payload_path
+from ..utils.kinematics import kinematics_path
 
 history_bp = Blueprint('history', __name__)
 
@@ -61,9 +67,16 @@ def delete_history(history_id):
             'processed': Path(BaseConfig.PROCESSED_FOLDER) / user_dir / filename,
             'pose_video': Path(BaseConfig.POSE_FOLDER) / user_dir / filename,
             'pose_json': Path(BaseConfig.POSE_FOLDER) / user_dir / f"results_{stem_name}.json",
+            'pose_data': Path(pose_data_path(Path(BaseConfig.POSE_FOLDER) / user_dir, stem_name)),
+            'pose_payload': Path(payload_path(pose_data_path(Path(BaseConfig.POSE_FOLDER) / user_dir, stem_name))),
+            'pose_payload_br': Path(payload_path(pose_data_path(Path(BaseConfig.POSE_FOLDER) / user_dir, stem_name),
+                                                 'br')),
             'pose_md': Path(BaseConfig.POSE_FOLDER) / user_dir / f"results_{stem_name}.md",
+            'kinematics': Path(kinematics_path(Path(BaseConfig.POSE_FOLDER) / user_dir, stem_name)),
             'frames_dir': Path(BaseConfig.FRAMES_FOLDER) / user_dir / stem_name,
             'pose_frames_dir': Path(BaseConfig.FRAMES_FOLDER) / user_dir / f"{stem_name}_pose",
+            'frames_archive': Path(archive_path(Path(BaseConfig.FRAMES_FOLDER) / user_dir / stem_name)),
+            'pose_frames_archive': Path(archive_path(Path(BaseConfig.FRAMES_FOLDER) / user_dir / f"{stem_name}_pose")),
             'other': Path(BaseConfig.UTILS_FOLDER) / f"other" / f"{stem_name}_ball.csv",
             'result': Path(BaseConfig.RESULT_FOLDER) / user_dir / f"{stem_name}.csv"
 
@@ -74,6 +87,8 @@ def delete_history(history_id):
             # 删除关联记录
             db.session.delete(record)
             if video_id:
+                PipelineJob.query.filter_by(video_id=video_id).delete()
+                PlayerKinematics.query.filter_by(video_id=video_id).delete()
                 UserVideo.query.filter_by(video_id=video_id).delete()
                 VideoFramesProcess.query.filter_by(video_id=video_id).delete()
                 VideoFramesPose.query.filter_by(video_id=video_id).delete()
@@ -94,6 +109,10 @@ def delete_history(history_id):
             except Exception as e:
                 current_app.logger.error(f"删除失败 {path}: {str(e)}")
 
+        # 清理按需抽帧缓存
+        frame_cache.discard_video(file_paths['processed'])
+        frame_cache.discard_video(file_paths['pose_video'])
+
         # 执行删除操作
         for path in file_paths.values():
             safe_delete(path)
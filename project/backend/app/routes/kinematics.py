@@ -0,0 +1,57 @@
+# kinematics.py
+# 逐运动员运动学接口：摘要直接读 player_kinematics 表（几 KB），
+# 需要曲线时再从 kinematics_<stem>.npz 读取时间序列，前端无需解析整个骨骼文件。
+import os
+import numpy as np
+from flask import Blueprint, jsonify, request, g
+from ..utils.models import UserVideo, PlayerKinematics
+from ..utils.kinematics import kinematics_path, load_kinematics, PHASE_NAMES
+from ..utils.security import jwt_required
+from ..config import BaseConfig
+
+kinematics_bp = Blueprint('kinematics', __name__)
+
+# 时间序列字段（按运动员切片）
+_SERIES = ('angles', 'wrist_speed', 'com', 'com_speed', 'phase')
+
+
+def _to_list(values, digits=2):
+    """数组 -> 列表（NaN 转为 null，浮点保留 digits 位小数）"""
+    if values.dtype.kind != 'f':
+        return values.tolist()
+    return np.where(np.isnan(values), None, np.round(values.astype(np.float64), digits)).tolist()
+
+
+@kinematics_bp.route('/kinematics/<string:video_id>', methods=['GET'])
+@jwt_required
+def get_kinematics(video_id):
+    """运动学摘要；?player=<序号> 只返回该运动员，?series=1 附带逐帧时间序列"""
+    user_id = g.current_user.user_id
+    if not UserVideo.query.filter_by(video_id=video_id, user_id=user_id).first():
+        return jsonify(success=False, message="无权访问"), 403
+
+    query = PlayerKinematics.query.filter_by(video_id=video_id)
+    player = request.args.get('player', type=int)
+    if player is not None:
+        query = query.filter_by(player=player)
+    records = query.order_by(PlayerKinematics.player).all()
+    if not records:
+        return jsonify(success=False, message="未找到运动学数据"), 404
+    data = {"players": [record.to_dict() for record in records]}
+
+    if request.args.get('series') in ('1', 'true'):
+        path = kinematics_path(os.path.join(BaseConfig.POSE_FOLDER, f"user_{user_id}"), video_id)
+        if not os.path.exists(path):
+            return jsonify(success=False, message="未找到运动学数据"), 404
+        series = load_kinematics(path)
+        data.update({
+            "fps": float(series['fps']),
+            "frame_ids": series['frame_ids'].tolist(),
+            "angle_names": series['angle_names'].tolist(),
+            "phase_names": list(PHASE_NAMES),
+        })
+        for player_data, record in zip(data["players"], records):
+            slot = record.player - 1
+            player_data["series"] = {name: _to_list(series[name][:, slot]) for name in _SERIES}
+
+    return jsonify(success=True, data=data)
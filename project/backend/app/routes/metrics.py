@@ -0,0 +1,65 @@
+# metrics.py
+# 流水线性能指标接口：Prometheus 抓取端点与按视频/版本的指标查询
+from flask import Blueprint, jsonify, Response, g
+from sqlalchemy import func
+from ..utils.models import db, UserVideo, PipelineStageMetric
+from ..utils.metrics import registry
+from ..utils.scheduler import pipeline_scheduler
+from ..utils.security import jwt_required
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 文本格式（进程启动以来的累计值）"""
+    stats = pipeline_scheduler.stats()
+    body = registry.render({
+        'pipeline_scheduler_slots': ('Concurrent pipeline slots.', stats['slots']),
+        'pipeline_scheduler_running': ('Videos currently being processed.', stats['running']),
+        'pipeline_scheduler_queued': ('Videos waiting for a slot.', stats['queued']),
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+@metrics_bp.route('/metrics/videos/<string:video_id>', methods=['GET'])
+@jwt_required
+def get_video_metrics(video_id):
+    """单个视频各阶段的指标"""
+    video = UserVideo.query.filter_by(video_id=video_id, user_id=g.current_user.user_id).first()
+    if not video:
+        return jsonify({"success": False, "message": "视频不存在"}), 404
+
+    records = PipelineStageMetric.query.filter_by(video_id=video_id) \
+        .order_by(PipelineStageMetric.metric_id).all()
+    return jsonify({"success": True, "data": [record.to_dict() for record in records]})
+
+
+@metrics_bp.route('/metrics/releases', methods=['GET'])
+@jwt_required
+def get_release_metrics():
+    """按版本与阶段汇总成功运行的指标，用于发现性能回退"""
+    rows = db.session.query(
+        PipelineStageMetric.release,
+        PipelineStageMetric.stage,
+        func.count(PipelineStageMetric.metric_id),
+        func.avg(PipelineStageMetric.wall_seconds),
+        func.avg(PipelineStageMetric.cpu_seconds),
+        func.max(PipelineStageMetric.peak_rss_mb),
+        func.avg(PipelineStageMetric.fps)
+    ).filter(PipelineStageMetric.success.is_(True)) \
+        .group_by(PipelineStageMetric.release, PipelineStageMetric.stage) \
+        .order_by(PipelineStageMetric.release, PipelineStageMetric.stage).all()
+
+    return jsonify({"success": True, "data": [
+        {
+            "release": release,
+            "stage": stage,
+            "runs": runs,
+            "avg_wall_seconds": avg_wall,
+            "avg_cpu_seconds": avg_cpu,
+            "max_peak_rss_mb": max_rss,
+            "avg_fps": avg_fps
+        }
+        for release, stage, runs, avg_wall, avg_cpu, max_rss, avg_fps in rows
+    ]})
@@ -23,7 +23,8 @@ from ..utils.rag.load_and_search_from_datasets import (
     load_dataset_embedding,
     search_from_index,
 )
-from ..utils.rag.load_data import load_skeleton_keypoint
+from ..utils.rag.load_data import load_skeleton_keypoint, load_kinematics_prompt
+from ..utils.mmpose.pose_store import find_pose_data
 from ..config import BaseConfig
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -261,46 +262,14 @@ def load_report():
         return jsonify({"status": "error", "error": str(e)}), 500
 
 
-@rag_bp.route("/generate_report", methods=["POST"])
-@jwt_required
-def generate_report():
-    req_data = request.get_json()
-    video_id = req_data.get("video_id")
-
-    if not video_id:
-        return jsonify({"status": "error", "message": "缺少 video_id 参数"}), 400
-
-    # 获取当前用户
-    current_user = g.current_user
-    user = User.query.get(current_user.user_id)
-    if not user:
-        return jsonify({"status": "error", "message": "用户不存在"}), 404
-
-    # 验证视频归属
-    video = UserVideo.query.filter_by(
-        video_id=video_id,
-        user_id=user.user_id
-    ).first()
-    if not video:
-        return jsonify({"status": "error", "message": "无权访问该视频"}), 403
-
-    # 构建文件路径（根据video_id）
-    pose_video_path = str(Path(BaseConfig.POSE_FOLDER) / f"user_{user.user_id}")
-    file_path = Path(pose_video_path) / f"results_{video_id}.json"
-
-    if not os.path.exists(file_path):
-        return jsonify({"status": "error", "error": "File not found"}), 404
-    else:
-        skeleton_instances, meta_info = load_skeleton_keypoint(file_path)
-    client = OpenAI(
-        api_key=qianfan_api_key,
-        base_url="https://qianfan.baidubce.com/v2",
-    )
+def _frame_analysis(client, file_path, frame_count):
+    """逐帧分析：每 5 帧的原始骨骼点发给模型分析一次（没有运动学摘要时使用）"""
+    skeleton_instances, meta_info = load_skeleton_keypoint(file_path)
     per_analysis = []
 
     batch_size = 5
     # for i in range(0, len(skeleton_instances), batch_size):
-    for i in range(0, 20, batch_size):
+    for i in range(0, frame_count, batch_size):
         batch_instances = skeleton_instances[i : i + batch_size]
 
         # Build system prompt for the current batch of frames
@@ -350,6 +319,58 @@ def generate_report():
             per_analysis.append(completion.choices[0].message.content)
             # print(completion.choices[0].message.content)
 
+    return per_analysis
+
+
+def _report_analysis(client, file_path, frame_count):
+    """报告依据：优先使用运动学摘要（几 KB，概括全部帧），不读取整个骨骼文件；
+    运动学文件不存在（旧视频或该阶段失败）时退回逐帧骨骼点分析
+    """
+    kinematics_prompt = load_kinematics_prompt(file_path)
+    if kinematics_prompt:
+        return kinematics_prompt
+    per_analysis = _frame_analysis(client, file_path, frame_count)
+    return f"""
+### 以下是每一帧的分析内容，基于骨骼点数据和动作分析：
+{per_analysis}
+"""
+
+
+@rag_bp.route("/generate_report", methods=["POST"])
+@jwt_required
+def generate_report():
+    req_data = request.get_json()
+    video_id = req_data.get("video_id")
+
+    if not video_id:
+        return jsonify({"status": "error", "message": "缺少 video_id 参数"}), 400
+
+    # 获取当前用户
+    current_user = g.current_user
+    user = User.query.get(current_user.user_id)
+    if not user:
+        return jsonify({"status": "error", "message": "用户不存在"}), 404
+
+    # 验证视频归属
+    video = UserVideo.query.filter_by(
+        video_id=video_id,
+        user_id=user.user_id
+    ).first()
+    if not video:
+        return jsonify({"status": "error", "message": "无权访问该视频"}), 403
+
+    # 构建文件路径（根据video_id）
+    pose_video_path = str(Path(BaseConfig.POSE_FOLDER) / f"user_{user.user_id}")
+    file_path = find_pose_data(pose_video_path, video_id)
+
+    if file_path is None:
+        return jsonify({"status": "error", "error": "File not found"}), 404
+    client = OpenAI(
+        api_key=qianfan_api_key,
+        base_url="https://qianfan.baidubce.com/v2",
+    )
+    per_analysis = _report_analysis(client, file_path, 20)
+
     # After processing all batches, generate the final report
     final_prompt = f"""
 你是一个专业的乒乓球运动动作分析专家，请根据以下每一帧的分析结果，对每个人的乒乓球动作进行独立分析并撰写报告。报告应包括但不限于以下内容：
@@ -360,9 +381,7 @@ def generate_report():
 4. **改进建议**：如果动作中存在问题，请根据每一帧中的骨骼点分析给出改进的具体建议。
 5. **综合评价**：结合整体运动表现，给出该人运动表现的总体评价。
 
-### 以下是每一帧的分析内容，基于骨骼点数据和动作分析：
 {per_analysis}
-
 请为每个的运动员生成详细的报告，每个人的分析按以下格式输出：
 - **运动员1**:
     - 动作规范性评价：
@@ -396,65 +415,11 @@ def auto_generate_report(file_path, user_id, filename):
 
     if not os.path.exists(file_path):
         return {"status": "error", "error": "File not found"}, 404
-    else:
-        skeleton_instances, meta_info = load_skeleton_keypoint(file_path)
     client = OpenAI(
         api_key=qianfan_api_key,
         base_url="https://qianfan.baidubce.com/v2",
     )
-    per_analysis = []
-
-    batch_size = 5
-    # for i in range(0, len(skeleton_instances), batch_size):
-    for i in range(0, 10, batch_size):
-        batch_instances = skeleton_instances[i : i + batch_size]
-
-        # Build system prompt for the current batch of frames
-        system_prompt = f"""
-你是一个专业的乒乓球运动动作分析专家，擅长通过人体骨骼关键点坐标进行动作识别和姿态评估。请根据以下每帧图像中进行乒乓球对打时的人体骨骼点信息，结合字段说明，对前两个人的动作进行详细分析。分析内容应包括但不限于：
-
-1. 动作是否规范（如站立、跑步、跳跃等是否符合常规标准）； 
-2. 姿态是否稳定，是否存在不协调或危险的动作；
-3. 动作幅度是否合理；
-4. 如存在问题，请指出具体关键点及改进建议。
-
-只为前两个人体进行分析，并且考虑到当前图像帧的编号，便于最后根据整体的运动轨迹进行分析。
-输出标签使用：人体1、人体2
-以下是骨骼点字段说明（metadata）： 
-{meta_info}
-
-以下是第 {i+1} 到 {min(i + batch_size, len(skeleton_instances))} 帧图像中的每个人体的骨骼点数据：
-"""
-        for j, skeleton_instance in enumerate(batch_instances):
-            system_prompt += f"""
-第 {i + j + 1} 帧图像中的每个人体的骨骼点数据： 
-{skeleton_instance}
-"""
-        # Send the batch of frames to the OpenAI API for processing
-        try:
-            completion = client.chat.completions.create(
-                model="deepseek-v3-241226",
-                messages=[
-                    {"role": "system", "content": "你是乒乓球运动动作分析专家"},
-                    {"role": "user", "content": system_prompt},
-                ],
-                stream=False,
-            )
-            per_analysis.append(completion.choices[0].message.content)
-            # print(completion.choices[0].message.content)
-        except openai.RateLimitError:
-            print("Rate limit exceeded. Waiting for 10 seconds...")
-            time.sleep(10)
-            completion = client.chat.completions.create(
-                model="ernie-x1-32k-preview",
-                messages=[
-                    {"role": "system", "content": "你是乒乓球运动动作分析专家"},
-                    {"role": "user", "content": system_prompt},
-                ],
-                stream=False,
-            )
-            per_analysis.append(completion.choices[0].message.content)
-            # print(completion.choices[0].message.content)
+    per_analysis = _report_analysis(client, file_path, 10)
 
     # After processing all batches, generate the final report
     final_prompt = f"""
@@ -466,9 +431,7 @@ def auto_generate_report(file_path, user_id, filename):
 4. **改进建议**：如果动作中存在问题，请根据每一帧中的骨骼点分析给出改进的具体建议。
 5. **综合评价**：结合整体运动表现，给出该人运动表现的总体评价。
 
-### 以下是每一帧的分析内容，基于骨骼点数据和动作分析：
 {per_analysis}
-
 请为每个的运动员生成详细的报告，每个人的分析按以下格式输出：
 - **运动员1**:
     - 动作规范性评价：
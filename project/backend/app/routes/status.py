@@ -0,0 +1,99 @@
+# status.py
+# 视频处理状态接口：排队位置、预计等待时间与各阶段进度，
+# 并提供 SSE（text/event-stream）推送，进度变化时主动通知客户端，无需轮询历史记录接口。
+import json
+from flask import Blueprint, jsonify, request, g, url_for, Response, stream_with_context
+from ..extensions import db
+from ..utils.models import UserVideo, PipelineJob
+from ..utils.progress import progress, STATE_COMPLETED, TERMINAL_STATES
+from ..utils.scheduler import pipeline_scheduler
+from ..utils.security import jwt_required, generate_frame_token, verify_frame_token
+from ..config import BaseConfig
+
+status_bp = Blueprint('status', __name__)
+
+
+def _status_payload(video_id, live, job=None):
+    """组合调度器（排队位置/预计等待）、进程内进度与数据库任务记录
+
+    进程内有进度时以其为准；任务在其他进程处理或早已结束时使用数据库记录。
+    """
+    scheduled = pipeline_scheduler.status(video_id)
+    if live is not None:
+        state = live['state']
+        stages = live['stages']
+        completed = [stage for stage, info in stages.items() if info['state'] == STATE_COMPLETED]
+        error = live['error']
+    else:
+        state = job.status if job else None
+        stages = {}
+        completed = job.stages() if job else []
+        error = job.error if job else None
+    if scheduled:
+        state = scheduled[0]
+
+    return {
+        "video_id": video_id,
+        "state": state,
+        "queue_position": scheduled[1] if scheduled and scheduled[0] == 'queued' else 0,
+        "eta_seconds": round(scheduled[2]) if scheduled and scheduled[0] == 'queued' else 0,
+        "completed_stages": completed,
+        "stages": stages,
+        "error": error
+    }
+
+
+def _load_job(video_id):
+    # 结束当前读事务，读取其他线程/进程提交的最新状态
+    db.session.rollback()
+    return db.session.get(PipelineJob, video_id, populate_existing=True)
+
+
+@status_bp.route('/status/<string:video_id>', methods=['GET'])
+@jwt_required
+def get_status(video_id):
+    """处理状态（JSON），events_url 为带签名令牌的 SSE 推送地址"""
+    user_id = g.current_user.user_id
+    if not UserVideo.query.filter_by(video_id=video_id, user_id=user_id).first():
+        return jsonify(success=False, message="无权访问"), 403
+
+    _, live = progress.snapshot(video_id)
+    job = db.session.get(PipelineJob, video_id) if live is None else None
+    data = _status_payload(video_id, live, job)
+    data["events_url"] = url_for('status.status_events', video_id=video_id,
+                                 token=generate_frame_token(user_id, video_id, 'status'))
+    return jsonify(success=True, data=data)
+
+
+@status_bp.route('/status/<string:video_id>/events', methods=['GET'])
+def status_events(video_id):
+    """SSE 状态推送（EventSource 无法携带请求头，凭 events_url 中的签名令牌访问）
+
+    每次进度变化发送一条 status 事件，空闲时定期发送心跳注释；
+    任务结束（completed / failed）后发送最终状态并关闭连接。
+    """
+    if verify_frame_token(request.args.get('token', ''), video_id, 'status') is None:
+        return jsonify(success=False, message="链接无效或已过期"), 403
+
+    def generate():
+        version, live = progress.snapshot(video_id)
+        last = None
+        while True:
+            # 进程内没有进度（其他进程处理或已结束）时退化为按心跳间隔读取数据库
+            job = _load_job(video_id) if live is None else None
+            data = _status_payload(video_id, live, job)
+            if data != last:
+                # retry：连接断开后客户端的重连间隔（毫秒）
+                yield (f"retry: {BaseConfig.STATUS_HEARTBEAT * 1000}\n"
+                       f"event: status\ndata: {json.dumps(data, ensure_ascii=False)}\n\n")
+                last = data
+            else:
+                yield ": keep-alive\n\n"
+            if data['state'] in TERMINAL_STATES or (live is None and job is None):
+                return
+            version, live = progress.wait(video_id, version, timeout=BaseConfig.STATUS_HEARTBEAT)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx 不缓冲推送
+    return response
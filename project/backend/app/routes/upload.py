@@ -1,13 +1,15 @@
 import os
+import math
 from datetime import datetime, timezone, timedelta
 from flask import jsonify, request, Blueprint, current_app, send_from_directory
 from jwt import decode, ExpiredSignatureError, InvalidTokenError
 from ..extensions import db
-from ..utils.models import User, UserVideo, History, VideoStatus
+from ..utils.models import User, UserVideo, History, VideoStatus, PipelineJob
 from ..config import BaseConfig
 from ..utils.security import jwt_required
 
 from ..utils.task import process_video_async
+from ..utils.scheduler import pipeline_scheduler, QueueFull
 
 upload_bp = Blueprint('upload', __name__)
 
@@ -16,6 +18,26 @@ VIDEO_STATUS_UPLOADED = 1
 HISTORY_STATUS_UPLOADED = "processing"
 
 
+def _queue_full_response(eta):
+    """处理队列已满：返回 429，告知客户端预计可重试时间"""
+    response = jsonify({
+        "success": False,
+        "message": "服务器繁忙，请稍后再试",
+        "data": {"eta_seconds": round(eta)}
+    })
+    response.headers['Retry-After'] = str(max(math.ceil(eta), 1))
+    return response, 429
+
+
+def _discard_upload(video_id, save_path):
+    """入队失败时撤销本次上传已提交的记录与文件"""
+    History.query.filter_by(video_id=video_id).delete()
+    PipelineJob.query.filter_by(video_id=video_id).delete()
+    VideoStatus.query.filter_by(video_id=video_id).delete()
+    UserVideo.query.filter_by(video_id=video_id).delete()
+    db.session.commit()
+    if os.path.exists(save_path):
+        os.remove(save_path)
 
 
 @upload_bp.route('/upload', methods=['POST'])
@@ -41,6 +63,12 @@ def upload_video():
         if not user:
             return jsonify({"success": False, "message": "用户不存在"}), 404
 
+        # 处理队列已满时拒绝上传（背压）；这里只是保存文件前的预检查，入队时会再次检查
+        try:
+            pipeline_scheduler.admit()
+        except QueueFull as e:
+            return _queue_full_response(e.eta)
+
         # 生成唯一视频ID（时间戳）
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")[:-3]
         video_id = f"{timestamp}"
@@ -84,14 +112,31 @@ def upload_video():
                 expiry=datetime.now(timezone.utc) + timedelta(days=7)
             )
             db.session.add(new_history)
-            db.session.commit()
 
-            process_video_async(
+            # 创建持久化处理任务（进程重启后可恢复）
+            db.session.add(PipelineJob(
+                video_id=video_id,
+                user_id=user.user_id,
                 input_path=save_path,
                 filename=os.path.basename(save_path),
-                original_video_id=video_id,
-                user_id=user.user_id
-            )
+                status='queued',
+                completed_stages='',
+                attempts=0
+            ))
+            db.session.commit()
+
+            # 容量检查与入队在调度器的同一次加锁内完成，并发上传不会超出队列长度
+            try:
+                state, queue_position, eta = process_video_async(
+                    input_path=save_path,
+                    filename=os.path.basename(save_path),
+                    original_video_id=video_id,
+                    user_id=user.user_id,
+                    enforce_limit=True
+                )
+            except QueueFull as e:
+                _discard_upload(video_id, save_path)
+                return _queue_full_response(e.eta)
 
         # 异步任务处理
         except Exception as e:
@@ -108,7 +153,9 @@ def upload_video():
             "data": {
                 "video_id": video_id,
                 "history_id": new_history.history_id,
-                "status_url": f"/api/status/{video_id}"
+                "status_url": f"/api/status/{video_id}",
+                "queue_position": queue_position,
+                "eta_seconds": round(eta) if state == 'queued' else 0
             }
         }), 200
 
@@ -1,5 +1,9 @@
 # video.py
-from flask import Blueprint, jsonify, url_for, g, send_from_directory, current_app
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import Blueprint, jsonify, url_for, g, send_from_directory, current_app, request, Response, abort
+from werkzeug.security import safe_join
 from ..utils.models import User, UserVideo, UserVideoProcess
 from ..utils.security import jwt_required
 from ..config import BaseConfig
@@ -42,7 +46,41 @@ def get_video_urls(video_id):
         return jsonify(success=False, message=str(e)), 500
 
 
+def _video_etag(path):
+    """强 ETag：文件修改时间 + 大小（视频重新生成后随之变化）"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
 @video_bp.route('/get_video/<path:filename>')
 def get_video(filename):
-    """最简单的文件访问路由"""
-    return send_from_directory(BaseConfig.UTILS_FOLDER, filename)
\ No newline at end of file
+    """视频文件访问
+
+    支持 Range 分段请求（206）与 ETag / If-None-Match 协商缓存；
+    配置 VIDEO_SENDFILE 后只返回响应头，由前端代理（nginx X-Accel-Redirect / X-Sendfile）发送文件内容。
+    """
+    path = safe_join(BaseConfig.UTILS_FOLDER, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    etag = _video_etag(path)
+
+    if BaseConfig.VIDEO_SENDFILE in ('x-accel', 'x-sendfile'):
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            if BaseConfig.VIDEO_SENDFILE == 'x-accel':
+                # nginx 在 internal location 中处理 Range 与文件发送
+                response.headers['X-Accel-Redirect'] = BaseConfig.VIDEO_ACCEL_PREFIX + quote(filename)
+            else:
+                response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = BaseConfig.VIDEO_CACHE_MAX_AGE
+        return response
+
+    # send_file 处理 Range（206/416）、If-Range 与 If-None-Match（304）
+    response = send_from_directory(BaseConfig.UTILS_FOLDER, filename, conditional=True, etag=etag,
+                                   max_age=BaseConfig.VIDEO_CACHE_MAX_AGE)
+    response.cache_control.public = True
+    return response
\ No newline at end of file
@@ -1,7 +1,5 @@
-from utils.model import BallTrackerNet
 import torch
 import cv2
-from utils.general_back import postprocess
 from tqdm import tqdm
 import numpy as np
 import argparse
@@ -12,17 +10,27 @@ import os
 import csv
 from pathlib import Path
 
+try:
+    from .utils.model import BallTrackerNet
+    from .utils.general_back import postprocess_batch
+except ImportError:  # 作为脚本直接运行时
+    from utils.model import BallTrackerNet
+    from utils.general_back import postprocess_batch
 
-def save_track_to_csv(ball_track, dists, video_path, fps):
+
+def save_track_to_csv(ball_track, dists, video_path, fps, output_dir=None):
     """将球的轨迹和速度保存为CSV文件
     :params
         ball_track: 球的坐标列表
         dists: 两点之间的欧氏距离列表
         video_path: 输入视频路径
         fps: 帧率
+        output_dir: CSV输出目录（默认为 video/other）
     """
     # 创建输出目录
-    output_dir = Path(r"project\backend\app\utils\video\other").resolve()
+    if output_dir is None:
+        output_dir = Path(r"project\backend\app\utils\video\other").resolve()
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # 从视频路径中获取文件名
@@ -57,132 +65,228 @@ def read_video(path_video):
         frames: list of video frames
         fps: frames per second
     """
+    frames, fps = iter_video(path_video)
+    return list(frames), fps
+
+
+def iter_video(path_video):
+    """ Open video file for streaming, frames are decoded lazily one by one
+    :params
+        path_video: path to video file
+    :return
+        frames: generator of video frames
+        fps: frames per second
+    """
     cap = cv2.VideoCapture(path_video)
     fps = int(cap.get(cv2.CAP_PROP_FPS))
 
-    frames = []
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if ret:
-            frames.append(frame)
-        else:
-            break
-    cap.release()
-    return frames, fps
+    def frames():
+        try:
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if ret:
+                    yield frame
+                else:
+                    break
+        finally:
+            cap.release()
+
+    return frames(), fps
+
+
+def draw_preview(frame, ball_track, dists, num, fps):
+    """ Draw coordinates, speed and the recent track on a copy of frame num
+    :params
+        frame: original video frame
+        ball_track: list of detected ball points up to frame num
+        dists: list of euclidean distances up to frame num
+        num: index of the frame
+        fps: frames per second of the video
+    :return
+        preview_frame: annotated frame
+    """
+    # 生成预览帧
+    preview_frame = frame.copy()
+
+    # 获取当前坐标
+    current_x, current_y = ball_track[num]
+
+    # 生成坐标文本
+    coord_line = f"X: {current_x:.1f}" if current_x else "X: NaN"
+    coord_line += f"  Y: {current_y:.1f}" if current_y else "  Y: NaN"
+
+    # 计算速度
+    current_dist = dists[num]
+    if current_dist != -1 and current_x is not None and current_y is not None and ball_track[num - 1][
+        0] is not None:
+        speed = current_dist * fps
+        speed_line = f"Speed: {speed:.1f} px/s"
+    else:
+        speed_line = "Speed: N/A"
+
+    # 设置显示参数
+    text_scale = 1.2
+    text_thickness = 2
+    text_color = (255, 255, 255)
+    bg_color = (40, 40, 40)
+
+    # 计算文本尺寸
+    (coord_width, coord_height), _ = cv2.getTextSize(coord_line, cv2.FONT_HERSHEY_SIMPLEX, text_scale,
+                                                     text_thickness)
+    (speed_width, speed_height), _ = cv2.getTextSize(speed_line, cv2.FONT_HERSHEY_SIMPLEX, text_scale,
+                                                     text_thickness)
+    max_width = max(coord_width, speed_width)
+    total_height = coord_height + speed_height + 5
+
+    # 绘制背景
+    cv2.rectangle(preview_frame,
+                  (10, 10),
+                  (20 + max_width, 20 + total_height),
+                  bg_color, -1)
+
+    # 绘制坐标行
+    cv2.putText(preview_frame, coord_line,
+                (20, 20 + coord_height),
+                cv2.FONT_HERSHEY_SIMPLEX, text_scale,
+                text_color, text_thickness)
+
+    # 绘制速度行
+    cv2.putText(preview_frame, speed_line,
+                (20, 20 + coord_height + 5 + speed_height),
+                cv2.FONT_HERSHEY_SIMPLEX, text_scale,
+                text_color, text_thickness)
+
+    # 绘制轨迹
+    for i in range(10):
+        idx = num - i
+        if idx >= 0 and ball_track[idx][0]:
+            color = (0, 0, 255) if i == 0 else (0, 255, 0)
+            cv2.circle(preview_frame,
+                       (int(ball_track[idx][0]), int(ball_track[idx][1])),
+                       radius=3, color=color, thickness=-1)
+
+    return preview_frame
+
+
+def preprocess_frame(frame, width=640, height=360):
+    """ Resize and normalize one frame into the CHW float32 layout expected by the model
+    :params
+        frame: original video frame
+    :return
+        img: array of shape (3, height, width)
+    """
+    img = cv2.resize(frame, (width, height)).astype(np.float32) / 255.0
+    return np.ascontiguousarray(np.rollaxis(img, 2, 0))
+
+
+def track_frames(frames, model, fps, ball_track, dists, batch_size=1, postprocess_mode='centroid',
+                 record_heatmaps=None, draw=True):
+    """ Run pretrained model on a stream of consecutive frames with a 3-frame sliding window.
+    Every frame is resized and normalized once into a ring buffer of batch_size + 2 slots,
+    batch_size overlapping triplets are stacked into one (N, 9, 360, 640) tensor per forward pass.
+    Peak memory depends on batch_size only, not on video length.
+    :params
+        frames: iterable of consecutive video frames
+        model: pretrained model
+        fps: frames per second of the video
+        ball_track: empty list, filled in place with detected ball points
+        dists: empty list, filled in place with euclidean distances between neighbouring points
+        batch_size: number of triplets per forward pass
+        postprocess_mode: 'centroid' (vectorized over the batch) or 'hough' (per-frame HoughCircles)
+        record_heatmaps: optional list, argmax maps of every batch are appended to it as uint8
+        draw: draw coordinates, speed and track on the yielded frames; False yields the original frames
+    :yield
+        preview_frame: processed frame, starting from the third frame
+    """
+    device = next(model.parameters()).device
+    height = 360
+    width = 640
+    ring = np.empty((batch_size + 2, 3, height, width), dtype=np.float32)
+    filled = 0
+    pending = []  # (帧号, 原始帧)
+
+    def flush():
+        n = len(pending)
+        # triplet i = (frame, prev, preprev) = ring slots (i + 2, i + 1, i)
+        inp = np.concatenate((ring[2:n + 2], ring[1:n + 1], ring[:n]), axis=1)
+        with torch.inference_mode():
+            out = model(torch.from_numpy(inp).to(device))
+            # 256 类的 argmax 可无损存为 uint8，设备到主机拷贝与后处理的数据量减为 1/8
+            output = out.argmax(dim=1).to(torch.uint8).cpu().numpy()
+        if record_heatmaps is not None:
+            record_heatmaps.append(output)
+
+        scale_x = [frame.shape[1] / width for _, frame in pending]
+        scale_y = [frame.shape[0] / height for _, frame in pending]
+        coords = postprocess_batch(output, scale_x, scale_y, mode=postprocess_mode)
+
+        for (num, frame), (x_pred, y_pred) in zip(pending, coords):
+            ball_track.append((x_pred, y_pred))
+
+            if ball_track[-1][0] and ball_track[-2][0]:
+                dist = distance.euclidean(ball_track[-1], ball_track[-2])
+            else:
+                dist = -1
+            dists.append(dist)
+
+            yield draw_preview(frame, ball_track, dists, num, fps) if draw else frame
+
+        # 保留最后两帧作为下一批的前序帧
+        ring[:2] = ring[n:n + 2]
+        pending.clear()
+
+    for num, frame in enumerate(tqdm(frames)):
+        ring[filled] = preprocess_frame(frame, width, height)
+        filled += 1
+        if num < 2:
+            ball_track.append((None, None))
+            dists.append(-1)
+            continue
+
+        pending.append((num, frame))
+        if len(pending) == batch_size:
+            yield from flush()
+            filled = 2
+
+    if pending:
+        yield from flush()
+
+
+def track_ball(frames, model, batch_size=1, postprocess_mode='centroid'):
+    """ Run pretrained model on a stream of frames without drawing, for in-process use
+    :params
+        frames: iterable of consecutive video frames
+        model: pretrained model returned by load_model
+        batch_size: number of triplets per forward pass
+        postprocess_mode: 'centroid' or 'hough'
+    :return
+        track: float array of shape (N, 2), NaN where no ball was detected
+        dists: float array of shape (N,), euclidean distance to the previous point, -1 if unknown
+    """
+    ball_track, dists = [], []
+    for _ in track_frames(frames, model, None, ball_track, dists, batch_size, postprocess_mode, draw=False):
+        pass
+    track = np.array([(np.nan, np.nan) if x is None or y is None else (x, y) for x, y in ball_track],
+                     dtype=np.float64).reshape(-1, 2)
+    return track, np.asarray(dists, dtype=np.float64)
 
 
-def infer_model(frames, model, fps):  # 添加fps参数
+def infer_model(frames, model, fps, batch_size=1, postprocess_mode='centroid'):  # 添加fps参数
     """ Run pretrained model on a consecutive list of frames
     :params
         frames: list of consecutive video frames
         model: pretrained model
         fps: frames per second of the video
+        batch_size: number of triplets per forward pass
+        postprocess_mode: 'centroid' or 'hough'
     :return
         ball_track: list of detected ball points
         dists: list of euclidean distances between two neighbouring ball points
         output_video: list of processed frames
     """
-    # cv2.namedWindow("Processing Preview", cv2.WINDOW_NORMAL)
-
-    height = 360
-    width = 640
-    dists = [-1] * 2
-    ball_track = [(None, None)] * 2
-    output_video = []
-    for num in tqdm(range(2, len(frames))):
-        original_frame = frames[num]
-        orig_height, orig_width = original_frame.shape[:2]
-
-        img = cv2.resize(frames[num], (width, height))
-        img_prev = cv2.resize(frames[num - 1], (width, height))
-        img_preprev = cv2.resize(frames[num - 2], (width, height))
-        imgs = np.concatenate((img, img_prev, img_preprev), axis=2)
-        imgs = imgs.astype(np.float32) / 255.0
-        imgs = np.rollaxis(imgs, 2, 0)
-        inp = np.expand_dims(imgs, axis=0)
-        out = model(torch.from_numpy(inp).float().to(device))
-        output = out.argmax(dim=1).detach().cpu().numpy()
-
-        scale_x = orig_width / width
-        scale_y = orig_height / height
-
-        x_pred, y_pred = postprocess(output, scale_x, scale_y)
-        ball_track.append((x_pred, y_pred))
-
-        if ball_track[-1][0] and ball_track[-2][0]:
-            dist = distance.euclidean(ball_track[-1], ball_track[-2])
-        else:
-            dist = -1
-        dists.append(dist)
-
-        # 生成预览帧
-        preview_frame = frames[num].copy()
-
-        # 获取当前坐标
-        current_x, current_y = x_pred, y_pred
-
-        # 生成坐标文本
-        coord_line = f"X: {current_x:.1f}" if current_x else "X: NaN"
-        coord_line += f"  Y: {current_y:.1f}" if current_y else "  Y: NaN"
-
-        # 计算速度
-        current_dist = dists[num]
-        if current_dist != -1 and current_x is not None and current_y is not None and ball_track[num - 1][
-            0] is not None:
-            speed = current_dist * fps
-            speed_line = f"Speed: {speed:.1f} px/s"
-        else:
-            speed_line = "Speed: N/A"
-
-        # 设置显示参数
-        text_scale = 1.2
-        text_thickness = 2
-        text_color = (255, 255, 255)
-        bg_color = (40, 40, 40)
-
-        # 计算文本尺寸
-        (coord_width, coord_height), _ = cv2.getTextSize(coord_line, cv2.FONT_HERSHEY_SIMPLEX, text_scale,
-                                                         text_thickness)
-        (speed_width, speed_height), _ = cv2.getTextSize(speed_line, cv2.FONT_HERSHEY_SIMPLEX, text_scale,
-                                                         text_thickness)
-        max_width = max(coord_width, speed_width)
-        total_height = coord_height + speed_height + 5
-
-        # 绘制背景
-        cv2.rectangle(preview_frame,
-                      (10, 10),
-                      (20 + max_width, 20 + total_height),
-                      bg_color, -1)
-
-        # 绘制坐标行
-        cv2.putText(preview_frame, coord_line,
-                    (20, 20 + coord_height),
-                    cv2.FONT_HERSHEY_SIMPLEX, text_scale,
-                    text_color, text_thickness)
-
-        # 绘制速度行
-        cv2.putText(preview_frame, speed_line,
-                    (20, 20 + coord_height + 5 + speed_height),
-                    cv2.FONT_HERSHEY_SIMPLEX, text_scale,
-                    text_color, text_thickness)
-
-        # 绘制轨迹
-        for i in range(10):
-            idx = num - i
-            if idx >= 0 and ball_track[idx][0]:
-                color = (0, 0, 255) if i == 0 else (0, 255, 0)
-                cv2.circle(preview_frame,
-                           (int(ball_track[idx][0]), int(ball_track[idx][1])),
-                           radius=3, color=color, thickness=-1)
-
-        # 显示预览
-        # cv2.imshow("Processing Preview", cv2.resize(preview_frame, (orig_width, orig_height)))
-        output_video.append(preview_frame)
-
-        if cv2.waitKey(1) == 27:
-            break
-
-    cv2.destroyAllWindows()
+    ball_track = []
+    dists = []
+    output_video = list(track_frames(frames, model, fps, ball_track, dists, batch_size, postprocess_mode))
     return ball_track, dists, output_video
 
 
@@ -273,49 +377,130 @@ def interpolation(coords):
 def write_track(frames, ball_track, path_output_video, fps, trace=7):
     """ Write .avi file with detected ball tracks
     :params
-        frames: list of original video frames
+        frames: list (or stream) of processed video frames, written as they arrive
         ball_track: list of ball coordinates
         path_output_video: path to output video
         fps: frames per second
         trace: number of frames with detected trace
     """
-    height, width = frames[0].shape[:2]
-    fourcc = cv2.VideoWriter_fourcc(*'avc1')  # 或者尝试 *'h264'/*'X264'
-    out = cv2.VideoWriter(path_output_video, fourcc, fps, (width, height))
-
+    out = None
     for frame in frames:
+        if out is None:
+            height, width = frame.shape[:2]
+            fourcc = cv2.VideoWriter_fourcc(*'avc1')  # 或者尝试 *'h264'/*'X264'
+            out = cv2.VideoWriter(path_output_video, fourcc, fps, (width, height))
         out.write(frame)
-    out.release()
+    if out is not None:
+        out.release()
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--batch_size', type=int, default=2, help='batch size')
-    parser.add_argument('--model_path', type=str, help='path to model')
-    parser.add_argument('--video_path', type=str, help='path to input video')
-    parser.add_argument('--video_out_path', type=str, help='path to output video')
-    parser.add_argument('--extrapolation', action='store_true', help='whether to use ball track extrapolation')
-    args = parser.parse_args()
-
+def load_model(model_path, device='cuda'):
+    """ Load pretrained BallTrackerNet once so it can be reused across videos
+    :params
+        model_path: path to model weights
+        device: torch device
+    :return
+        model: model in eval mode on the target device
+    """
     model = BallTrackerNet()
-    device = 'cuda'
-    model.load_state_dict(torch.load(args.model_path, map_location=device))
+    model.load_state_dict(torch.load(model_path, map_location=device))
     model = model.to(device)
     model.eval()
+    return model
+
+
+def _report_progress(frames, progress):
+    """ Call progress(number of frames read) while iterating frames """
+    for num, frame in enumerate(frames, 1):
+        yield frame
+        progress(num)
+
 
-    frames, fps = read_video(args.video_path)
-    ball_track, dists, processed_frames = infer_model(frames, model, fps)
+def track_video(model, video_path, video_out_path, csv_dir=None, extrapolation=False, streaming=True,
+                batch_size=1, postprocess_mode='centroid', record_heatmaps=None, progress=None):
+    """ Run the full ball tracking flow on one video with an already loaded model
+    :params
+        model: pretrained model returned by load_model
+        video_path: path to input video
+        video_out_path: path to output video
+        csv_dir: directory of the ball track CSV file
+        extrapolation: whether to use ball track extrapolation
+        streaming: write processed frames while decoding, memory stays constant
+        batch_size: number of triplets per forward pass
+        postprocess_mode: 'centroid' or 'hough'
+        record_heatmaps: optional list collecting the raw argmax maps
+        progress: optional callback, called with the number of frames processed so far (streaming only)
+    :return
+        ball_track: list of ball points
+    """
+    if streaming:
+        frames, fps = iter_video(video_path)
+        if progress is not None:
+            frames = _report_progress(frames, progress)
+        ball_track, dists = [], []
+        processed_frames = track_frames(frames, model, fps, ball_track, dists, batch_size, postprocess_mode,
+                                        record_heatmaps)
+        write_track(processed_frames, ball_track, video_out_path, fps)
+    else:
+        frames, fps = read_video(video_path)
+        ball_track, dists, processed_frames = infer_model(frames, model, fps, batch_size, postprocess_mode)
     # 保存轨迹和速度数据到CSV文件
-    save_track_to_csv(ball_track, dists, args.video_path, fps)
+    save_track_to_csv(ball_track, dists, video_path, fps, csv_dir)
 
     ball_track = remove_outliers(ball_track, dists)
 
-    if args.extrapolation:
+    if extrapolation:
         subtracks = split_track(ball_track)
         for r in subtracks:
             ball_subtrack = ball_track[r[0]:r[1]]
             ball_subtrack = interpolation(ball_subtrack)
             ball_track[r[0]:r[1]] = ball_subtrack
 
+    if not streaming:
+        write_track(processed_frames, ball_track, video_out_path, fps)
+    return ball_track
+
+
+def track_videos(model, video_paths, output_dir, csv_dir=None, **kwargs):
+    """ Run ball tracking on several videos with one loaded model
+    :params
+        model: pretrained model returned by load_model
+        video_paths: list of input video paths
+        output_dir: directory of the output videos, each named after its input
+        csv_dir: directory of the ball track CSV files
+        kwargs: passed to track_video
+    :return
+        tracks: dict of video path -> list of ball points
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    tracks = {}
+    for video_path in video_paths:
+        video_out_path = str(Path(output_dir) / Path(video_path).name)
+        tracks[video_path] = track_video(model, video_path, video_out_path, csv_dir=csv_dir, **kwargs)
+    return tracks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=2, help='batch size')
+    parser.add_argument('--model_path', type=str, help='path to model')
+    parser.add_argument('--video_path', type=str, nargs='+', help='path to input video, several paths are processed '
+                                                                  'as a batch with one loaded model')
+    parser.add_argument('--video_out_path', type=str, help='path to output video (output directory for a batch)')
+    parser.add_argument('--extrapolation', action='store_true', help='whether to use ball track extrapolation')
+    parser.add_argument('--in_memory', action='store_true', help='load the whole video into memory before tracking')
+    parser.add_argument('--postprocess', type=str, default='centroid', choices=['centroid', 'hough'],
+                        help='heatmap postprocess mode')
+    parser.add_argument('--record_heatmaps', type=str, default='', help='save raw argmax maps to this .npy file')
+    args = parser.parse_args()
 
-    write_track(processed_frames, ball_track, args.video_out_path, fps)
\ No newline at end of file
+    model = load_model(args.model_path, device='cuda')
+    heatmaps = [] if args.record_heatmaps else None
+    options = dict(extrapolation=args.extrapolation, streaming=not args.in_memory, batch_size=args.batch_size,
+                   postprocess_mode=args.postprocess, record_heatmaps=heatmaps)
+    if len(args.video_path) == 1:
+        track_video(model, args.video_path[0], args.video_out_path, **options)
+    else:
+        track_videos(model, args.video_path, args.video_out_path, **options)
+    if heatmaps:
+        np.save(args.record_heatmaps, np.concatenate(heatmaps))
@@ -112,3 +112,132 @@ def postprocess(feature_map, scale_x, scale_y):
 
 
 
+
+
+def _binary_heatmaps(feature_maps):
+    """与 postprocess 完全一致的二值化，不修改输入
+
+    postprocess 中 argmax 值 v（0~255）乘 255 后按 uint8 截断得到 (256 - v) % 256，
+    阈值 127 之上即 1 <= v <= 128，这里直接比较，避免生成整批 int64 临时数组。
+    """
+    return (feature_maps >= 1) & (feature_maps <= 128)
+
+
+def _component_center(mask, min_area, height=360, width=640):
+    """连通域回退：取面积最大的连通域质心"""
+    num, _, stats, centroids = cv2.connectedComponentsWithStats(
+        mask.reshape((height, width)).astype(np.uint8), connectivity=8)
+    if num <= 1:
+        return None, None
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    best = int(np.argmax(areas))
+    if areas[best] < min_area:
+        return None, None
+    cx, cy = centroids[best + 1]
+    return cx, cy
+
+
+def postprocess_batch(feature_maps, scale_x, scale_y, mode='centroid', min_area=4, max_spread=7.0):
+    """批量后处理：(N, 360*640) 的 argmax 输出 -> N 个球心坐标
+
+    centroid 模式：整批一次性阈值化，取出全部前景像素后按帧号 np.bincount 聚合，求出每帧前景像素的数量、质心与分布标准差；
+    前景只有一个紧凑光斑（标准差不超过 max_spread）的帧直接取质心，
+    分布分散（可能存在多个光斑）的帧再逐帧做连通域分析，取面积最大者。
+    hough 模式：逐帧调用原有 postprocess（HoughCircles），作为精度对照与回退。
+    :params
+        feature_maps: array of shape (N, 360*640)，建议为 uint8 以减少内存带宽
+        scale_x, scale_y: 坐标缩放比例（标量或长度为 N 的数组）
+        mode: 'centroid' 或 'hough'
+        min_area: 前景像素少于该值视为未检测到
+        max_spread: 单个光斑允许的最大坐标标准差（像素）
+    :return
+        list of (x, y)，未检测到时为 (None, None)
+    """
+    height, width = 360, 640
+    feature_maps = np.asarray(feature_maps).reshape((-1, height * width))
+    n = len(feature_maps)
+    scale_x = np.broadcast_to(np.asarray(scale_x, dtype=np.float64), (n,))
+    scale_y = np.broadcast_to(np.asarray(scale_y, dtype=np.float64), (n,))
+
+    if mode == 'hough':
+        return [postprocess(feature_maps[i].copy(), scale_x[i], scale_y[i]) for i in range(n)]
+    if mode != 'centroid':
+        raise ValueError(f"unknown postprocess mode: {mode}")
+
+    masks = _binary_heatmaps(feature_maps)
+
+    # 前景像素通常很稀疏：取出全部前景的 (帧号, 像素号) 后按帧号聚合
+    flat = np.flatnonzero(masks)
+    frame_ids, pixels = np.divmod(flat, height * width)
+    cols = (pixels % width).astype(np.float64)
+    rows = (pixels // width).astype(np.float64)
+
+    counts = np.bincount(frame_ids, minlength=n).astype(np.float64)
+    safe = np.maximum(counts, 1)
+    cx = np.bincount(frame_ids, weights=cols, minlength=n) / safe
+    cy = np.bincount(frame_ids, weights=rows, minlength=n) / safe
+    var_x = np.bincount(frame_ids, weights=cols * cols, minlength=n) / safe - cx * cx
+    var_y = np.bincount(frame_ids, weights=rows * rows, minlength=n) / safe - cy * cy
+    spread = np.sqrt(np.maximum(np.maximum(var_x, var_y), 0))
+
+    results = []
+    for i in range(n):
+        if counts[i] < min_area:
+            results.append((None, None))
+            continue
+        x, y = cx[i], cy[i]
+        if spread[i] > max_spread:
+            x, y = _component_center(masks[i], min_area, height, width)
+            if x is None:
+                results.append((None, None))
+                continue
+        results.append((x * scale_x[i], y * scale_y[i]))
+    return results
+
+
+def compare_postprocess(feature_maps, tolerance=2.0, **kwargs):
+    """在录制的热图上对比 centroid 与 hough 两种后处理
+
+    :params
+        feature_maps: array of shape (N, 360*640)
+        tolerance: 两种方式坐标差小于该值（像素）视为一致
+    :return
+        dict: 帧数、检测一致/不一致帧数、一致帧的平均与最大坐标误差
+    """
+    hough = postprocess_batch(feature_maps, 1, 1, mode='hough')
+    centroid = postprocess_batch(feature_maps, 1, 1, mode='centroid', **kwargs)
+
+    errors = []
+    detection_mismatch = 0
+    position_mismatch = 0
+    for (hx, hy), (cx, cy) in zip(hough, centroid):
+        if (hx is None) != (cx is None):
+            detection_mismatch += 1
+        elif hx is not None:
+            err = distance.euclidean((hx, hy), (cx, cy))
+            errors.append(err)
+            if err > tolerance:
+                position_mismatch += 1
+
+    total = len(hough)
+    return {
+        'frames': total,
+        'detection_mismatch': detection_mismatch,
+        'position_mismatch': position_mismatch,
+        'agreement': (total - detection_mismatch - position_mismatch) / total if total else 1.0,
+        'mean_error': float(np.mean(errors)) if errors else 0.0,
+        'max_error': float(np.max(errors)) if errors else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='对比 centroid 与 hough 后处理')
+    parser.add_argument('heatmaps', type=str, help='录制的热图 .npy 文件（ball_detect.py --record_heatmaps 生成）')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='坐标一致的像素阈值')
+    args = parser.parse_args()
+
+    report = compare_postprocess(np.load(args.heatmaps), tolerance=args.tolerance)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
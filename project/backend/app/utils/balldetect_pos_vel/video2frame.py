@@ -1,9 +1,151 @@
 import os
+import queue
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import argparse
 
 
-def extract_frames(video_path, output_dir, frame_interval=1):
+_END = object()
+
+
+def _encode_jpeg(frame, quality=95, scale=None):
+    """编码单帧为JPEG（可选缩放），返回字节数据"""
+    if scale is not None and scale != 1:
+        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise IOError("帧编码失败")
+    return buf.tobytes()
+
+
+def encode_frames(frames, frame_interval=1, quality=95, scale=None, workers=1, queue_size=None):
+    """
+    按指定间隔编码帧流为JPEG，按帧顺序逐个返回 (帧号, JPEG数据)
+
+    workers > 1 时并行编码：解码线程把帧放入有界队列，编码线程池并行编码
+    （cv2 编码时释放 GIL），结果按帧号顺序返回；队列与在途任务数有上限，内存占用与视频长度无关。
+
+    参数：
+    frames: 帧的可迭代对象（BGR）
+    frame_interval: 帧间隔（每多少帧保存一帧）
+    quality: JPEG 质量（0-100）
+    scale: 缩放比例（如 0.5），None 表示原尺寸
+    workers: 编码线程数
+    queue_size: 解码队列长度（默认 workers 的 4 倍）
+    """
+    if workers <= 1:
+        for frame_count, frame in enumerate(frames):
+            if frame_count % frame_interval == 0:
+                yield frame_count, _encode_jpeg(frame, quality, scale)
+        return
+
+    queue_size = queue_size or workers * 4
+    decoded = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def decode():
+        try:
+            for frame_count, frame in enumerate(frames):
+                if stop.is_set():
+                    break
+                if frame_count % frame_interval == 0:
+                    decoded.put((frame_count, frame))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            decoded.put(_END)
+
+    decoder = threading.Thread(target=decode, name='frame-decoder', daemon=True)
+    decoder.start()
+    pending = collections.deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='frame-encoder') as pool:
+            while True:
+                item = decoded.get()
+                if item is _END:
+                    break
+                frame_count, frame = item
+                pending.append((frame_count, pool.submit(_encode_jpeg, frame, quality, scale)))
+                # 在途任务达到上限时先按顺序取出最早的结果
+                while len(pending) >= queue_size:
+                    frame_count, future = pending.popleft()
+                    yield frame_count, future.result()
+            while pending:
+                frame_count, future = pending.popleft()
+                yield frame_count, future.result()
+    finally:
+        stop.set()
+        # 消费者提前退出时清空队列，确保解码线程能够结束
+        while decoder.is_alive():
+            try:
+                decoded.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        decoder.join()
+    if errors:
+        raise errors[0]
+
+
+def write_frames(frames, output_dir, video_name, frame_interval=1, quality=95, scale=None, workers=1):
+    """
+    将帧流按指定间隔写为JPEG文件（文件名：视频名_帧号.jpg）
+
+    参数：
+    frames: 帧的可迭代对象（BGR）
+    output_dir: 输出目录路径
+    video_name: 文件名前缀
+    frame_interval: 帧间隔（每多少帧保存一帧）
+    quality: JPEG 质量（0-100）
+    scale: 缩放比例，None 表示原尺寸
+    workers: 并行编码线程数（文件名只取决于帧号，与并行度无关）
+    返回：(处理帧数, 保存帧数)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    counter = _CountingIterator(frames)
+    saved_count = 0
+    for frame_count, data in encode_frames(counter, frame_interval, quality, scale, workers):
+        # 生成文件名：视频名_帧号.jpg
+        output_path = os.path.join(
+            output_dir,
+            f"{video_name}_{frame_count:06d}.jpg"
+        )
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        saved_count += 1
+
+    return counter.count, saved_count
+
+
+class _CountingIterator:
+    """统计已读取帧数的迭代器包装"""
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        frame = next(self._frames)
+        self.count += 1
+        return frame
+
+
+def read_frames(cap):
+    """逐帧读取已打开的视频"""
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+
+
+def extract_frames(video_path, output_dir, frame_interval=1, quality=95, scale=None, workers=1):
     """
     从视频中按指定间隔提取帧
 
@@ -11,6 +153,9 @@ def extract_frames(video_path, output_dir, frame_interval=1):
     video_path: 视频文件路径
     output_dir: 输出目录路径
     frame_interval: 帧间隔（每多少帧保存一帧）
+    quality: JPEG 质量（0-100）
+    scale: 缩放比例，None 表示原尺寸
+    workers: 并行编码线程数（1 为串行）
     """
     try:
         # 验证输入路径
@@ -26,8 +171,6 @@ def extract_frames(video_path, output_dir, frame_interval=1):
             raise IOError(f"无法打开视频文件: {video_path}")
 
         # 获取视频基本信息
-        frame_count = 0
-        saved_count = 0
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         video_name = os.path.splitext(os.path.basename(video_path))[0]
@@ -36,24 +179,12 @@ def extract_frames(video_path, output_dir, frame_interval=1):
         print(f"├─ 视频路径: {video_path}")
         print(f"├─ 输出目录: {output_dir}")
         print(f"├─ 总帧数: {total_frames}")
-        print(f"└─ 帧间隔: {frame_interval}")
+        print(f"├─ 帧间隔: {frame_interval}")
+        print(f"└─ 编码线程: {workers}")
 
         # 逐帧处理
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if frame_count % frame_interval == 0:
-                # 生成文件名：视频名_帧号.jpg
-                output_path = os.path.join(
-                    output_dir,
-                    f"{video_name}_{frame_count:06d}.jpg"
-                )
-                cv2.imwrite(output_path, frame)
-                saved_count += 1
-
-            frame_count += 1
+        frame_count, saved_count = write_frames(read_frames(cap), output_dir, video_name, frame_interval,
+                                                quality=quality, scale=scale, workers=workers)
 
         # 释放资源
         cap.release()
@@ -71,25 +202,44 @@ def extract_frames(video_path, output_dir, frame_interval=1):
         return False
 
 
+def extract_frames_batch(video_paths, output_root, frame_interval=1, quality=95, scale=None, workers=1):
+    """
+    批量提取多个视频的帧，每个视频写入 output_root/<视频名>/
+
+    返回：{视频路径: 是否成功}
+    """
+    results = {}
+    for video_path in video_paths:
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        results[video_path] = extract_frames(video_path, os.path.join(output_root, video_name), frame_interval,
+                                             quality=quality, scale=scale, workers=workers)
+    return results
+
+
 if __name__ == "__main__":
     # 配置命令行参数
     parser = argparse.ArgumentParser(description='视频帧提取工具')
-    parser.add_argument('--video_path', type=str, required=True, help='输入视频路径')
-    parser.add_argument('--output_dir', type=str, required=True, help='输出目录路径')
+    parser.add_argument('--video_path', type=str, nargs='+', required=True, help='输入视频路径（可传入多个）')
+    parser.add_argument('--output_dir', type=str, required=True,
+                        help='输出目录路径（多个视频时为根目录，每个视频写入其下的同名子目录）')
     parser.add_argument('--frame_interval', type=int, default=1, help='帧间隔（默认：1）')
+    parser.add_argument('--quality', type=int, default=95, help='JPEG质量（默认：95）')
+    parser.add_argument('--scale', type=float, default=None, help='缩放比例（如 0.5，默认原尺寸）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行编码线程数（默认：CPU核数）')
 
     args = parser.parse_args()
 
     # 转换为绝对路径
-    video_path = os.path.abspath(args.video_path)
+    video_paths = [os.path.abspath(path) for path in args.video_path]
     output_dir = os.path.abspath(args.output_dir)
+    options = dict(frame_interval=args.frame_interval, quality=args.quality, scale=args.scale,
+                   workers=args.workers)
 
     # 执行帧提取
-    success = extract_frames(
-        video_path=video_path,
-        output_dir=output_dir,
-        frame_interval=args.frame_interval
-    )
+    if len(video_paths) == 1:
+        success = extract_frames(video_path=video_paths[0], output_dir=output_dir, **options)
+    else:
+        success = all(extract_frames_batch(video_paths, output_dir, **options).values())
 
     # 退出码处理
-    exit(0 if success else 1)
\ No newline at end of file
+    exit(0 if success else 1)
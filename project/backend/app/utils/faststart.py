@@ -0,0 +1,135 @@
+# faststart.py
+# MP4 faststart：OpenCV 写出的 MP4 把 moov（索引）放在文件末尾，浏览器要下载大部分文件才能开始播放。
+# 这里把 moov 移到 mdat（媒体数据）之前并修正其中的块偏移（stco/co64），只重排原子、不重新编码。
+#
+# 用法（为已有视频补做）：python faststart.py video1.mp4 video2.mp4 ...
+
+import os
+import struct
+
+# moov 中需要向下查找 stco/co64 的容器原子
+_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+
+def _top_level_atoms(f, file_size):
+    """顶层原子列表 [(类型, 偏移, 大小)]"""
+    atoms = []
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        size, kind = struct.unpack('>I4s', f.read(8))
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8:
+            raise ValueError(f"MP4 原子大小无效: {kind!r}@{offset}")
+        atoms.append((kind, offset, size))
+        offset += size
+    return atoms
+
+
+def _patch_chunk_offsets(moov, delta):
+    """moov 内所有 stco/co64 的块偏移加 delta（原地修改 bytearray）"""
+    def walk(start, end):
+        pos = start
+        while pos + 8 <= end:
+            size, kind = struct.unpack_from('>I4s', moov, pos)
+            header = 8
+            if size == 1:
+                size = struct.unpack_from('>Q', moov, pos + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - pos
+            if size < header:
+                raise ValueError(f"MP4 原子大小无效: {kind!r}")
+            if kind in _CONTAINERS:
+                walk(pos + header, pos + size)
+            elif kind in (b'stco', b'co64'):
+                count = struct.unpack_from('>I', moov, pos + header + 4)[0]
+                table = pos + header + 8
+                if kind == b'stco':
+                    offsets = struct.unpack_from(f'>{count}I', moov, table)
+                    if offsets and max(offsets) + delta > 0xFFFFFFFF:
+                        raise OverflowError("块偏移超出 32 位，需要 co64")
+                    struct.pack_into(f'>{count}I', moov, table, *(o + delta for o in offsets))
+                else:
+                    offsets = struct.unpack_from(f'>{count}Q', moov, table)
+                    struct.pack_into(f'>{count}Q', moov, table, *(o + delta for o in offsets))
+            pos += size
+
+    walk(0, len(moov))
+
+
+def _copy_range(src, dst, offset, size, chunk=8 * 2 ** 20):
+    src.seek(offset)
+    while size > 0:
+        data = src.read(min(chunk, size))
+        if not data:
+            raise IOError("MP4 文件被截断")
+        dst.write(data)
+        size -= len(data)
+
+
+def faststart(path):
+    """把 MP4 的 moov 移到文件开头（原子替换原文件）
+
+    返回是否改写；已是 faststart、不是 MP4 或结构不支持（如压缩的 moov）时不改动。
+    """
+    path = str(path)
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as src:
+        try:
+            atoms = _top_level_atoms(src, file_size)
+        except (ValueError, struct.error):
+            return False
+        kinds = [kind for kind, _, _ in atoms]
+        if b'moov' not in kinds or b'mdat' not in kinds:
+            return False
+        moov_index = kinds.index(b'moov')
+        mdat_index = kinds.index(b'mdat')
+        if moov_index < mdat_index:
+            return False
+
+        _, moov_offset, moov_size = atoms[moov_index]
+        src.seek(moov_offset)
+        moov = bytearray(src.read(moov_size))
+        if b'cmov' in moov[:64]:
+            return False
+        try:
+            # moov 插到第一个 mdat 之前，其后的媒体数据整体后移 moov_size 字节
+            _patch_chunk_offsets(moov, moov_size)
+        except (OverflowError, ValueError, struct.error) as e:
+            print(f"⚠️ 跳过 faststart（{e}）: {path}")
+            return False
+
+        tmp_path = f"{path}.faststart.tmp"
+        try:
+            with open(tmp_path, 'wb') as dst:
+                for index, (kind, offset, size) in enumerate(atoms):
+                    if index == mdat_index:
+                        dst.write(moov)
+                    if index != moov_index:
+                        _copy_range(src, dst, offset, size)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+    return True
+
+
+def faststart_safe(path):
+    """流水线中调用：失败只打印警告，不影响视频本身"""
+    try:
+        if os.path.exists(str(path)) and faststart(path):
+            print(f"✅ faststart 完成: {path}")
+    except Exception as e:
+        print(f"⚠️ faststart 失败: {path}: {e}")
+
+
+if __name__ == '__main__':
+    import sys
+
+    for video in sys.argv[1:]:
+        print(f"{video}: {'已改写' if faststart(video) else '无需改写'}")
@@ -0,0 +1,229 @@
+# frame_archive.py
+# 帧归档：一个视频的全部帧（JPEG）顺序拼接写入单个文件，文件尾部附偏移索引，
+# 读取任意一帧或连续一段帧只需一次定位读取，不再为每帧产生一个小文件。
+#
+# 文件布局（小端序）：
+#   b'PPFA' + uint32 版本号                    文件头（8 字节）
+#   JPEG_0 | JPEG_1 | ... | JPEG_{n-1}         帧数据
+#   n × (uint64 偏移, uint32 长度)             索引
+#   uint64 索引偏移 + uint32 帧数 + b'PPFA'    文件尾（16 字节）
+
+import os
+import struct
+import cv2
+import numpy as np
+
+ARCHIVE_SUFFIX = '.frames'
+MAGIC = b'PPFA'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sI')
+_FOOTER = struct.Struct('<QI4s')
+_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4')])
+
+
+def archive_path(base_path):
+    """帧目录路径 -> 对应的归档文件路径"""
+    return f"{base_path}{ARCHIVE_SUFFIX}"
+
+
+def _pread(fd, length, offset):
+    if hasattr(os, 'pread'):
+        return os.pread(fd, length, offset)
+    # Windows 没有 pread，退化为定位后读取
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, length)
+
+
+class FrameArchiveWriter:
+    """顺序写入帧归档
+
+    先写入临时文件，close() 时写入索引并原子替换目标文件，
+    中途失败不会留下半个归档。
+    """
+
+    def __init__(self, path, quality=95):
+        self.path = str(path)
+        self.quality = quality
+        self._tmp_path = f"{self.path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._offset = _HEADER.size
+        self._index = []
+
+    def __len__(self):
+        return len(self._index)
+
+    def append_bytes(self, data):
+        """追加一帧已编码的图片数据"""
+        length = memoryview(data).nbytes
+        self._file.write(data)
+        self._index.append((self._offset, length))
+        self._offset += length
+
+    def append(self, frame):
+        """编码并追加一帧（BGR）"""
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise IOError(f"帧编码失败: {self.path}")
+        self.append_bytes(buf)
+
+    def close(self):
+        index = np.array(self._index, dtype=_INDEX_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.write(_FOOTER.pack(self._offset, len(index), MAGIC))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class FrameArchive:
+    """帧归档读取"""
+
+    mime_type = 'image/jpeg'
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._fd = os.open(self.path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            size = os.fstat(self._fd).st_size
+            if size < _HEADER.size + _FOOTER.size:
+                raise IOError(f"帧归档已损坏: {self.path}")
+            magic, version = _HEADER.unpack(_pread(self._fd, _HEADER.size, 0))
+            index_offset, count, tail = _FOOTER.unpack(_pread(self._fd, _FOOTER.size, size - _FOOTER.size))
+            if magic != MAGIC or tail != MAGIC or version != VERSION:
+                raise IOError(f"不是有效的帧归档: {self.path}")
+            raw = _pread(self._fd, count * _INDEX_DTYPE.itemsize, index_offset)
+            self._index = np.frombuffer(raw, dtype=_INDEX_DTYPE)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def __len__(self):
+        return len(self._index)
+
+    def mime(self, index):
+        return self.mime_type
+
+    def read(self, index):
+        """读取第 index 帧（从0开始）的 JPEG 数据"""
+        offset, length = self._index[index]
+        return _pread(self._fd, int(length), int(offset))
+
+    def read_range(self, start, stop):
+        """一次读取 [start, stop) 范围内的连续帧，返回 JPEG 数据列表"""
+        stop = min(stop, len(self._index))
+        if start >= stop:
+            return []
+        entries = self._index[start:stop]
+        base = int(entries['offset'][0])
+        end = int(entries['offset'][-1]) + int(entries['length'][-1])
+        block = memoryview(_pread(self._fd, end - base, base))
+        return [bytes(block[int(offset) - base:int(offset) - base + int(length)]) for offset, length in entries]
+
+    def iter_range(self, start=0, stop=None, chunk=64):
+        """按块读取 [start, stop) 范围内的帧，逐帧返回"""
+        stop = len(self._index) if stop is None else min(stop, len(self._index))
+        for begin in range(start, stop, chunk):
+            yield from self.read_range(begin, min(begin + chunk, stop))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameDirectory:
+    """旧版逐帧文件目录，提供与 FrameArchive 相同的读取接口"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.files = sorted([
+            f for f in os.listdir(self.path)
+            if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+        ])
+
+    def __len__(self):
+        return len(self.files)
+
+    def mime(self, index):
+        return 'image/jpeg' if self.files[index].lower().endswith(('.jpg', '.jpeg')) else 'image/png'
+
+    def read(self, index):
+        with open(os.path.join(self.path, self.files[index]), 'rb') as f:
+            return f.read()
+
+    def read_range(self, start, stop):
+        return [self.read(index) for index in range(start, min(stop, len(self.files)))]
+
+    def iter_range(self, start=0, stop=None, chunk=64):
+        stop = len(self.files) if stop is None else min(stop, len(self.files))
+        for index in range(start, stop):
+            yield self.read(index)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_frames(base_path):
+    """打开帧存储：优先使用归档文件，其次旧版帧目录；都不存在时返回 None"""
+    path = archive_path(base_path)
+    if os.path.exists(path):
+        return FrameArchive(path)
+    if os.path.isdir(base_path):
+        return FrameDirectory(base_path)
+    return None
+
+
+def write_frame_archive(frames, path, frame_interval=1, quality=95, scale=None, workers=1):
+    """帧流按指定间隔写入归档（workers > 1 时多线程并行编码），返回 (处理帧数, 保存帧数)"""
+    from .balldetect_pos_vel.video2frame import encode_frames
+
+    frame_count = 0
+
+    def counted():
+        nonlocal frame_count
+        for frame in frames:
+            frame_count += 1
+            yield frame
+
+    with FrameArchiveWriter(path, quality=quality) as writer:
+        for _, data in encode_frames(counted(), frame_interval, quality, scale, workers):
+            writer.append_bytes(data)
+        saved_count = len(writer)
+    return frame_count, saved_count
+
+
+def count_frames(path):
+    """帧存储中的帧数（归档文件或旧版帧目录）"""
+    path = str(path)
+    if path.endswith(ARCHIVE_SUFFIX):
+        with FrameArchive(path) as archive:
+            return len(archive)
+    return len(FrameDirectory(path))
@@ -0,0 +1,221 @@
+# frame_cache.py
+# 按需抽帧：帧接口请求某一帧时才从处理视频/骨骼视频中解码（从最近关键帧定位），
+# 编码后的 JPEG 放入有容量上限的 LRU 缓存（内存 + 磁盘），流水线不再预先导出全部帧。
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import cv2
+from ..config import BaseConfig
+
+
+class FrameCache:
+    """两级 LRU 帧缓存
+
+    内存层与磁盘层各有字节数上限，超出时淘汰最久未访问的帧。
+    磁盘层目录结构：<cache_dir>/<视频路径摘要>/<视频修改时间>_<帧序号>.jpg，
+    视频文件被重新生成（修改时间变化）后旧缓存自然失效。
+    """
+
+    def __init__(self, cache_dir, memory_bytes, disk_bytes):
+        self.cache_dir = str(cache_dir)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_size = 0
+        self._disk = None  # path -> size，首次使用时扫描磁盘建立
+        self._disk_size = 0
+
+    @staticmethod
+    def video_key(video_path):
+        return hashlib.sha1(os.path.abspath(str(video_path)).encode('utf-8')).hexdigest()[:16]
+
+    def _disk_path(self, key):
+        video_key, name = key
+        return os.path.join(self.cache_dir, video_key, f"{name}.jpg")
+
+    def _load_disk_index(self):
+        if self._disk is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self._disk = OrderedDict((path, size) for _, path, size in entries)
+        self._disk_size = sum(self._disk.values())
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+            if self.disk_bytes <= 0:
+                return None
+            self._load_disk_index()
+            path = self._disk_path(key)
+            if path not in self._disk:
+                return None
+            self._disk.move_to_end(path)
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(path, 0)
+            return None
+
+        with self._lock:
+            self._put_memory(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._put_memory(key, data)
+            if self.disk_bytes <= 0:
+                return
+            self._load_disk_index()
+            path = self._disk_path(key)
+            if path in self._disk:
+                return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if path not in self._disk:
+                self._disk[path] = len(data)
+                self._disk_size += len(data)
+            evicted = []
+            while self._disk_size > self.disk_bytes and self._disk:
+                old_path, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                evicted.append(old_path)
+        for old_path in evicted:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def _put_memory(self, key, data):
+        if key in self._memory or len(data) > self.memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def discard_video(self, video_path):
+        """删除某个视频的全部缓存帧（删除视频时调用）"""
+        video_key = self.video_key(video_path)
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == video_key]:
+                self._memory_size -= len(self._memory.pop(key))
+            if self._disk is not None:
+                prefix = os.path.join(self.cache_dir, video_key) + os.sep
+                for path in [path for path in self._disk if path.startswith(prefix)]:
+                    self._disk_size -= self._disk.pop(path)
+        shutil.rmtree(os.path.join(self.cache_dir, video_key), ignore_errors=True)
+
+
+class LazyVideoFrames:
+    """从视频按需解码帧，提供与 FrameArchive 相同的读取接口
+
+    随机访问时从目标帧之前最近的关键帧定位后解码；请求的帧位于当前解码位置之后不远处时
+    直接向前读取，连续范围只定位一次。
+    """
+
+    mime_type = 'image/jpeg'
+
+    def __init__(self, video_path, cache=None, quality=95, seek_threshold=None):
+        self.video_path = str(video_path)
+        self.cache = cache
+        self.quality = quality
+        self.seek_threshold = BaseConfig.FRAME_SEEK_THRESHOLD if seek_threshold is None else seek_threshold
+
+        self._cap = cv2.VideoCapture(self.video_path)
+        if not self._cap.isOpened():
+            raise IOError(f"无法打开视频文件: {self.video_path}")
+        self._total = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._next = 0
+        self._video_key = FrameCache.video_key(self.video_path)
+        self._version = os.stat(self.video_path).st_mtime_ns
+
+    def __len__(self):
+        return self._total
+
+    def mime(self, index):
+        return self.mime_type
+
+    def _decode(self, index):
+        if index != self._next:
+            if index < self._next or index - self._next > self.seek_threshold:
+                # 定位到目标帧（解码器从之前最近的关键帧开始解码）
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            else:
+                for _ in range(index - self._next):
+                    self._cap.grab()
+            self._next = index
+        ok, frame = self._cap.read()
+        if not ok:
+            raise IndexError(f"帧不存在: {self.video_path}#{index}")
+        self._next = index + 1
+        return frame
+
+    def read(self, index):
+        """读取第 index 帧（从0开始）的 JPEG 数据"""
+        if not 0 <= index < self._total:
+            raise IndexError(f"帧不存在: {self.video_path}#{index}")
+        key = (self._video_key, f"{self._version}_{index}")
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            ok, buf = cv2.imencode('.jpg', self._decode(index), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                raise IOError(f"帧编码失败: {self.video_path}#{index}")
+            data = buf.tobytes()
+            if self.cache is not None:
+                self.cache.put(key, data)
+        return data
+
+    def read_range(self, start, stop):
+        return list(self.iter_range(start, stop))
+
+    def iter_range(self, start=0, stop=None, chunk=64):
+        stop = self._total if stop is None else min(stop, self._total)
+        for index in range(start, stop):
+            yield self.read(index)
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+frame_cache = FrameCache(
+    BaseConfig.FRAME_CACHE_DIR,
+    memory_bytes=BaseConfig.FRAME_CACHE_MEMORY_MB * 2 ** 20,
+    disk_bytes=BaseConfig.FRAME_CACHE_DISK_MB * 2 ** 20
+)
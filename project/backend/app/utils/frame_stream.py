@@ -0,0 +1,138 @@
+# frame_stream.py
+# 共享帧流：上传视频只解码一次，解码后的帧通过有界队列分发给多个消费者
+# （球检测、缩略帧写入、骨骼检测、动作片段构建等），避免各阶段重复读盘解码。
+
+import queue
+import threading
+import cv2
+
+_END = object()
+
+
+class VideoFrameSource:
+    """单次解码的视频帧源（BGR）
+
+    只能迭代一次；需要多个消费者时配合 broadcast 使用。
+    """
+
+    def __init__(self, video_path):
+        self.video_path = str(video_path)
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            raise IOError(f"无法打开视频文件: {self.video_path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._consumed = False
+
+    def __iter__(self):
+        if self._consumed:
+            raise RuntimeError(f"帧源只能读取一次: {self.video_path}")
+        self._consumed = True
+        try:
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            self.release()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class _QueueIterator:
+    """消费者一侧的帧迭代器"""
+
+    def __init__(self, q):
+        self._queue = q
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            yield item
+
+
+def broadcast(frames, consumers, maxsize=32):
+    """将一个帧流分发给多个消费者
+
+    每个消费者在独立线程中运行，接收一个帧迭代器作为唯一参数；
+    生产者在当前线程迭代 frames，队列满时阻塞（背压），内存占用受 maxsize 限制。
+    某个消费者提前退出后不再向其投递帧，其余消费者不受影响。
+
+    参数：
+    frames: 帧的可迭代对象
+    consumers: 消费函数列表 fn(frames_iter) -> result
+    maxsize: 每个消费者队列的最大帧数
+    返回：各消费者的返回值列表（顺序与 consumers 一致）
+    """
+    queues = [queue.Queue(maxsize=maxsize) for _ in consumers]
+    results = [None] * len(consumers)
+    errors = [None] * len(consumers)
+
+    def run(idx, consumer):
+        try:
+            results[idx] = consumer(_QueueIterator(queues[idx]))
+        except BaseException as e:
+            errors[idx] = e
+
+    threads = [
+        threading.Thread(target=run, args=(idx, consumer), name=f"frame-consumer-{idx}", daemon=True)
+        for idx, consumer in enumerate(consumers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    def put(idx, item):
+        while threads[idx].is_alive():
+            try:
+                queues[idx].put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    try:
+        for frame in frames:
+            if not any(thread.is_alive() for thread in threads):
+                break
+            for idx in range(len(threads)):
+                put(idx, frame)
+    finally:
+        for idx in range(len(threads)):
+            put(idx, _END)
+        for thread in threads:
+            thread.join()
+
+    for error in errors:
+        if error is not None:
+            raise error
+    return results
+
+
+def write_video(frames, output_path, fps, fourcc='avc1'):
+    """帧流写入视频文件，尺寸取第一帧，返回写入帧数"""
+    writer = None
+    count = 0
+    try:
+        for frame in frames:
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(
+                    str(output_path),
+                    cv2.VideoWriter_fourcc(*fourcc),
+                    fps,
+                    (width, height)
+                )
+            writer.write(frame)
+            count += 1
+    finally:
+        if writer is not None:
+            writer.release()
+    return count
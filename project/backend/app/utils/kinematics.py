@@ -0,0 +1,297 @@
+# kinematics.py
+# 逐运动员运动学索引：骨骼检测完成后，在 (帧数, 人数, 17, 2) 关键点数组上向量化计算
+# 关节角度、手腕速度、重心位移与击球阶段划分。时间序列写入 kinematics_<stem>.npz，
+# 每名运动员的统计摘要写入 player_kinematics 表（同时存入 npz），
+# 报告与分析接口只读取这几 KB 数据，不再解析整个骨骼文件。
+#
+# npz 数组（F 为帧数，P 为运动员数，A 为关节角数量）：
+#   frame_ids    (F,)        int32    帧号（与骨骼结果一致，从1开始）
+#   track_ids    (P,)        int32    各运动员对应的 track_id（未跟踪时为 -1）
+#   angles       (F, P, A)   float32  关节角（度），angle_names 为各列名称
+#   wrist_speed  (F, P, 2)   float32  左/右手腕速度（像素/秒）
+#   com          (F, P, 2)   float32  重心（肩、髋四点均值）相对首个有效帧的位移（像素）
+#   com_speed    (F, P)      float32  重心速度（像素/秒）
+#   phase        (F, P)      int8     击球阶段，见 PHASE_NAMES
+#   strokes      (S, 4)      int32    [运动员, 起始行, 峰值行, 结束行]（行号为序列下标，结束不含）
+#   torso        (P,)        float32  躯干长度（像素，用于按身材归一化速度）
+#   fps          ()          float32
+#   summary      (n,)        uint8    各运动员摘要（UTF-8 JSON）
+# 缺失或置信度低于阈值的关键点为 NaN，依赖它们的指标也为 NaN。
+
+import json
+import os
+import warnings
+from contextlib import contextmanager
+import numpy as np
+from .mmpose.pose_store import PoseData
+
+KINEMATICS_SUFFIX = '.npz'
+
+# COCO-17 关节角：(端点, 顶点, 端点)
+ANGLES = {
+    'left_elbow': (5, 7, 9),
+    'right_elbow': (6, 8, 10),
+    'left_shoulder': (11, 5, 7),
+    'right_shoulder': (12, 6, 8),
+    'left_hip': (5, 11, 13),
+    'right_hip': (6, 12, 14),
+    'left_knee': (11, 13, 15),
+    'right_knee': (12, 14, 16),
+}
+WRISTS = (9, 10)
+TORSO = (5, 6, 11, 12)
+
+PHASE_NONE, PHASE_BACKSWING, PHASE_FORWARD, PHASE_FOLLOW = 0, 1, 2, 3
+PHASE_NAMES = ('none', 'backswing', 'forward_swing', 'follow_through')
+
+
+def kinematics_path(output_root, stem):
+    """运动学文件路径：<output_root>/kinematics_<stem>.npz"""
+    return os.path.join(str(output_root), f"kinematics_{stem}{KINEMATICS_SUFFIX}")
+
+
+def kinematics_path_for(pose_path):
+    """与骨骼结果文件（results_<stem>.npz/.json）同目录的运动学文件路径"""
+    stem = os.path.splitext(os.path.basename(str(pose_path)))[0]
+    if stem.startswith('results_'):
+        stem = stem[len('results_'):]
+    return kinematics_path(os.path.dirname(str(pose_path)), stem)
+
+
+def player_keypoints(pose, max_players=2, kpt_thr=0.3):
+    """按运动员排列的关键点 (F, P, K, 2)（低置信度点为 NaN）与各运动员的 track_id
+
+    有 track_id 时取出现帧数最多的 max_players 条轨迹；否则按每帧实例顺序（姿态估计
+    已按"像球员"程度排序）取前 max_players 个。
+    """
+    tracked = pose.track_ids >= 0
+    if tracked.any():
+        ids, counts = np.unique(pose.track_ids[tracked], return_counts=True)
+        track_ids = ids[np.argsort(-counts, kind='stable')][:max_players].astype(np.int32)
+        num_keypoints = pose.keypoints.shape[1]
+        keypoints = np.full((len(pose), len(track_ids), num_keypoints, 2), np.nan, dtype=np.float32)
+        scores = np.zeros((len(pose), len(track_ids), num_keypoints), dtype=np.float32)
+        frame_index = np.repeat(np.arange(len(pose)), np.diff(pose.frame_offsets))
+        for slot, track_id in enumerate(track_ids):
+            mask = pose.track_ids == track_id
+            keypoints[frame_index[mask], slot] = pose.keypoints[mask]
+            scores[frame_index[mask], slot] = pose.keypoint_scores[mask]
+    else:
+        keypoints, scores = pose.padded_keypoints(max_players)
+        track_ids = np.full(keypoints.shape[1], -1, dtype=np.int32)
+    keypoints[~(scores > kpt_thr)] = np.nan
+    return keypoints, track_ids
+
+
+def joint_angles(keypoints):
+    """关节角（度）：(..., K, 2) -> (..., len(ANGLES))"""
+    a, b, c = (np.array(index) for index in zip(*ANGLES.values()))
+    v1 = keypoints[..., a, :] - keypoints[..., b, :]
+    v2 = keypoints[..., c, :] - keypoints[..., b, :]
+    norm = np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos = np.sum(v1 * v2, axis=-1) / norm
+    return np.degrees(np.arccos(np.clip(cos, -1, 1))).astype(np.float32)
+
+
+def _speed(points, fps):
+    """沿帧轴的速度（像素/秒）；首帧为 NaN。points (F, ..., 2)"""
+    speed = np.full(points.shape[:-1], np.nan, dtype=np.float32)
+    speed[1:] = np.linalg.norm(np.diff(points, axis=0), axis=-1) * fps
+    return speed
+
+
+def _smooth(values, window):
+    """忽略 NaN 的滑动平均（一维）"""
+    if window <= 1:
+        return values
+    valid = ~np.isnan(values)
+    kernel = np.ones(window)
+    total = np.convolve(np.where(valid, values, 0), kernel, mode='same')
+    count = np.convolve(valid.astype(np.float64), kernel, mode='same')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def segment_strokes(speed, fps, threshold=1.0, min_speed=0.0, min_seconds=0.1, window=3):
+    """按持拍手腕速度划分击球，返回 (阶段序列 (F,), [(起始, 峰值, 结束), ...])
+
+    速度（平滑后）高于 max(中位数 + threshold × 标准差, min_speed) 的连续区间视为一次击球
+    （min_speed 避免静止时的关键点抖动被当作击球），短于 min_seconds 的区间忽略。区间内峰值（近似击球时刻）之前、速度首次达到峰值一半起
+    为挥拍（forward_swing），此前为引拍（backswing），峰值之后为随挥（follow_through）。
+    """
+    phase = np.zeros(len(speed), dtype=np.int8)
+    smoothed = _smooth(speed, window)
+    if np.isnan(smoothed).all():
+        return phase, []
+    limit = max(np.nanmedian(smoothed) + threshold * np.nanstd(smoothed), min_speed)
+    active = np.nan_to_num(smoothed, nan=-np.inf) > limit
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    strokes = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start < max(min_seconds * fps, 1):
+            continue
+        peak = start + int(np.argmax(smoothed[start:end]))
+        rising = np.flatnonzero(smoothed[start:peak + 1] < smoothed[peak] / 2)
+        forward = start + int(rising[-1]) + 1 if len(rising) else start
+        phase[start:forward] = PHASE_BACKSWING
+        phase[forward:peak + 1] = PHASE_FORWARD
+        phase[peak + 1:end] = PHASE_FOLLOW
+        strokes.append((int(start), peak, int(end)))
+    return phase, strokes
+
+
+def compute_kinematics(pose, fps, max_players=2, kpt_thr=0.3, min_stroke_speed=2.0):
+    """由骨骼结果计算全部运动学时间序列（数组含义见文件头）
+
+    min_stroke_speed 为击球的最低手腕速度（躯干长度/秒）。
+    """
+    fps = float(fps) if fps and fps > 0 else 25.0
+    keypoints, track_ids = player_keypoints(pose, max_players, kpt_thr)
+    torso = _torso_length(keypoints)
+
+    angles = joint_angles(keypoints)
+    wrist_speed = _speed(keypoints[:, :, list(WRISTS)], fps)
+    with np.errstate(invalid='ignore'), _quiet_nanmean():
+        center = np.nanmean(keypoints[:, :, list(TORSO)], axis=2)
+    com_speed = _speed(center, fps)
+    com = np.full_like(center, np.nan)
+    for slot in range(center.shape[1]):
+        valid = np.flatnonzero(~np.isnan(center[:, slot, 0]))
+        if len(valid):
+            com[:, slot] = center[:, slot] - center[valid[0], slot]
+
+    phase = np.zeros(keypoints.shape[:2], dtype=np.int8)
+    strokes = []
+    for slot in range(keypoints.shape[1]):
+        racket = _racket_wrist(wrist_speed[:, slot])
+        min_speed = min_stroke_speed * torso[slot] if not np.isnan(torso[slot]) else 0.0
+        phase[:, slot], player_strokes = segment_strokes(wrist_speed[:, slot, racket], fps,
+                                                         min_speed=min_speed)
+        strokes.extend((slot, *stroke) for stroke in player_strokes)
+
+    return {
+        'frame_ids': pose.frame_ids.astype(np.int32),
+        'track_ids': track_ids,
+        'angle_names': np.array(list(ANGLES)),
+        'angles': angles,
+        'wrist_speed': wrist_speed,
+        'com': com.astype(np.float32),
+        'com_speed': com_speed,
+        'phase': phase,
+        'strokes': np.array(strokes, dtype=np.int32).reshape(-1, 4),
+        'fps': np.float32(fps),
+        'torso': torso,
+    }
+
+
+@contextmanager
+def _quiet_nanmean():
+    """屏蔽全 NaN 切片的 RuntimeWarning（缺失帧是常态）"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        yield
+
+
+def _racket_wrist(wrist_speed):
+    """平均速度更高的手腕视为持拍手：0 左，1 右"""
+    with _quiet_nanmean():
+        mean = np.nanmean(wrist_speed, axis=0)
+    return int(np.nanargmax(mean)) if not np.isnan(mean).all() else 1
+
+
+def _torso_length(keypoints):
+    """各运动员躯干长度（肩中点到髋中点距离的中位数，像素）(P,)"""
+    shoulders = keypoints[:, :, [5, 6]].mean(axis=2)
+    hips = keypoints[:, :, [11, 12]].mean(axis=2)
+    with _quiet_nanmean():
+        return np.nanmedian(np.linalg.norm(shoulders - hips, axis=-1), axis=0).astype(np.float32)
+
+
+def _number(value, digits=2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def summarize(data):
+    """各运动员的统计摘要（可直接 JSON 序列化）"""
+    fps = float(data['fps'])
+    frame_ids = data['frame_ids'].tolist()
+    summaries = []
+    with _quiet_nanmean():
+        for slot, track_id in enumerate(data['track_ids'].tolist()):
+            wrist = data['wrist_speed'][:, slot]
+            racket = _racket_wrist(wrist)
+            racket_speed = wrist[:, racket]
+            torso = float(data['torso'][slot])
+            com = data['com'][:, slot]
+            strokes = [
+                {
+                    'start_frame': frame_ids[start],
+                    'peak_frame': frame_ids[peak],
+                    'end_frame': frame_ids[end - 1],
+                    'seconds': round((end - start) / fps, 2),
+                    'peak_speed': _number(racket_speed[peak], 1)
+                }
+                for player, start, peak, end in data['strokes'].tolist() if player == slot
+            ]
+            summaries.append({
+                'player': slot + 1,
+                'track_id': track_id,
+                'frames': int(np.sum(~np.isnan(com[:, 0]))),
+                'racket_wrist': 'left' if racket == 0 else 'right',
+                'torso_length': _number(torso, 1),
+                'max_wrist_speed': _number(np.nanmax(racket_speed), 1) if not np.isnan(racket_speed).all() else None,
+                'mean_wrist_speed': _number(np.nanmean(racket_speed), 1),
+                'max_wrist_speed_torso': _number(np.nanmax(racket_speed) / torso)
+                if torso > 0 and not np.isnan(racket_speed).all() else None,
+                'com_range': [_number(np.nanmax(com[:, axis]) - np.nanmin(com[:, axis]), 1)
+                              if not np.isnan(com[:, axis]).all() else None for axis in (0, 1)],
+                'mean_com_speed': _number(np.nanmean(data['com_speed'][:, slot]), 1),
+                'angles': {
+                    name: {
+                        'mean': _number(np.nanmean(data['angles'][:, slot, i]), 1),
+                        'min': _number(np.nanmin(data['angles'][:, slot, i]), 1),
+                        'max': _number(np.nanmax(data['angles'][:, slot, i]), 1)
+                    } if not np.isnan(data['angles'][:, slot, i]).all() else None
+                    for i, name in enumerate(data['angle_names'].tolist())
+                },
+                'stroke_count': len(strokes),
+                'mean_stroke_seconds': round(sum(s['seconds'] for s in strokes) / len(strokes), 2) if strokes else None,
+                'strokes': strokes
+            })
+    return summaries
+
+
+def write_kinematics(path, data, summaries):
+    """写入运动学文件（先写临时文件再替换）"""
+    path = str(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    summary = np.frombuffer(json.dumps(summaries, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+    tmp_path = f"{path}.tmp{KINEMATICS_SUFFIX}"
+    np.savez(tmp_path, summary=summary, **data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_kinematics(pose_path, output_path, fps, max_players=2):
+    """骨骼结果 -> 运动学文件，返回各运动员摘要"""
+    data = compute_kinematics(PoseData.load(pose_path), fps, max_players)
+    summaries = summarize(data)
+    write_kinematics(output_path, data, summaries)
+    return summaries
+
+
+def load_kinematics(path):
+    """读取运动学时间序列（不含摘要）"""
+    with np.load(str(path), allow_pickle=False) as data:
+        return {name: data[name] for name in data.files if name != 'summary'}
+
+
+def load_kinematics_summary(path):
+    """只读取摘要（np.load 按需解析，不读取时间序列）；文件不存在时返回 None"""
+    path = str(path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(data['summary'].tobytes().decode('utf-8'))
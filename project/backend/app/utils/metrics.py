@@ -0,0 +1,225 @@
+# metrics.py
+# 流水线阶段指标：记录每个视频每个阶段的耗时、CPU时间、峰值内存、处理帧数与帧率，
+# 写入数据库（跨版本对比）并在进程内汇总，供 /api/metrics 以 Prometheus 文本格式导出。
+
+import threading
+import time
+from contextlib import contextmanager
+import cv2
+from sqlalchemy.exc import SQLAlchemyError
+from ..config import BaseConfig
+from .models import db, PipelineStageMetric
+
+try:
+    import psutil  # 已在 requirementx.txt 中声明
+except ImportError:  # 没有 psutil 时不记录峰值内存（只能取到进程生命周期内的峰值，不能代表单个阶段）
+    psutil = None
+
+# 耗时直方图分桶（秒）
+WALL_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class StageRecord:
+    """单个阶段的指标，阶段函数可在运行中设置 frames"""
+
+    def __init__(self, video_id, stage):
+        self.video_id = video_id
+        self.stage = stage
+        self.success = True
+        self.frames = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss = None  # 字节；没有 psutil 时为 None
+
+    @property
+    def fps(self):
+        if not self.frames or self.wall_seconds <= 0:
+            return None
+        return self.frames / self.wall_seconds
+
+
+class _RssSampler:
+    """后台线程按固定间隔采样进程 RSS，记录阶段运行期间的峰值"""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def _current_rss():
+    return psutil.Process().memory_info().rss
+
+
+class MetricsRegistry:
+    """进程内指标汇总（自进程启动起累计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, record):
+        with self._lock:
+            stats = self._stages.setdefault(record.stage, {
+                'runs': {True: 0, False: 0},
+                'wall_sum': 0.0,
+                'cpu_sum': 0.0,
+                'frames': 0,
+                'buckets': [0] * len(WALL_BUCKETS),
+                'last_peak_rss': None,
+                'last_fps': None
+            })
+            stats['runs'][record.success] += 1
+            stats['wall_sum'] += record.wall_seconds
+            stats['cpu_sum'] += record.cpu_seconds
+            stats['frames'] += record.frames or 0
+            for idx, bound in enumerate(WALL_BUCKETS):
+                if record.wall_seconds <= bound:
+                    stats['buckets'][idx] += 1
+            if record.peak_rss is not None:
+                stats['last_peak_rss'] = record.peak_rss
+            if record.fps is not None:
+                stats['last_fps'] = record.fps
+
+    def render(self, extra_gauges=None):
+        """导出 Prometheus 文本格式"""
+        lines = [
+            '# HELP pipeline_stage_runs_total Pipeline stage executions.',
+            '# TYPE pipeline_stage_runs_total counter'
+        ]
+        with self._lock:
+            stages = {stage: {**stats, 'runs': dict(stats['runs']), 'buckets': list(stats['buckets'])}
+                      for stage, stats in self._stages.items()}
+
+        for stage, stats in stages.items():
+            for success, count in stats['runs'].items():
+                status = 'success' if success else 'failure'
+                lines.append(f'pipeline_stage_runs_total{{stage="{stage}",status="{status}"}} {count}')
+
+        lines += ['# HELP pipeline_stage_wall_seconds Pipeline stage wall time.',
+                  '# TYPE pipeline_stage_wall_seconds histogram']
+        for stage, stats in stages.items():
+            total = sum(stats['runs'].values())
+            for bound, count in zip(WALL_BUCKETS, stats['buckets']):
+                lines.append(f'pipeline_stage_wall_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'pipeline_stage_wall_seconds_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'pipeline_stage_wall_seconds_sum{{stage="{stage}"}} {stats["wall_sum"]:.6f}')
+            lines.append(f'pipeline_stage_wall_seconds_count{{stage="{stage}"}} {total}')
+
+        lines += ['# HELP pipeline_stage_cpu_seconds_total Process CPU time spent while the stage ran.',
+                  '# TYPE pipeline_stage_cpu_seconds_total counter']
+        for stage, stats in stages.items():
+            lines.append(f'pipeline_stage_cpu_seconds_total{{stage="{stage}"}} {stats["cpu_sum"]:.6f}')
+
+        lines += ['# HELP pipeline_stage_frames_total Frames processed by the stage.',
+                  '# TYPE pipeline_stage_frames_total counter']
+        for stage, stats in stages.items():
+            lines.append(f'pipeline_stage_frames_total{{stage="{stage}"}} {stats["frames"]}')
+
+        lines += ['# HELP pipeline_stage_peak_rss_bytes Peak resident memory during the last run of the stage.',
+                  '# TYPE pipeline_stage_peak_rss_bytes gauge']
+        for stage, stats in stages.items():
+            if stats['last_peak_rss'] is not None:
+                lines.append(f'pipeline_stage_peak_rss_bytes{{stage="{stage}"}} {stats["last_peak_rss"]}')
+
+        lines += ['# HELP pipeline_stage_fps Frames per second of the last run of the stage.',
+                  '# TYPE pipeline_stage_fps gauge']
+        for stage, stats in stages.items():
+            if stats['last_fps'] is not None:
+                lines.append(f'pipeline_stage_fps{{stage="{stage}"}} {stats["last_fps"]:.3f}')
+
+        for name, (help_text, value) in (extra_gauges or {}).items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def stage_timer(video_id, stage):
+    """记录一个阶段的指标
+
+    用法：
+        with stage_timer(video_id, 'pose') as record:
+            ...
+            record.frames = 300
+
+    CPU 时间取进程级（推理库的计算线程也计入），同一进程内阶段并发时会包含其他阶段的开销。
+    峰值内存需要 psutil 采样，未安装时不记录。
+    """
+    record = StageRecord(video_id, stage)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    sampler = _RssSampler() if psutil is not None else None
+    try:
+        if sampler is None:
+            yield record
+        else:
+            with sampler:
+                yield record
+    except BaseException:
+        record.success = False
+        raise
+    finally:
+        record.wall_seconds = time.perf_counter() - wall_start
+        record.cpu_seconds = time.process_time() - cpu_start
+        record.peak_rss = sampler.peak if sampler is not None else None
+        registry.observe(record)
+        _persist(record)
+        fps = f", {record.fps:.1f} fps" if record.fps is not None else ""
+        rss = f", 峰值内存 {record.peak_rss / 2 ** 20:.0f}MB" if record.peak_rss is not None else ""
+        print(f"⏱️ 阶段 {stage}: {record.wall_seconds:.2f}s, CPU {record.cpu_seconds:.2f}s{rss}{fps}")
+
+
+def _persist(record):
+    try:
+        if not record.success:
+            db.session.rollback()
+        db.session.add(PipelineStageMetric(
+            video_id=record.video_id,
+            stage=record.stage,
+            success=record.success,
+            wall_seconds=record.wall_seconds,
+            cpu_seconds=record.cpu_seconds,
+            peak_rss_mb=record.peak_rss / 2 ** 20 if record.peak_rss is not None else None,
+            frames=record.frames,
+            fps=record.fps,
+            release=BaseConfig.APP_RELEASE
+        ))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"❌ 指标写入错误: {e}")
+
+
+def video_fps(video_path):
+    """读取视频容器记录的帧率"""
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) or None
+    finally:
+        cap.release()
+
+
+def count_video_frames(video_path):
+    """读取视频容器记录的帧数（不解码）"""
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    finally:
+        cap.release()
@@ -17,7 +17,10 @@ class LongVideoSplitter:
                  target_frames=8,
                  stride=4,
                  min_fill_frames=3,
-                 resize_size=(256, 256)):
+                 resize_size=(256, 256),
+                 fps=None):
+        """fps 为空时用 decord 读取 input_path；传入 fps 时为帧流模式，
+        不再打开视频文件，由 process_stream 提供帧（input_path 仅用于片段命名）"""
         # 初始化路径参数
         self.input_path = Path(input_path)
         self.output_dir = Path(output_dir)
@@ -30,9 +33,14 @@ class LongVideoSplitter:
         self.resize_size = resize_size
 
         # 初始化视频读取器
-        self.vr = decord.VideoReader(str(self.input_path))
-        self.total_frames = len(self.vr)
-        self.fps = self.vr.get_avg_fps()
+        if fps is None:
+            self.vr = decord.VideoReader(str(self.input_path))
+            self.total_frames = len(self.vr)
+            self.fps = self.vr.get_avg_fps()
+        else:
+            self.vr = None
+            self.total_frames = 0
+            self.fps = fps
 
         # 元数据存储
         self.metadata = []
@@ -87,7 +95,7 @@ class LongVideoSplitter:
 
         return np.array(head + frames_list + tail)  # 转换为numpy数组
 
-    def _save_segment(self, frames, segment_name):
+    def _save_segment(self, frames, segment_name, channel_order='rgb'):
         output_path = self.output_dir / segment_name
         writer = cv2.VideoWriter(
             str(output_path),
@@ -96,7 +104,10 @@ class LongVideoSplitter:
             self.resize_size
         )
         for frame in frames:
-            bgr_frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            if channel_order == 'rgb':
+                bgr_frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            else:
+                bgr_frame = frame
             resized = cv2.resize(bgr_frame, self.resize_size)
             writer.write(resized)
         writer.release()
@@ -142,30 +153,82 @@ class LongVideoSplitter:
             pbar.update(progress)
 
         pbar.close()
-        # 保存元数据
+        self._save_metadata()
+        print(f"处理完成，共生成 {segment_count} 个视频片段")
+
+    def process_stream(self, frames):
+        """帧流模式：以滑动窗口从BGR帧流构建片段，不回读视频文件
+
+        片段划分与尾部填充规则与 process 一致，窗口内最多保留 max(target_frames, stride) 帧。
+        """
+        window = []  # [(帧号, 帧)]
+        start_idx = 0
+        segment_count = 0
+        total = 0
+
+        def emit(segment_frames, end_frame):
+            nonlocal segment_count, start_idx, window
+            segment_name = f"{self.input_path.stem}_{segment_count:03d}.mp4"
+            self._save_segment(segment_frames, segment_name, channel_order='bgr')
+            self.metadata.append({
+                'video_name': segment_name,
+                'start_frame': start_idx,
+                'end_frame': end_frame
+            })
+            segment_count += 1
+            start_idx += self.stride
+            window = [(i, f) for i, f in window if i >= start_idx]
+
+        for idx, frame in enumerate(frames):
+            total = idx + 1
+            if idx >= start_idx:
+                window.append((idx, frame))
+            while total >= start_idx + self.target_frames:
+                end_idx = start_idx + self.target_frames
+                emit([f for i, f in window if i < end_idx], end_idx - 1)
+
+        # 尾部不足 target_frames 的片段
+        while start_idx < total:
+            remaining = total - start_idx
+            if remaining * 2 < self.stride:
+                break
+            emit(self._padding_frames([f for _, f in window]), total - 1)
+
+        self.total_frames = total
+        self._save_metadata()
+        print(f"处理完成，共生成 {segment_count} 个视频片段")
+
+    def _save_metadata(self):
         metadata_path = self.output_dir / "metadata.csv"
         with open(metadata_path, 'w', newline='') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(['video_name', 'start_frame', 'end_frame'])
             for m in self.metadata:
                 writer.writerow([m['video_name'], m['start_frame'], m['end_frame']])
-        print(f"处理完成，共生成 {segment_count} 个视频片段")
 
 
 # ---------- 第二部分：预测处理（修改版，整合元数据） ----------
+def init_action_model(config_path, checkpoint_path, device='cuda:0'):
+    """初始化动作识别模型，返回的模型可在多个视频间复用"""
+    from mmaction.apis import init_recognizer
+
+    return init_recognizer(config_path, checkpoint_path, device=device)
+
+
 def run_inference(config_path,
                   checkpoint_path,
                   label_map,
                   video_dir,
-                  output_csv):
+                  output_csv,
+                  model=None):
     import pandas as pd
-    from mmaction.apis import init_recognizer, inference_recognizer
+    from mmaction.apis import inference_recognizer
 
-    device = 'cuda:0'
     num_topk = 5
 
-    # 初始化模型
-    model = init_recognizer(config_path, checkpoint_path, device=device)
+    # 初始化模型（未传入已加载模型时）
+    if model is None:
+        model = init_action_model(config_path, checkpoint_path)
 
     # 读取元数据
     metadata = pd.read_csv(Path(video_dir) / 'metadata.csv')
@@ -287,56 +350,86 @@ def visualize_results(video_path,
         print(f"动作识别可视化过程出错: {str(e)}")
         raise  # 重新抛出异常以便主程序能够处理
 
-# ---------- 执行入口 ----------
-if __name__ == "__main__":
-
-    # 配置命令行参数
-    parser = argparse.ArgumentParser(description='视频帧提取工具')
-    parser.add_argument('--config_path', type=str, required=True,help='模型配置文件路径')
-    parser.add_argument('--checkpoint_path', type=str, required=True,help='模型权重文件路径')
-    parser.add_argument('--label_map', type=str, required=True,help='标签映射文件路径')
-    parser.add_argument('--video_path', type=str, required=True, help='输入视频路径')
-    parser.add_argument('--output_dir', type=str, required=True, help='输出目录路径')
-    parser.add_argument('--filename', type=str, required=True, help='文件名')
-    args = parser.parse_args()
-
-    # 转换为绝对路径
-    config_path = os.path.abspath(args.config_path)
-    checkpoint_path = os.path.abspath(args.checkpoint_path)
-    label_map = os.path.abspath(args.label_map)
-    input_video = os.path.abspath(args.video_path)
-    output_dir = os.path.abspath(args.output_dir)
-    output_video=os.path.join(output_dir, args.filename)
-    split_dir = os.path.join(output_dir, "split_videos")
-
-    filename = os.path.basename(args.filename)
-    base_name = os.path.splitext(filename)[0]
-    csv_filename = f"{base_name}.csv"
-    prediction_csv = os.path.join(output_dir, csv_filename)
+def split_dir_of(output_dir):
+    """动作片段临时目录"""
+    return os.path.join(output_dir, "split_videos")
+
+
+def recognize_video(input_video,
+                    output_dir,
+                    filename,
+                    config_path,
+                    checkpoint_path,
+                    label_map,
+                    model=None,
+                    splitter=None):
+    """完整的动作识别流程：视频分割 -> 预测 -> 结果可视化
+
+    参数：
+    input_video: 输入视频路径（骨骼视频）
+    output_dir: 输出目录路径
+    filename: 输出文件名
+    model: 已加载的识别模型（为空时按配置初始化）
+    splitter: 已完成分割的 LongVideoSplitter（帧流模式），为空时从 input_video 分割
+    返回：是否处理成功
+    """
+    output_video = os.path.join(output_dir, filename)
+    split_dir = split_dir_of(output_dir) if splitter is None else str(splitter.output_dir)
+
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    prediction_csv = os.path.join(output_dir, f"{base_name}.csv")
 
     try:
         # 步骤1：视频分割
-        splitter = LongVideoSplitter(
-            input_path=input_video,
-            output_dir=split_dir,
-            target_frames=8,
-            stride=8,
-            resize_size=(256, 256)
-            )
-        splitter.process()
+        if splitter is None:
+            splitter = LongVideoSplitter(
+                input_path=input_video,
+                output_dir=split_dir,
+                target_frames=8,
+                stride=8,
+                resize_size=(256, 256)
+                )
+            splitter.process()
 
         # 步骤2：执行预测
         run_inference(config_path,
                   checkpoint_path,
                   label_map,
                   split_dir,
-                  prediction_csv)
+                  prediction_csv,
+                  model=model)
         visualize_results(input_video,prediction_csv,output_video,3)
+        return True
     except Exception as e:
         print(f"动作识别处理失败: {str(e)}")  # <-- 添加这行以打印实际错误
+        return False
 
     finally:
         # 清理分割视频文件夹（无论是否出错都会执行）
         if Path(split_dir).exists():
             shutil.rmtree(split_dir)
             print(f"\n已清理临时分割文件夹: {split_dir}")
+
+
+# ---------- 执行入口 ----------
+if __name__ == "__main__":
+
+    # 配置命令行参数
+    parser = argparse.ArgumentParser(description='视频帧提取工具')
+    parser.add_argument('--config_path', type=str, required=True,help='模型配置文件路径')
+    parser.add_argument('--checkpoint_path', type=str, required=True,help='模型权重文件路径')
+    parser.add_argument('--label_map', type=str, required=True,help='标签映射文件路径')
+    parser.add_argument('--video_path', type=str, required=True, help='输入视频路径')
+    parser.add_argument('--output_dir', type=str, required=True, help='输出目录路径')
+    parser.add_argument('--filename', type=str, required=True, help='文件名')
+    args = parser.parse_args()
+
+    # 转换为绝对路径
+    recognize_video(
+        input_video=os.path.abspath(args.video_path),
+        output_dir=os.path.abspath(args.output_dir),
+        filename=args.filename,
+        config_path=os.path.abspath(args.config_path),
+        checkpoint_path=os.path.abspath(args.checkpoint_path),
+        label_map=os.path.abspath(args.label_map)
+    )
@@ -0,0 +1,222 @@
+# pose_store.py
+# 骨骼点结果的列式存储：每个视频一个 .npz（不压缩，np.load 只解析文件头，数组按需读取），
+# 取代逐实例展开、制表符缩进的 json_tricks 文件。JSON 只在接口/导出时按需生成。
+#
+# 数组（I 为全部帧的人体实例总数，K 为关键点数）：
+#   frame_ids        (F,)      int32    帧号（从1开始，与原 JSON 的 frame_id 一致）
+#   frame_offsets    (F + 1,)  int64    第 f 帧的实例为 [frame_offsets[f], frame_offsets[f + 1])
+#   keypoints        (I, K, 2) float32
+#   keypoint_scores  (I, K)    float32
+#   bboxes           (I, 4)    float32  x1, y1, x2, y2（无检测框时为 NaN）
+#   bbox_scores      (I,)      float32
+#   track_ids        (I,)      int32    跨帧的人员编号（未跟踪时为 -1，旧文件无此数组）
+#   meta_info        (n,)      uint8    数据集元信息（UTF-8 JSON）
+
+import json
+import os
+import numpy as np
+
+POSE_SUFFIX = '.npz'
+LEGACY_SUFFIX = '.json'
+
+
+def pose_data_path(output_root, stem):
+    """骨骼点结果文件路径：<output_root>/results_<stem>.npz"""
+    return os.path.join(str(output_root), f"results_{stem}{POSE_SUFFIX}")
+
+
+def find_pose_data(output_root, stem):
+    """已有的骨骼点结果文件：优先列式文件，其次旧版 JSON；都不存在时返回 None"""
+    for suffix in (POSE_SUFFIX, LEGACY_SUFFIX):
+        path = os.path.join(str(output_root), f"results_{stem}{suffix}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _to_builtin(obj):
+    """numpy 类型 -> Python 内置类型（json.dumps 的 default）"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def _unwrap_ndarray(obj):
+    """旧版 json_tricks 文件中的 {"__ndarray__": ...} 还原为列表"""
+    if isinstance(obj, dict):
+        if '__ndarray__' in obj:
+            return obj['__ndarray__']
+        return {k: _unwrap_ndarray(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_unwrap_ndarray(item) for item in obj]
+    return obj
+
+
+def write_pose_data(path, instance_info, meta_info=None):
+    """把 predict_frames 收集的逐帧实例列表写为列式文件
+
+    instance_info: [{'frame_id': int, 'instances': [{'keypoints', 'keypoint_scores', 'bbox', 'bbox_score'[, 'track_id']}, ...]}, ...]
+    """
+    meta_info = meta_info or {}
+    num_keypoints = int(meta_info.get('num_keypoints', 17))
+
+    frame_ids = np.empty(len(instance_info), dtype=np.int32)
+    frame_offsets = np.zeros(len(instance_info) + 1, dtype=np.int64)
+    instances = []
+    for f, frame in enumerate(instance_info):
+        frame_ids[f] = frame['frame_id']
+        instances.extend(frame['instances'])
+        frame_offsets[f + 1] = len(instances)
+
+    if instances:
+        num_keypoints = len(instances[0]['keypoints'])
+    keypoints = np.empty((len(instances), num_keypoints, 2), dtype=np.float32)
+    keypoint_scores = np.empty((len(instances), num_keypoints), dtype=np.float32)
+    bboxes = np.full((len(instances), 4), np.nan, dtype=np.float32)
+    bbox_scores = np.full(len(instances), np.nan, dtype=np.float32)
+    track_ids = np.full(len(instances), -1, dtype=np.int32)
+    for i, instance in enumerate(instances):
+        keypoints[i] = instance['keypoints']
+        track_ids[i] = instance.get('track_id', -1)
+        keypoint_scores[i] = instance['keypoint_scores']
+        bbox = instance.get('bbox')
+        if bbox is not None and len(bbox):
+            bboxes[i] = np.asarray(bbox, dtype=np.float32).reshape(-1)[:4]
+        if instance.get('bbox_score') is not None:
+            bbox_scores[i] = np.asarray(instance['bbox_score'], dtype=np.float32).reshape(-1)[0]
+
+    meta = np.frombuffer(json.dumps(meta_info, default=_to_builtin).encode('utf-8'), dtype=np.uint8)
+
+    # 先写临时文件再替换，避免读取方看到半个文件
+    path = str(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp{POSE_SUFFIX}"
+    np.savez(tmp_path, frame_ids=frame_ids, frame_offsets=frame_offsets, keypoints=keypoints,
+             keypoint_scores=keypoint_scores, bboxes=bboxes, bbox_scores=bbox_scores, track_ids=track_ids,
+             meta_info=meta)
+    os.replace(tmp_path, path)
+    return path
+
+
+class PoseData:
+    """骨骼点结果读取（列式文件或旧版 JSON）"""
+
+    def __init__(self, frame_ids, frame_offsets, keypoints, keypoint_scores, bboxes, bbox_scores, meta_info,
+                 track_ids=None):
+        self.frame_ids = frame_ids
+        self.frame_offsets = frame_offsets
+        self.keypoints = keypoints
+        self.keypoint_scores = keypoint_scores
+        self.bboxes = bboxes
+        self.bbox_scores = bbox_scores
+        self.track_ids = track_ids if track_ids is not None else np.full(len(keypoints), -1, dtype=np.int32)
+        self.meta_info = meta_info
+
+    @classmethod
+    def load(cls, path):
+        path = str(path)
+        if path.endswith(LEGACY_SUFFIX):
+            return cls.from_json(path)
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        meta_info = json.loads(arrays.pop('meta_info').tobytes().decode('utf-8'))
+        return cls(meta_info=meta_info, **arrays)
+
+    @classmethod
+    def from_json(cls, path):
+        """读取旧版 json_tricks 结果文件"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        arrays = {}
+        instance_info = _unwrap_ndarray(data.get('instance_info', []))
+        meta_info = _unwrap_ndarray(data.get('meta_info', {}))
+        frame_ids = np.array([frame.get('frame_id') for frame in instance_info], dtype=np.int32)
+        frame_offsets = np.zeros(len(instance_info) + 1, dtype=np.int64)
+        np.cumsum([len(frame.get('instances', [])) for frame in instance_info], out=frame_offsets[1:])
+        instances = [inst for frame in instance_info for inst in frame.get('instances', [])]
+        num_keypoints = len(instances[0]['keypoints']) if instances else int(meta_info.get('num_keypoints', 17))
+        arrays['keypoints'] = np.array([inst['keypoints'] for inst in instances],
+                                       dtype=np.float32).reshape(-1, num_keypoints, 2)
+        arrays['keypoint_scores'] = np.array([inst['keypoint_scores'] for inst in instances],
+                                             dtype=np.float32).reshape(-1, num_keypoints)
+        arrays['bboxes'] = np.array([
+            np.asarray(inst['bbox'], dtype=np.float32).reshape(-1)[:4] if inst.get('bbox') else [np.nan] * 4
+            for inst in instances
+        ], dtype=np.float32).reshape(-1, 4)
+        arrays['bbox_scores'] = np.array([
+            np.asarray(inst['bbox_score'], dtype=np.float32).reshape(-1)[0]
+            if inst.get('bbox_score') is not None else np.nan
+            for inst in instances
+        ], dtype=np.float32)
+        arrays['track_ids'] = np.array([inst.get('track_id', -1) for inst in instances], dtype=np.int32)
+        return cls(frame_ids, frame_offsets, meta_info=meta_info, **arrays)
+
+    def __len__(self):
+        return len(self.frame_ids)
+
+    def frame_slice(self, index):
+        """第 index 帧（从0开始）的实例范围"""
+        return slice(int(self.frame_offsets[index]), int(self.frame_offsets[index + 1]))
+
+    def padded_keypoints(self, max_persons=None):
+        """补齐为 (帧数, 人数, K, 2) 的关键点数组与 (帧数, 人数, K) 的置信度，缺失处为 NaN"""
+        counts = np.diff(self.frame_offsets)
+        persons = int(counts.max()) if len(counts) else 0
+        if max_persons is not None:
+            persons = min(persons, max_persons)
+        num_keypoints = self.keypoints.shape[1]
+        keypoints = np.full((len(self), persons, num_keypoints, 2), np.nan, dtype=np.float32)
+        scores = np.full((len(self), persons, num_keypoints), np.nan, dtype=np.float32)
+        frame_index = np.repeat(np.arange(len(self)), counts)
+        person_index = np.arange(len(self.keypoints)) - np.repeat(self.frame_offsets[:-1], counts)
+        keep = person_index < persons
+        keypoints[frame_index[keep], person_index[keep]] = self.keypoints[keep]
+        scores[frame_index[keep], person_index[keep]] = self.keypoint_scores[keep]
+        return keypoints, scores
+
+    def instance_info(self):
+        """导出为原 JSON 的 instance_info 结构（逐帧实例列表）"""
+        keypoints = self.keypoints.tolist()
+        keypoint_scores = self.keypoint_scores.tolist()
+        bboxes = self.bboxes.tolist()
+        bbox_scores = self.bbox_scores.tolist()
+        track_ids = self.track_ids.tolist()
+        result = []
+        for f, frame_id in enumerate(self.frame_ids.tolist()):
+            instances = []
+            for i in range(int(self.frame_offsets[f]), int(self.frame_offsets[f + 1])):
+                instance = {
+                    'keypoints': keypoints[i],
+                    'keypoint_scores': keypoint_scores[i],
+                    'bbox': [] if np.isnan(bboxes[i][0]) else bboxes[i],
+                    'bbox_score': None if np.isnan(bbox_scores[i]) else bbox_scores[i]
+                }
+                if track_ids[i] >= 0:
+                    instance['track_id'] = track_ids[i]
+                instances.append(instance)
+            result.append({'frame_id': frame_id, 'instances': instances})
+        return result
+
+    def to_dict(self):
+        return {'meta_info': self.meta_info, 'instance_info': self.instance_info()}
+
+
+def load_pose_data(path):
+    return PoseData.load(path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    # 导出为 JSON：python pose_store.py results_xxx.npz -o results_xxx.json
+    parser = argparse.ArgumentParser(description='Export columnar pose results to JSON')
+    parser.add_argument('path', help='results_<name>.npz')
+    parser.add_argument('-o', '--output', default=None, help='JSON 输出路径（默认与输入同名）')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.path)[0] + LEGACY_SUFFIX
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(PoseData.load(args.path).to_dict(), f)
+    print(f"已导出: {output}")
@@ -0,0 +1,132 @@
+# pose_tracker.py
+# 检测跳帧：人体检测器每 det_interval 帧（或姿态置信度下降时）运行一次，
+# 其余帧用上一帧关键点的外接框（按比例扩大）作为姿态估计的输入框。
+# 检测结果与已有轨迹按 IoU 匹配，输出中每个人保持同一个 track_id。
+# rank_players 按置信度、框大小与画面位置给人体框排序，只对前 K 个（球员）做姿态估计。
+
+import numpy as np
+
+
+def bbox_iou(boxes_a, boxes_b):
+    """两组 xyxy 框的 IoU 矩阵 (len(a), len(b))"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    lt = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    rb = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def rank_players(bboxes, scores, image_shape=None, center_weight=0.5):
+    """人体框按"像球员"的程度从高到低排序，返回下标
+
+    排序分数 = 检测置信度 × sqrt(面积 / 最大面积) × 画面位置权重。
+    球员在球台两端、靠近画面水平中央且离镜头较近（框大），
+    观众、裁判多在画面边缘或远处；位置权重随框中心偏离水平中线线性降低，
+    偏到画面边缘时为 1 - center_weight。
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if len(bboxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    area = np.prod(np.clip(bboxes[:, 2:] - bboxes[:, :2], 0, None), axis=1)
+    rank = scores * np.sqrt(area / max(float(area.max()), 1e-6))
+    if image_shape is not None:
+        width = image_shape[1]
+        offset = np.abs((bboxes[:, 0] + bboxes[:, 2]) / 2 - width / 2) / (width / 2)
+        rank = rank * (1 - center_weight * np.clip(offset, 0, 1))
+    return np.argsort(-rank, kind='stable')
+
+
+def keypoint_bbox(keypoints, scores, kpt_thr=0.3, expand=1.25, min_points=3, image_shape=None):
+    """可见关键点的外接框（以中心按 expand 扩大）；可见点少于 min_points 时返回 None"""
+    visible = np.asarray(keypoints)[np.asarray(scores) > kpt_thr]
+    if len(visible) < min_points:
+        return None
+    (x1, y1), (x2, y2) = visible.min(axis=0), visible.max(axis=0)
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    half_w, half_h = (x2 - x1) * expand / 2, (y2 - y1) * expand / 2
+    box = np.array([cx - half_w, cy - half_h, cx + half_w, cy + half_h], dtype=np.float32)
+    if image_shape is not None:
+        h, w = image_shape[:2]
+        box = np.clip(box, 0, [w, h, w, h]).astype(np.float32)
+    if box[2] - box[0] < 1 or box[3] - box[1] < 1:
+        return None
+    return box
+
+
+class BBoxTracker:
+    """按帧维护人体框与 track_id
+
+    用法（逐帧）：
+        if tracker.need_detection():
+            bboxes, track_ids = tracker.update_detections(检测框)
+        else:
+            bboxes, track_ids = tracker.predicted()
+        ... 对 bboxes 做姿态估计 ...
+        tracker.observe(keypoints, keypoint_scores, image_shape)
+    """
+
+    def __init__(self, det_interval=5, redetect_thr=0.5, iou_thr=0.3,
+                 kpt_thr=0.3, expand=1.25):
+        self.det_interval = max(int(det_interval), 1)
+        self.redetect_thr = redetect_thr
+        self.iou_thr = iou_thr
+        self.kpt_thr = kpt_thr
+        self.expand = expand
+
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int32)
+        self._next_id = 0
+        self._since_detection = 0
+        self._force_detection = True
+
+    def need_detection(self):
+        """本帧是否需要运行检测器"""
+        return (self._force_detection or len(self._boxes) == 0
+                or self._since_detection >= self.det_interval)
+
+    def update_detections(self, bboxes):
+        """检测帧：与上一帧的框按 IoU 贪心匹配，沿用匹配到的 track_id，其余分配新 id"""
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        ids = np.full(len(bboxes), -1, dtype=np.int32)
+        if len(bboxes) and len(self._boxes):
+            iou = bbox_iou(bboxes, self._boxes)
+            while iou.size and iou.max() >= self.iou_thr:
+                det, track = np.unravel_index(np.argmax(iou), iou.shape)
+                ids[det] = self._ids[track]
+                iou[det, :] = -1
+                iou[:, track] = -1
+        for i in np.flatnonzero(ids < 0):
+            ids[i] = self._next_id
+            self._next_id += 1
+
+        self._boxes, self._ids = bboxes, ids
+        self._since_detection = 1
+        self._force_detection = False
+        return bboxes, ids
+
+    def predicted(self):
+        """非检测帧：沿用上一帧关键点推出的框"""
+        self._since_detection += 1
+        return self._boxes, self._ids
+
+    def observe(self, keypoints, keypoint_scores, image_shape=None):
+        """用本帧姿态结果更新下一帧的框
+
+        keypoints (N, K, 2) 与 keypoint_scores (N, K) 与本帧输入框一一对应。
+        某人可见关键点不足或平均置信度低于 redetect_thr 时，下一帧重新检测。
+        """
+        boxes, ids = [], []
+        for kpts, scores, track_id, prev in zip(keypoints, keypoint_scores, self._ids, self._boxes):
+            box = keypoint_bbox(kpts, scores, self.kpt_thr, self.expand, image_shape=image_shape)
+            if box is None or float(np.mean(scores)) < self.redetect_thr:
+                self._force_detection = True
+                box = prev
+            boxes.append(box)
+            ids.append(track_id)
+        self._boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self._ids = np.asarray(ids, dtype=np.int32)
@@ -10,7 +10,11 @@ import json_tricks as json
 import mmcv
 import mmengine
 import numpy as np
+import torch
+from mmcv.transforms import Compose
+from mmengine.dataset import pseudo_collate
 from mmengine.logging import print_log
+from mmengine.registry import init_default_scope
 
 from mmpose.apis import inference_topdown
 from mmpose.apis import init_model as init_pose_estimator
@@ -19,8 +23,18 @@ from mmpose.registry import VISUALIZERS
 from mmpose.structures import merge_data_samples, split_instances
 from mmpose.utils import adapt_mmdet_pipeline
 
+try:
+    from .pose_store import POSE_SUFFIX, write_pose_data
+    from .pose_tracker import BBoxTracker, rank_players
+    from .skeleton_render import SkeletonRenderer
+except ImportError:  # 作为脚本直接运行时
+    from pose_store import POSE_SUFFIX, write_pose_data
+    from pose_tracker import BBoxTracker, rank_players
+    from skeleton_render import SkeletonRenderer
+
 try:
     from mmdet.apis import inference_detector, init_detector
+    from mmdet.utils import get_test_pipeline_cfg
     has_mmdet = True
 except (ImportError, ModuleNotFoundError):
     has_mmdet = False
@@ -36,12 +50,7 @@ def process_one_image(args,
 
     # predict bbox
     det_result = inference_detector(detector, img)
-    pred_instance = det_result.pred_instances.cpu().numpy()
-    bboxes = np.concatenate(
-        (pred_instance.bboxes, pred_instance.scores[:, None]), axis=1)
-    bboxes = bboxes[np.logical_and(pred_instance.labels == args.det_cat_id,
-                                   pred_instance.scores > args.bbox_thr)]
-    bboxes = bboxes[nms(bboxes, args.nms_thr), :4]
+    bboxes = _filter_bboxes(args, det_result)
 
     # predict keypoints
     pose_results = inference_topdown(pose_estimator, img, bboxes)
@@ -71,10 +80,322 @@ def process_one_image(args,
     return data_samples.get('pred_instances', None)
 
 
-def main():
-    """Visualize the demo images.
+def _filter_bboxes(args, det_result):
+    """Person boxes (xyxy) of one detection result after score filter and NMS.
 
-    Using mmdet to detect the human.
+    With ``--max-persons`` K > 0 only the K most player-like boxes (see
+    ``rank_players``) are kept, in rank order, so pose cost per frame is
+    bounded whatever the crowd size.
+    """
+    pred_instance = det_result.pred_instances.cpu().numpy()
+    bboxes = np.concatenate(
+        (pred_instance.bboxes, pred_instance.scores[:, None]), axis=1)
+    bboxes = bboxes[np.logical_and(pred_instance.labels == args.det_cat_id,
+                                   pred_instance.scores > args.bbox_thr)]
+    bboxes = bboxes[nms(bboxes, args.nms_thr)]
+    if args.max_persons > 0:
+        order = rank_players(bboxes[:, :4], bboxes[:, 4],
+                             det_result.metainfo.get('ori_shape'),
+                             args.center_weight)
+        bboxes = bboxes[order[:args.max_persons]]
+    return bboxes[:, :4]
+
+
+def _batch_pipelines(detector, pose_estimator):
+    """Test pipelines for ndarray inputs, built once per model pair."""
+    pipelines = getattr(pose_estimator, '_batch_pipelines', None)
+    if pipelines is None:
+        det_pipeline = get_test_pipeline_cfg(detector.cfg.copy())
+        det_pipeline[0].type = 'mmdet.LoadImageFromNDArray'
+        pipelines = (Compose(det_pipeline),
+                     Compose(pose_estimator.cfg.test_dataloader.dataset.pipeline))
+        pose_estimator._batch_pipelines = pipelines
+    return pipelines
+
+
+def detect_batch(args, imgs, detector, pose_estimator):
+    """Person boxes of several frames with one detector forward pass.
+
+    Same result as calling ``inference_detector`` on every frame, which
+    runs the model at batch size 1 even when given a list.
+    """
+    det_pipeline, _ = _batch_pipelines(detector, pose_estimator)
+    init_default_scope(detector.cfg.get('default_scope', 'mmdet'))
+    data = [det_pipeline(dict(img=img, img_id=idx))
+            for idx, img in enumerate(imgs)]
+    with torch.no_grad():
+        det_results = detector.test_step(pseudo_collate(data))
+    return [_filter_bboxes(args, result) for result in det_results]
+
+
+def pose_batch(imgs, bboxes_list, detector, pose_estimator, max_crops=64):
+    """Top-down pose estimation of every box of several frames.
+
+    Person crops of all frames are flattened into batches of at most
+    ``max_crops`` and split back per frame afterwards. A frame without
+    boxes uses the whole image, like ``inference_topdown``. Returns the
+    merged data sample of every frame.
+    """
+    _, pose_pipeline = _batch_pipelines(detector, pose_estimator)
+    init_default_scope(pose_estimator.cfg.get('default_scope', 'mmpose'))
+
+    data_list, owners = [], []
+    for idx, (img, bboxes) in enumerate(zip(imgs, bboxes_list)):
+        if len(bboxes) == 0:
+            h, w = img.shape[:2]
+            bboxes = np.array([[0, 0, w, h]], dtype=np.float32)
+        for bbox in bboxes:
+            data_info = dict(img=img, bbox=bbox[None],
+                             bbox_score=np.ones(1, dtype=np.float32))
+            data_info.update(pose_estimator.dataset_meta)
+            data_list.append(pose_pipeline(data_info))
+            owners.append(idx)
+
+    results = []
+    with torch.no_grad():
+        for start in range(0, len(data_list), max_crops):
+            results.extend(pose_estimator.test_step(
+                pseudo_collate(data_list[start:start + max_crops])))
+
+    per_frame = [[] for _ in imgs]
+    for owner, result in zip(owners, results):
+        per_frame[owner].append(result)
+    return [merge_data_samples(samples) for samples in per_frame]
+
+
+def process_batch(args,
+                  imgs,
+                  detector,
+                  pose_estimator,
+                  visualizer=None,
+                  show_interval=0):
+    """Batched counterpart of :func:`process_one_image` for video frames.
+
+    Yields ``(pred_instances, visualized image)`` of every frame in order.
+    """
+    bboxes_list = detect_batch(args, imgs, detector, pose_estimator)
+    data_samples_list = pose_batch(imgs, bboxes_list, detector,
+                                   pose_estimator, args.pose_batch_size)
+
+    for img, data_samples in zip(imgs, data_samples_list):
+        vis = _draw(args, img, data_samples, visualizer, show_interval)
+        yield data_samples.get('pred_instances', None), vis
+
+
+def process_tracked_image(args,
+                          img,
+                          detector,
+                          pose_estimator,
+                          tracker,
+                          visualizer=None,
+                          show_interval=0):
+    """Pose estimation of one video frame with detector frame-skipping.
+
+    The detector only runs when ``tracker`` asks for it (every
+    ``--det-interval`` frames or after a confidence drop); other frames
+    reuse boxes propagated from the previous frame's keypoints. Returns
+    ``(pred_instances, track_ids, visualized image)``; ``track_ids`` is
+    aligned with the instances and empty when nobody was found.
+    """
+    if tracker.need_detection():
+        bboxes, track_ids = tracker.update_detections(
+            _filter_bboxes(args, inference_detector(detector, img)))
+    else:
+        bboxes, track_ids = tracker.predicted()
+
+    data_samples = pose_batch([img], [bboxes], detector, pose_estimator,
+                              args.pose_batch_size)[0]
+    pred_instances = data_samples.get('pred_instances', None)
+    if len(bboxes) and pred_instances is not None:
+        tracker.observe(pred_instances.keypoints,
+                        pred_instances.keypoint_scores, img.shape)
+
+    vis = _draw(args, img, data_samples, visualizer, show_interval)
+    return pred_instances, track_ids, vis
+
+
+def _draw(args, img, data_samples, visualizer, show_interval):
+    """Visualized RGB image of one BGR frame, None without visualizer."""
+    if visualizer is None:
+        return None
+    visualizer.add_datasample(
+        'result',
+        mmcv.bgr2rgb(img),
+        data_sample=data_samples,
+        draw_gt=False,
+        draw_heatmap=args.draw_heatmap,
+        draw_bbox=args.draw_bbox,
+        show_kpt_idx=args.show_kpt_idx,
+        skeleton_style=args.skeleton_style,
+        show=args.show,
+        wait_time=show_interval,
+        kpt_thr=args.kpt_thr)
+    return visualizer.get_image()
+
+
+def _split_tracked(pred_instances, track_ids):
+    """``split_instances`` plus the ``track_id`` of every instance."""
+    instances = split_instances(pred_instances)
+    if len(track_ids) == len(instances):
+        for instance, track_id in zip(instances, track_ids):
+            instance['track_id'] = int(track_id)
+    return instances
+
+
+def _read_ahead(frames, size):
+    """Group a frame stream into lists of up to ``size`` frames."""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _infer_frames(args, frames, detector, pose_estimator, visualizer,
+                  show_interval):
+    """Inference loop of :func:`predict_frames`.
+
+    Yields ``(frame, pred_instances, track_ids, vis)`` per frame; ``vis``
+    is only set when ``visualizer`` is given and ``track_ids`` is None
+    outside tracking mode.
+    """
+    if args.det_interval > 1:
+        tracker = BBoxTracker(args.det_interval, args.redetect_thr,
+                              args.track_iou_thr, args.kpt_thr)
+        for frame in frames:
+            pred_instances, track_ids, vis = process_tracked_image(
+                args, frame, detector, pose_estimator, tracker, visualizer,
+                show_interval)
+            yield frame, pred_instances, track_ids, vis
+        return
+
+    if args.batch_size > 1:
+        for batch in _read_ahead(frames, args.batch_size):
+            for frame, (pred_instances, vis) in zip(
+                    batch,
+                    process_batch(args, batch, detector, pose_estimator,
+                                  visualizer, show_interval)):
+                yield frame, pred_instances, None, vis
+        return
+
+    for frame in frames:
+        # topdown pose estimation
+        pred_instances = process_one_image(args, frame, detector,
+                                           pose_estimator, visualizer,
+                                           show_interval)
+        vis = visualizer.get_image() if visualizer is not None else None
+        yield frame, pred_instances, None, vis
+
+
+def render_mode(args):
+    """Effective ``--render`` mode; heatmaps and ``--show`` need the mmpose
+    visualizer."""
+    if args.draw_heatmap or args.show:
+        return 'visualizer'
+    return args.render
+
+
+def predict_frames(args,
+                   frames,
+                   detector,
+                   pose_estimator,
+                   visualizer,
+                   pred_instances_list=None,
+                   show_interval=0.001):
+    """Run pose estimation on a stream of BGR frames.
+
+    Yields the visualized frame (BGR) of every input frame. When
+    ``pred_instances_list`` is given, per-frame predictions are appended to
+    it in the same format as ``--save-predictions``.
+
+    With ``--det-interval`` > 1 the detector is skipped on most frames
+    and every instance carries a ``track_id``; frames are then processed
+    one by one since each frame's boxes come from the previous one.
+    Otherwise, with ``--batch-size`` > 1 frames are read ahead in groups,
+    detection runs once per group and all person crops of the group
+    share pose forward passes.
+
+    ``--render`` selects how skeletons are drawn: ``visualizer`` renders
+    inline with the mmpose visualizer, ``pool`` draws with
+    :class:`SkeletonRenderer` in worker threads while inference moves on
+    to the next frames, and ``none`` yields the input frames unchanged
+    (clients draw from the saved keypoints).
+    """
+    mode = render_mode(args)
+
+    def inferred():
+        for frame_idx, (frame, pred_instances, track_ids, vis) in enumerate(
+                _infer_frames(args, frames, detector, pose_estimator,
+                              visualizer if mode == 'visualizer' else None,
+                              show_interval), 1):
+            if pred_instances_list is not None:
+                # save prediction results
+                pred_instances_list.append(
+                    dict(
+                        frame_id=frame_idx,
+                        instances=split_instances(pred_instances)
+                        if track_ids is None else _split_tracked(
+                            pred_instances, track_ids)))
+            yield frame, pred_instances, vis
+
+    if mode == 'visualizer':
+        for _, _, vis in inferred():
+            yield mmcv.rgb2bgr(vis)
+    elif mode == 'pool':
+        renderer = SkeletonRenderer(pose_estimator.dataset_meta,
+                                    args.kpt_thr, args.radius,
+                                    args.thickness, args.draw_bbox,
+                                    args.render_workers)
+        yield from renderer.render(
+            (frame, pred_instances.keypoints, pred_instances.keypoint_scores,
+             pred_instances.get('bboxes', None))
+            for frame, pred_instances, _ in inferred())
+    else:
+        for frame, _, _ in inferred():
+            yield frame
+
+
+def prediction_path(output_root, input_path, suffix=POSE_SUFFIX):
+    """Path of the prediction file saved for ``input_path``.
+
+    ``.npz`` (default) is the columnar format of :mod:`pose_store`,
+    ``.json`` the original json_tricks dump.
+    """
+    return f'{output_root}/results_' \
+        f'{os.path.splitext(os.path.basename(input_path))[0]}{suffix}'
+
+
+def save_predictions(pred_save_path, pose_estimator, pred_instances_list):
+    """Dump predictions together with the dataset meta info."""
+    if pred_save_path.endswith(POSE_SUFFIX):
+        write_pose_data(pred_save_path, pred_instances_list,
+                        pose_estimator.dataset_meta)
+    else:
+        with open(pred_save_path, 'w') as f:
+            json.dump(
+                dict(
+                    meta_info=pose_estimator.dataset_meta,
+                    instance_info=pred_instances_list),
+                f)
+    print(f'predictions have been saved at {pred_save_path}')
+
+
+def read_frames(cap):
+    """Read frames from an opened capture until the stream ends."""
+    while cap.isOpened():
+        success, frame = cap.read()
+        if not success:
+            break
+        yield frame
+
+
+def parse_args(argv=None):
+    """Parse command line arguments.
+
+    ``argv`` allows in-process callers to reuse the CLI defaults.
     """
     parser = ArgumentParser()
     parser.add_argument('det_config', help='Config file for detection')
@@ -99,8 +420,63 @@ def main():
         action='store_true',
         default=False,
         help='whether to save predicted results')
+    parser.add_argument(
+        '--pred-format',
+        default='npz',
+        choices=['npz', 'json'],
+        help='Format of the saved predictions')
     parser.add_argument(
         '--device', default='cuda:0', help='Device used for inference')
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1,
+        help='Video frames read ahead and detected in one forward pass')
+    parser.add_argument(
+        '--pose-batch-size',
+        type=int,
+        default=64,
+        help='Maximum person crops per pose forward pass in batch mode')
+    parser.add_argument(
+        '--det-interval',
+        type=int,
+        default=1,
+        help='Run the person detector every N video frames and propagate '
+        'boxes from keypoints in between (1 detects on every frame)')
+    parser.add_argument(
+        '--redetect-thr',
+        type=float,
+        default=0.5,
+        help='Mean keypoint score below which the next frame is detected '
+        'again in tracking mode')
+    parser.add_argument(
+        '--track-iou-thr',
+        type=float,
+        default=0.3,
+        help='IoU threshold for matching detections to existing tracks')
+    parser.add_argument(
+        '--max-persons',
+        type=int,
+        default=0,
+        help='Estimate pose only for the top K ranked persons per frame '
+        '(0 keeps every detection)')
+    parser.add_argument(
+        '--center-weight',
+        type=float,
+        default=0.5,
+        help='Weight of the horizontal position in person ranking')
+    parser.add_argument(
+        '--render',
+        default='visualizer',
+        choices=['visualizer', 'pool', 'none'],
+        help='Skeleton rendering of video frames: inline mmpose visualizer, '
+        'parallel cv2 drawing decoupled from inference, or none '
+        '(predictions only)')
+    parser.add_argument(
+        '--render-workers',
+        type=int,
+        default=4,
+        help='Drawing threads when --render is pool')
     parser.add_argument(
         '--det-cat-id',
         type=int,
@@ -154,27 +530,16 @@ def main():
     parser.add_argument(
         '--draw-bbox', action='store_true', help='Draw bboxes of instances')
 
-    assert has_mmdet, 'Please install mmdet to run the demo.'
-
-    args = parser.parse_args()
+    return parser.parse_args(argv)
 
-    assert args.show or (args.output_root != '')
-    assert args.input != ''
-    assert args.det_config is not None
-    assert args.det_checkpoint is not None
 
-    output_file = None
-    if args.output_root:
-        mmengine.mkdir_or_exist(args.output_root)
-        output_file = os.path.join(args.output_root,
-                                   os.path.basename(args.input))
-        if args.input == 'webcam':
-            output_file += '.mp4'
+def init_models(args):
+    """Build the detector, pose estimator and visualizer.
 
-    if args.save_predictions:
-        assert args.output_root != ''
-        args.pred_save_path = f'{args.output_root}/results_' \
-            f'{os.path.splitext(os.path.basename(args.input))[0]}.json'
+    The returned models can be kept alive and passed to :func:`run` for
+    every following input.
+    """
+    assert has_mmdet, 'Please install mmdet to run the demo.'
 
     # build detector
     detector = init_detector(
@@ -199,6 +564,30 @@ def main():
     visualizer.set_dataset_meta(
         pose_estimator.dataset_meta, skeleton_style=args.skeleton_style)
 
+    return detector, pose_estimator, visualizer
+
+
+def run(args, detector, pose_estimator, visualizer, progress=None):
+    """Run detection + top-down pose estimation on ``args.input``.
+
+    ``progress`` is called with the number of processed video frames.
+    """
+    assert args.show or (args.output_root != '')
+    assert args.input != ''
+
+    output_file = None
+    if args.output_root:
+        mmengine.mkdir_or_exist(args.output_root)
+        output_file = os.path.join(args.output_root,
+                                   os.path.basename(args.input))
+        if args.input == 'webcam':
+            output_file += '.mp4'
+
+    if args.save_predictions:
+        assert args.output_root != ''
+        args.pred_save_path = prediction_path(args.output_root, args.input,
+                                              f'.{args.pred_format}')
+
     if args.input == 'webcam':
         input_type = 'webcam'
     else:
@@ -225,32 +614,17 @@ def main():
             cap = cv2.VideoCapture(args.input)
 
         video_writer = None
-        pred_instances_list = []
-        frame_idx = 0
-
-        while cap.isOpened():
-            success, frame = cap.read()
-            frame_idx += 1
-
-            if not success:
-                break
-
-            # topdown pose estimation
-            pred_instances = process_one_image(args, frame, detector,
-                                               pose_estimator, visualizer,
-                                               0.001)
-
-            if args.save_predictions:
-                # save prediction results
-                pred_instances_list.append(
-                    dict(
-                        frame_id=frame_idx,
-                        instances=split_instances(pred_instances)))
-
+        pred_instances_list = [] if args.save_predictions else None
+        if render_mode(args) == 'none':
+            # predictions only, no skeleton video
+            output_file = None
+
+        for frame_idx, frame_vis in enumerate(
+                predict_frames(args, read_frames(cap), detector,
+                               pose_estimator, visualizer,
+                               pred_instances_list), 1):
             # output videos
             if output_file:
-                frame_vis = visualizer.get_image()
-
                 if video_writer is None:
                     fourcc = cv2.VideoWriter_fourcc(*'avc1')
                     # the size of the image with visualization may vary
@@ -261,7 +635,10 @@ def main():
                         25,  # saved fps
                         (frame_vis.shape[1], frame_vis.shape[0]))
 
-                video_writer.write(mmcv.rgb2bgr(frame_vis))
+                video_writer.write(frame_vis)
+
+            if progress is not None:
+                progress(frame_idx)
 
             if args.show:
                 # press ESC to exit
@@ -281,14 +658,8 @@ def main():
             f'file {os.path.basename(args.input)} has invalid format.')
 
     if args.save_predictions:
-        with open(args.pred_save_path, 'w') as f:
-            json.dump(
-                dict(
-                    meta_info=pose_estimator.dataset_meta,
-                    instance_info=pred_instances_list),
-                f,
-                indent='\t')
-        print(f'predictions have been saved at {args.pred_save_path}')
+        save_predictions(args.pred_save_path, pose_estimator,
+                         pred_instances_list)
 
     if output_file:
         input_type = input_type.replace('webcam', 'video')
@@ -298,5 +669,18 @@ def main():
             level=logging.INFO)
 
 
+def main():
+    """Visualize the demo images.
+
+    Using mmdet to detect the human.
+    """
+    args = parse_args()
+    assert args.det_config is not None
+    assert args.det_checkpoint is not None
+
+    detector, pose_estimator, visualizer = init_models(args)
+    run(args, detector, pose_estimator, visualizer)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,68 @@
+# skeleton_render.py
+# 骨骼绘制与推理解耦：推理循环只产出关键点，骨骼视频由线程池并行绘制（cv2 绘图释放 GIL），
+# 按输入顺序输出。不经过 mmpose 可视化器（有状态、逐帧 RGB/BGR 往返转换、只能单线程使用）。
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def _bgr_colors(colors, count, default):
+    """数据集元信息中的 RGB 颜色表 -> BGR 元组列表；缺失或数量不符时使用默认颜色"""
+    if colors is None or len(colors) != count:
+        return [default] * count
+    return [tuple(int(c) for c in color[::-1]) for color in np.asarray(colors).reshape(count, 3)]
+
+
+class SkeletonRenderer:
+    """在 BGR 帧上绘制关键点、骨骼连线与（可选）人体框
+
+    颜色与连线取自姿态模型的 dataset_meta，与 mmpose 可视化器一致；
+    draw() 不修改输入帧，可在多个线程中同时调用。
+    """
+
+    def __init__(self, dataset_meta, kpt_thr=0.3, radius=3, thickness=1,
+                 draw_bbox=False, workers=4):
+        dataset_meta = dataset_meta or {}
+        num_keypoints = int(dataset_meta.get('num_keypoints', 17))
+        self.links = [tuple(int(i) for i in link) for link in dataset_meta.get('skeleton_links', [])]
+        self.kpt_colors = _bgr_colors(dataset_meta.get('keypoint_colors'), num_keypoints, (0, 0, 255))
+        self.link_colors = _bgr_colors(dataset_meta.get('skeleton_link_colors'), len(self.links), (0, 255, 0))
+        self.kpt_thr = kpt_thr
+        self.radius = radius
+        self.thickness = thickness
+        self.draw_bbox = draw_bbox
+        self.workers = max(int(workers), 1)
+
+    def draw(self, frame, keypoints, keypoint_scores, bboxes=None):
+        """返回绘制后的新帧；keypoints (N, K, 2)，keypoint_scores (N, K)，bboxes (N, 4)"""
+        canvas = frame.copy()
+        if self.draw_bbox and bboxes is not None:
+            for x1, y1, x2, y2 in np.asarray(bboxes, dtype=np.float32).reshape(-1, 4):
+                cv2.rectangle(canvas, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), self.thickness)
+        for kpts, scores in zip(keypoints, keypoint_scores):
+            visible = np.asarray(scores) > self.kpt_thr
+            points = np.round(np.asarray(kpts)).astype(np.int32)
+            for (i, j), color in zip(self.links, self.link_colors):
+                if i < len(points) and j < len(points) and visible[i] and visible[j]:
+                    cv2.line(canvas, tuple(points[i]), tuple(points[j]), color, self.thickness, cv2.LINE_AA)
+            for k in np.flatnonzero(visible):
+                cv2.circle(canvas, tuple(points[k]), self.radius, self.kpt_colors[k % len(self.kpt_colors)],
+                           -1, cv2.LINE_AA)
+        return canvas
+
+    def render(self, items):
+        """并行绘制 [(frame, keypoints, keypoint_scores, bboxes), ...]，按输入顺序逐帧产出
+
+        同时在途的帧数限制为 workers 的两倍，内存占用与视频长度无关。
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='skeleton-render') as pool:
+            pending = deque()
+            for item in items:
+                pending.append(pool.submit(self.draw, *item))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
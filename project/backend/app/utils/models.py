@@ -1,3 +1,4 @@
+import json
 from ..extensions import db
 from datetime import datetime
 from sqlalchemy import Column, String, Integer, ForeignKey, Date
@@ -143,4 +144,105 @@ class VideoStatus(db.Model):
         return {
             "video_id": self.video_id,
             "status": self.status
-        }
\ No newline at end of file
+        }
+
+
+class PipelineJob(db.Model):
+    """视频处理任务（持久化，记录已完成阶段以便重启后断点续跑）"""
+    __tablename__ = 'pipeline_jobs'
+
+    video_id = db.Column(String(512), ForeignKey('user_videos.video_id'), primary_key=True)
+    user_id = db.Column(Integer, ForeignKey('users.user_id'), nullable=False)
+    input_path = db.Column(String(512), nullable=False)
+    filename = db.Column(String(255), nullable=False)
+    status = db.Column(String(20), nullable=False, default='queued')  # queued / running / completed / failed
+    completed_stages = db.Column(String(255), nullable=False, default='')  # 已完成阶段，逗号分隔
+    attempts = db.Column(Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now,
+                           server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def stages(self):
+        return [s for s in (self.completed_stages or '').split(',') if s]
+
+    def has_stage(self, stage):
+        return stage in self.stages()
+
+    def mark_stage(self, stage):
+        if not self.has_stage(stage):
+            self.completed_stages = ','.join(self.stages() + [stage])
+
+    def to_dict(self):
+        return {
+            "video_id": self.video_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "completed_stages": self.stages(),
+            "attempts": self.attempts,
+            "error": self.error,
+            "updated_at": self.updated_at.strftime("%Y-%m-%d %H:%M:%S") if self.updated_at else None
+        }
+
+
+class PlayerKinematics(db.Model):
+    """逐运动员运动学摘要（每个视频每名运动员一行，按 video_id 索引；时间序列见 kinematics_<stem>.npz）"""
+    __tablename__ = 'player_kinematics'
+
+    record_id = db.Column(Integer, primary_key=True, autoincrement=True)
+    video_id = db.Column(String(512), ForeignKey('user_videos.video_id'), nullable=False, index=True)
+    player = db.Column(Integer, nullable=False)  # 运动员序号，从1开始
+    track_id = db.Column(Integer, nullable=False, default=-1)
+    frames = db.Column(Integer, nullable=False, default=0)
+    stroke_count = db.Column(Integer, nullable=False, default=0)
+    max_wrist_speed = db.Column(db.Float)
+    mean_wrist_speed = db.Column(db.Float)
+    summary = db.Column(db.Text, nullable=False)  # 完整摘要（JSON）
+
+    @classmethod
+    def from_summary(cls, video_id, summary):
+        return cls(
+            video_id=video_id,
+            player=summary['player'],
+            track_id=summary['track_id'],
+            frames=summary['frames'],
+            stroke_count=summary['stroke_count'],
+            max_wrist_speed=summary['max_wrist_speed'],
+            mean_wrist_speed=summary['mean_wrist_speed'],
+            summary=json.dumps(summary, ensure_ascii=False)
+        )
+
+    def to_dict(self):
+        return json.loads(self.summary)
+
+
+class PipelineStageMetric(db.Model):
+    """流水线阶段性能指标（按视频、阶段记录，视频删除后保留用于跨版本对比）"""
+    __tablename__ = 'pipeline_stage_metrics'
+
+    metric_id = db.Column(Integer, primary_key=True, autoincrement=True)
+    video_id = db.Column(String(512), nullable=False, index=True)
+    stage = db.Column(String(32), nullable=False)
+    success = db.Column(db.Boolean, nullable=False, default=True)
+    wall_seconds = db.Column(db.Float, nullable=False)
+    cpu_seconds = db.Column(db.Float, nullable=False)
+    peak_rss_mb = db.Column(db.Float)
+    frames = db.Column(Integer)
+    fps = db.Column(db.Float)
+    release = db.Column(String(64), nullable=False, default='dev')
+    created_at = db.Column(db.DateTime, default=datetime.now,
+                           server_default=db.func.current_timestamp())
+
+    def to_dict(self):
+        return {
+            "video_id": self.video_id,
+            "stage": self.stage,
+            "success": self.success,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_mb": self.peak_rss_mb,
+            "frames": self.frames,
+            "fps": self.fps,
+            "release": self.release,
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S") if self.created_at else None
+        }
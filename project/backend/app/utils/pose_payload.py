@@ -0,0 +1,78 @@
+# pose_payload.py
+# 骨骼数据接口的预计算响应：骨骼检测完成后把 /api/pose-data 的响应体一次性序列化并压缩保存，
+# 之后每次请求直接返回压缩文件（配合 ETag 协商缓存），不再逐次加载、转换并重新序列化。
+#
+# 文件：results_<stem>.payload.json.gz（以及安装了 brotli 时的 .br），与骨骼结果文件同目录。
+
+import gzip
+import json
+import os
+import threading
+from .mmpose.pose_store import PoseData
+
+try:
+    import brotli
+except ImportError:  # 没有 brotli 时只提供 gzip
+    brotli = None
+
+PAYLOAD_SUFFIX = '.payload.json'
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+_build_lock = threading.Lock()
+
+
+def payload_path(pose_path, encoding='gzip'):
+    """骨骼结果文件 -> 预计算响应文件路径"""
+    base = os.path.splitext(str(pose_path))[0] + PAYLOAD_SUFFIX
+    return f"{base}.br" if encoding == 'br' else f"{base}.gz"
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_pose_payload(pose_path):
+    """生成预计算响应（紧凑 JSON，gzip / brotli 压缩），返回 gzip 文件路径"""
+    body = json.dumps(
+        {"success": True, "data": PoseData.load(pose_path).to_dict()},
+        ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    _atomic_write(payload_path(pose_path), gzip.compress(body, compresslevel=6, mtime=0))
+    if brotli is not None:
+        _atomic_write(payload_path(pose_path, 'br'), brotli.compress(body, quality=9))
+    return payload_path(pose_path)
+
+
+def _fresh(path, pose_path):
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(pose_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def pose_payload(pose_path, accept_encoding=None):
+    """取得预计算响应：返回 (文件路径, 内容编码)
+
+    响应文件缺失或早于骨骼结果文件（旧视频、重新处理）时先生成；
+    accept_encoding 为请求的 Accept-Encoding（werkzeug MIMEAccept），优先 brotli，其次 gzip。
+    """
+    if not _fresh(payload_path(pose_path), pose_path):
+        with _build_lock:
+            if not _fresh(payload_path(pose_path), pose_path):
+                build_pose_payload(pose_path)
+
+    for encoding in ENCODINGS:
+        path = payload_path(pose_path, encoding)
+        if accept_encoding is not None and accept_encoding[encoding] and os.path.exists(path):
+            return path, encoding
+    return payload_path(pose_path), None
+
+
+def payload_etag(path):
+    """按返回文件的修改时间与大小生成 ETag（不同内容编码的 ETag 各不相同）"""
+    stat = os.stat(path)
+    return f"pose-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
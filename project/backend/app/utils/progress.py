@@ -0,0 +1,140 @@
+# progress.py
+# 流水线进度：各阶段的状态与已处理帧数保存在进程内，状态接口（含 SSE 推送）直接读取，
+# 不再需要客户端轮询历史记录接口。进度变化时唤醒等待中的推送连接。
+
+import threading
+import time
+
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+STATE_COMPLETED = 'completed'
+STATE_FAILED = 'failed'
+TERMINAL_STATES = (STATE_COMPLETED, STATE_FAILED)
+
+
+class ProgressTracker:
+    """进程内的任务进度
+
+    每个视频记录整体状态与各阶段 {state, frames, total}；每次变化递增 version，
+    wait() 阻塞到 version 变化或超时。帧进度按 notify_interval 节流唤醒，
+    结束超过 retention 秒的视频会被清理。
+    """
+
+    def __init__(self, notify_interval=0.5, retention=3600):
+        self.notify_interval = notify_interval
+        self.retention = retention
+        self._cond = threading.Condition()
+        self._videos = {}
+
+    def _entry(self, video_id):
+        entry = self._videos.get(video_id)
+        if entry is None:
+            entry = self._videos[video_id] = {
+                'version': 0,
+                'state': STATE_QUEUED,
+                'error': None,
+                'stages': {},
+                'updated': time.time(),
+                'notified': 0.0
+            }
+        return entry
+
+    def _changed(self, entry):
+        now = time.time()
+        entry['version'] += 1
+        entry['updated'] = entry['notified'] = now
+        self._cond.notify_all()
+
+    def _prune(self):
+        now = time.time()
+        for video_id in [video_id for video_id, entry in self._videos.items()
+                         if entry['state'] in TERMINAL_STATES and now - entry['updated'] > self.retention]:
+            del self._videos[video_id]
+
+    def set_state(self, video_id, state, error=None):
+        with self._cond:
+            self._prune()
+            entry = self._entry(video_id)
+            entry['state'] = state
+            entry['error'] = str(error)[:500] if error else None
+            if state == STATE_RUNNING:
+                entry['stages'] = {}
+            self._changed(entry)
+
+    def stage_started(self, video_id, stage, total=None):
+        with self._cond:
+            entry = self._entry(video_id)
+            entry['stages'][stage] = {'state': STATE_RUNNING, 'frames': 0, 'total': total}
+            self._changed(entry)
+
+    def advance(self, video_id, stage, frames, total=None):
+        """更新阶段已处理帧数（逐帧调用，按时间间隔节流唤醒）"""
+        with self._cond:
+            entry = self._entry(video_id)
+            info = entry['stages'].setdefault(stage, {'state': STATE_RUNNING, 'frames': 0, 'total': total})
+            info['frames'] = frames
+            if total is not None:
+                info['total'] = total
+            if time.time() - entry['notified'] >= self.notify_interval or frames == info['total']:
+                self._changed(entry)
+
+    def stage_finished(self, video_id, stage, success=True):
+        with self._cond:
+            entry = self._entry(video_id)
+            info = entry['stages'].setdefault(stage, {'frames': 0, 'total': None})
+            info['state'] = STATE_COMPLETED if success else STATE_FAILED
+            if success and info.get('total'):
+                info['frames'] = info['total']
+            self._changed(entry)
+
+    def reporter(self, video_id, stage, total=None):
+        """逐帧进度回调：callback(已处理帧数)"""
+        return lambda frames: self.advance(video_id, stage, frames, total)
+
+    def snapshot(self, video_id):
+        """返回 (version, 进度字典)；未跟踪的视频返回 (0, None)"""
+        with self._cond:
+            return self._snapshot_locked(video_id)
+
+    def _snapshot_locked(self, video_id):
+        entry = self._videos.get(video_id)
+        if entry is None:
+            return 0, None
+        stages = {}
+        for stage, info in entry['stages'].items():
+            total = info.get('total')
+            stages[stage] = {
+                **info,
+                'percent': round(100 * min(info['frames'] / total, 1), 1) if total else None
+            }
+        return entry['version'], {'state': entry['state'], 'error': entry['error'], 'stages': stages}
+
+    def wait(self, video_id, version, timeout):
+        """阻塞到进度版本号不等于 version 或超时，返回 (version, 进度字典)"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                current = self._videos.get(video_id)
+                if current is not None and current['version'] != version:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._snapshot_locked(video_id)
+
+
+def report_frames(frames, callback):
+    """迭代帧的同时回调已读取帧数；callback 为 None 时原样返回"""
+    if callback is None:
+        return frames
+
+    def generate():
+        for count, frame in enumerate(frames, 1):
+            yield frame
+            callback(count)
+
+    return generate()
+
+
+progress = ProgressTracker()
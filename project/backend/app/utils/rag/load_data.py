@@ -1,17 +1,29 @@
-import json
 import time
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
 import openai
+from ..mmpose.pose_store import PoseData
+from ..kinematics import kinematics_path_for, load_kinematics_summary
 load_dotenv("./app/routes/.env")
 qianfan_api_key = os.getenv("QIANFAN_API_KEY")
 
-def load_skeleton_keypoint(file_path="./app/utils/video/output_pose/user_3/results_20250403142257431.json"):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-    instance_info = data.get('instance_info', [])
-    meta_info = data.get('meta_info', {})
-    return instance_info, meta_info
+def load_skeleton_keypoint(file_path="./app/utils/video/output_pose/user_3/results_20250403142257431.npz"):
+    # 列式骨骼点文件（.npz）或旧版 JSON
+    pose = PoseData.load(file_path)
+    return pose.instance_info(), pose.meta_info
 
 
+def load_kinematics_prompt(pose_path):
+    """报告用的运动学统计文本（骨骼结果同目录的运动学文件，几 KB）；不存在时返回空字符串
+
+    逐次击球列表只保留次数与平均时长，控制提示词长度。
+    """
+    summaries = load_kinematics_summary(kinematics_path_for(pose_path))
+    if not summaries:
+        return ""
+    brief = [{key: value for key, value in summary.items() if key != 'strokes'} for summary in summaries]
+    return f"""
+### 以下是各运动员的运动学统计（由全部帧的骨骼点计算，角度单位为度，速度单位为像素/秒，com 为重心）：
+{brief}
+"""
@@ -0,0 +1,146 @@
+# scheduler.py
+# 视频处理调度器：所有上传共享固定数量的处理槽位（PIPELINE_SLOTS），
+# 超出槽位的任务按入队时间排队，队列满时拒绝新上传（背压），避免多个视频同时抢占 GPU。
+
+import heapq
+import itertools
+import threading
+import time
+from ..config import BaseConfig
+
+
+class QueueFull(Exception):
+    """等待队列已满"""
+
+    def __init__(self, eta):
+        super().__init__(f"处理队列已满，预计 {eta:.0f} 秒后可提交")
+        self.eta = eta
+
+
+class PipelineScheduler:
+    """限流调度器
+
+    固定数量的工作线程从按入队时间排序的堆中取任务执行，最早入队的任务优先
+    （重启后恢复的任务按原始创建时间排队，先于新上传执行）。
+    每个任务在应用上下文中运行；预计等待时间根据最近任务的平均耗时估算。
+    """
+
+    def __init__(self, config=BaseConfig):
+        self.config = config
+        self.app = None
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._queued = set()
+        self._running = {}  # video_id -> 开始时间
+        self._threads = []
+        self._avg_duration = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['pipeline_scheduler'] = self
+
+    # ================== 提交接口 ==================
+    def admit(self):
+        """预检查是否还能接收新任务，队列已满时抛出 QueueFull
+
+        只用于在保存上传文件前尽早拒绝；检查与入队不在同一次加锁内，
+        真正的容量限制由 submit(enforce_limit=True) 保证。
+        """
+        with self._cond:
+            self._check_capacity_locked()
+
+    def submit(self, video_id, fn, *args, enqueued_at=None, enforce_limit=False, **kwargs):
+        """提交任务，返回 (状态, 排队位置, 预计等待秒数)；同一视频重复提交时忽略
+
+        enforce_limit=True 时在同一次加锁内检查容量，队列已满则抛出 QueueFull 且不入队；
+        重启后恢复的任务不受队列长度限制。
+        """
+        with self._cond:
+            if video_id not in self._queued and video_id not in self._running:
+                if enforce_limit:
+                    self._check_capacity_locked()
+                heapq.heappush(self._heap, (enqueued_at or time.time(), next(self._seq),
+                                            video_id, fn, args, kwargs))
+                self._queued.add(video_id)
+                self._ensure_workers()
+                self._cond.notify()
+            return self._status_locked(video_id)
+
+    def status(self, video_id):
+        """任务在调度器中的状态：('queued', 位置, 预计等待秒数) / ('running', 0, 已运行秒数) / None"""
+        with self._cond:
+            return self._status_locked(video_id)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "slots": self.config.PIPELINE_SLOTS,
+                "running": len(self._running),
+                "queued": len(self._heap),
+                "queue_size": self.config.PIPELINE_QUEUE_SIZE,
+                "avg_duration": self._avg_duration
+            }
+
+    # ================== 内部实现 ==================
+    def _ensure_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for idx in range(len(self._threads), self.config.PIPELINE_SLOTS):
+            thread = threading.Thread(target=self._work, name=f"pipeline-slot-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, video_id, fn, args, kwargs = heapq.heappop(self._heap)
+                self._queued.discard(video_id)
+                self._running[video_id] = time.time()
+
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        fn(*args, **kwargs)
+                else:
+                    fn(*args, **kwargs)
+            except Exception as e:
+                print(f"❌ 调度任务异常 ({video_id}): {e}")
+            finally:
+                with self._cond:
+                    duration = time.time() - self._running.pop(video_id)
+                    if self._avg_duration is None:
+                        self._avg_duration = duration
+                    else:
+                        self._avg_duration = 0.7 * self._avg_duration + 0.3 * duration
+
+    def _check_capacity_locked(self):
+        if len(self._heap) >= self.config.PIPELINE_QUEUE_SIZE:
+            raise QueueFull(self._eta_locked(len(self._heap) + 1))
+
+    def _status_locked(self, video_id):
+        if video_id in self._running:
+            return 'running', 0, time.time() - self._running[video_id]
+        if video_id in self._queued:
+            order = sorted(self._heap)
+            position = next(idx for idx, item in enumerate(order, 1) if item[2] == video_id)
+            return 'queued', position, self._eta_locked(position)
+        return None
+
+    def _eta_locked(self, position):
+        """模拟槽位占用，估算排在第 position 位的任务还需等待多久开始"""
+        avg = self._avg_duration or self.config.PIPELINE_ETA_DEFAULT
+        now = time.time()
+        free_at = [max(avg - (now - started), 0.0) for started in self._running.values()]
+        free_at += [0.0] * max(self.config.PIPELINE_SLOTS - len(free_at), 0)
+        heapq.heapify(free_at)
+        start = 0.0
+        for _ in range(position):
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + avg)
+        return start
+
+
+pipeline_scheduler = PipelineScheduler()
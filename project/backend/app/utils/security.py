@@ -77,6 +77,33 @@ def generate_token(user):
     return token
 
 
+def _frame_token_key():
+    # 帧链接令牌使用单独的签名密钥，不能当作登录令牌使用
+    return f"{BaseConfig.SECRET_KEY}:frames"
+
+
+def generate_frame_token(user_id, video_id, kind):
+    """生成帧访问令牌（放在帧URL中，供 <img> 等无法携带请求头的场景使用）"""
+    payload = {
+        'user_id': user_id,
+        'video_id': video_id,
+        'kind': kind,
+        'exp': datetime.now(timezone.utc) + timedelta(seconds=BaseConfig.FRAME_URL_TTL)
+    }
+    return jwt.encode(payload=payload, key=_frame_token_key(), algorithm="HS256")
+
+
+def verify_frame_token(token, video_id, kind):
+    """校验帧访问令牌，返回用户ID；令牌无效、过期或与视频不匹配时返回 None"""
+    try:
+        payload = decode(token, _frame_token_key(), algorithms=["HS256"])
+    except (ExpiredSignatureError, InvalidTokenError):
+        return None
+    if payload.get('video_id') != video_id or payload.get('kind') != kind:
+        return None
+    return payload.get('user_id')
+
+
 def async_task(f):
     def wrapper(*args, **kwargs):
         executor.submit(f, *args, **kwargs)
@@ -1,234 +1,500 @@
 import os
-import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
 from pathlib import Path
+from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
-from ..utils.models import db, UserVideoProcess, VideoFramesProcess, VideoFramesPose, VideoStatus, History
-from .security import async_task
+from ..utils.models import (db, UserVideoProcess, VideoFramesProcess, VideoFramesPose, VideoStatus, History, PipelineJob,
+                            PlayerKinematics)
+from .worker import pipeline_worker
+from .scheduler import pipeline_scheduler
+from .metrics import stage_timer, count_video_frames, video_fps
+from .frame_archive import ARCHIVE_SUFFIX, archive_path, count_frames
+from .mmpose.pose_store import pose_data_path, find_pose_data
+from .pose_payload import build_pose_payload
+from .kinematics import kinematics_path, build_kinematics
+from .faststart import faststart_safe
+from .progress import progress
 from ..config import BaseConfig
 from ..routes.rag import auto_generate_report
 
-@async_task
-def process_video_async(input_path, filename, original_video_id, user_id):
-    """⚡ 异步处理视频的函数（使用ORM版本）"""
-    try:
-        # ================== 路径配置 ==================
-        # 配置中心化的路径常量, 创建用户专属目录结构
+# 处理阶段（按执行顺序）。每个阶段完成后与其数据库记录在同一事务中写入 PipelineJob，
+# 进程重启后从最后一个完成的阶段继续，已完成且产物仍在的阶段直接跳过。
+STAGE_DETECT = 'detect'            # 球检测 + 处理视频记录
+STAGE_FRAMES = 'frames'            # 处理视频帧提取 + 帧记录（按需抽帧时只写帧记录）
+STAGE_POSE = 'pose'                # 骨骼检测
+STAGE_ACTION = 'action'            # 动作识别（失败不影响后续阶段）
+STAGE_POSE_FRAMES = 'pose_frames'  # 骨骼帧提取 + 骨骼帧记录（按需抽帧时只写帧记录）
+STAGE_KINEMATICS = 'kinematics'    # 逐运动员运动学索引（时间序列文件 + 摘要记录）
+STAGE_REPORT = 'report'            # 分析报告
 
-        # 处理后的视频目录（保持原物理路径）
-        processed_user_dir = Path(BaseConfig.PROCESSED_FOLDER) / f"user_{user_id}"
-        processed_user_dir.mkdir(parents=True, exist_ok=True)
-        output_path = str(processed_user_dir / filename)  # 实际存储路径不变
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
 
-        # 相对路径变量（用于数据库存储）
-        processed_relative = f"user_{user_id}/{filename}"  # 格式：user_3/video.mp4
+_checkpoint_lock = threading.Lock()
 
-        # 骨骼视频目录（保持原物理路径）
-        pose_user_dir = Path(BaseConfig.POSE_FOLDER) / f"user_{user_id}"
-        pose_user_dir.mkdir(parents=True, exist_ok=True)
-        pose_video_path = str(pose_user_dir / filename)
 
-        # 最终视频目录（保持原物理路径）
-        result_user_dir = Path(BaseConfig.RESULT_FOLDER) / f"user_{user_id}"
-        result_user_dir.mkdir(parents=True, exist_ok=True)
-        result_video_path = str(result_user_dir / filename)
+def _pipeline_paths(filename, user_id):
+    """配置中心化的路径常量, 创建用户专属目录结构"""
+    stem = filename.split('.')[0]
 
-        # 帧存储目录（保持原物理路径）
-        frames_user_dir = Path(BaseConfig.FRAMES_FOLDER) / f"user_{user_id}"
+    # 处理后的视频目录 / 骨骼视频目录 / 最终视频目录 / 帧存储目录（保持原物理路径）
+    processed_user_dir = Path(BaseConfig.PROCESSED_FOLDER) / f"user_{user_id}"
+    pose_user_dir = Path(BaseConfig.POSE_FOLDER) / f"user_{user_id}"
+    result_user_dir = Path(BaseConfig.RESULT_FOLDER) / f"user_{user_id}"
+    frames_user_dir = Path(BaseConfig.FRAMES_FOLDER) / f"user_{user_id}"
+
+    paths = {
+        'processed_user_dir': processed_user_dir,
+        'output_path': str(processed_user_dir / filename),
+        'processed_relative': f"user_{user_id}/{filename}",  # 相对路径（用于数据库存储），格式：user_3/video.mp4
+        'pose_user_dir': pose_user_dir,
+        'pose_video_path': str(pose_user_dir / filename),
+        'pose_data_path': pose_data_path(pose_user_dir, os.path.splitext(os.path.basename(filename))[0]),
+        'report_path': str(pose_user_dir / f"results_{os.path.splitext(os.path.basename(filename))[0]}.md"),
+        'kinematics_path': kinematics_path(pose_user_dir, os.path.splitext(os.path.basename(filename))[0]),
+        'result_user_dir': result_user_dir,
+        'result_video_path': str(result_user_dir / filename),
+        'ball_csv_path': str(Path(BaseConfig.BALL_TRACK_FOLDER) / f"{Path(filename).stem}_ball.csv"),
+        'frame_output_dir': frames_user_dir / stem,             # 原始视频帧目录
+        'pose_frame_dir': frames_user_dir / f"{stem}_pose",     # 骨骼视频帧目录
+    }
+    dirs = ['processed_user_dir', 'pose_user_dir', 'result_user_dir']
+    if BaseConfig.FRAME_EXTRACTION == 'lazy':
+        # 按需抽帧：不预先导出帧，帧接口直接从处理视频/骨骼视频解码
+        paths['frame_output_dir'] = None
+        paths['pose_frame_dir'] = None
+    elif BaseConfig.FRAME_ARCHIVE:
+        # 帧归档模式：每个视频的帧写入单个 .frames 文件
         frames_user_dir.mkdir(parents=True, exist_ok=True)
+        paths['frame_output_dir'] = Path(archive_path(paths['frame_output_dir']))
+        paths['pose_frame_dir'] = Path(archive_path(paths['pose_frame_dir']))
+    else:
+        dirs += ['frame_output_dir', 'pose_frame_dir']
+    for key in dirs:
+        paths[key].mkdir(parents=True, exist_ok=True)
+    return paths
+
+
+def _frame_records(output, relative_dir, video_path, video_relative):
+    """各帧的相对路径（写入数据库）
+
+    按需抽帧为 <视频文件>#<序号>，帧归档为 <归档文件>#<序号>，帧目录为帧文件路径
+    """
+    if output is None:
+        return [f"{video_relative}#{idx}" for idx in range(count_video_frames(video_path) or 0)]
+    if str(output).endswith(ARCHIVE_SUFFIX):
+        return [f"{relative_dir}{ARCHIVE_SUFFIX}#{idx}" for idx in range(count_frames(output))]
+    return [f"{relative_dir}/{frame_file}" for frame_file in sorted(os.listdir(output))]
+
+
+def _stage_outputs(stage, paths):
+    """各阶段的磁盘产物；断点续跑时产物缺失的阶段需重新执行"""
+    return {
+        STAGE_DETECT: [paths['output_path'], paths['ball_csv_path']],
+        STAGE_FRAMES: [paths['frame_output_dir'] or paths['output_path']],
+        STAGE_POSE: [paths['pose_video_path'], paths['pose_data_path']],
+        STAGE_ACTION: [paths['result_video_path']],
+        STAGE_POSE_FRAMES: [paths['pose_frame_dir'] or paths['pose_video_path']],
+        STAGE_KINEMATICS: [paths['kinematics_path']],
+        STAGE_REPORT: [paths['report_path']],
+    }[stage]
+
+
+def _stage_done(job, stage, paths):
+    if not job.has_stage(stage):
+        return False
+    for output in _stage_outputs(stage, paths):
+        output = Path(output)
+        if not output.exists() or (output.is_dir() and not any(output.iterdir())):
+            return False
+    return True
+
+
+def _claim_job(video_id, user_id, input_path, filename):
+    """领取任务：attempts 作为乐观锁，多个进程同时恢复同一任务时只有一个能领取成功"""
+    job = db.session.get(PipelineJob, video_id)
+    if job is None:
+        job = PipelineJob(video_id=video_id, user_id=user_id, input_path=input_path,
+                          filename=filename, status=JOB_QUEUED, completed_stages='', attempts=0)
+        db.session.add(job)
+        db.session.commit()
+    if job.status == JOB_COMPLETED:
+        return None
+
+    attempts = job.attempts or 0
+    claimed = PipelineJob.query.filter_by(video_id=video_id, attempts=attempts).update(
+        {'status': JOB_RUNNING, 'attempts': attempts + 1, 'error': None, 'updated_at': datetime.now()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if claimed != 1:
+        return None
+    db.session.refresh(job)
+    return job
+
+
+def _finish_stage(video_id, stage):
+    """记录阶段完成，与该阶段的数据库写入一起提交
+
+    并发阶段各自在独立会话中运行，completed_stages 的读改写由 _checkpoint_lock 串行化
+    （同一任务只会被一个进程领取，进程内加锁即可）。
+    """
+    with _checkpoint_lock:
+        job = db.session.get(PipelineJob, video_id, populate_existing=True)
+        job.mark_stage(stage)
+        job.updated_at = datetime.now()
+        db.session.commit()
+    print(f"📌 阶段完成: {stage} ({video_id})")
+
+
+def _run_stage_graph(graph, finished=(), max_workers=3, video_id=None):
+    """按依赖关系并发执行各阶段
+
+    graph: {阶段名: (依赖阶段集合, 无参函数)}；finished 中的阶段视为已完成。
+    依赖全部完成的阶段立即提交到线程池，每个阶段在独立的应用上下文（独立数据库会话）中运行。
+    给定 video_id 时记录各阶段指标，阶段函数的返回值作为处理帧数。
+    某阶段失败后依赖它的阶段不再执行，其余分支照常完成，最后抛出第一个错误。
+    """
+    app = current_app._get_current_object()
+    finished = set(finished)
+    pending = {name: node for name, node in graph.items() if name not in finished}
+    running = {}
+    errors = []
+
+    def call(name, fn):
+        with app.app_context():
+            if video_id is None:
+                return fn()
+            progress.stage_started(video_id, name)
+            try:
+                with stage_timer(video_id, name) as record:
+                    record.frames = fn()
+            except Exception:
+                progress.stage_finished(video_id, name, success=False)
+                raise
+            progress.stage_finished(video_id, name)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline-stage') as pool:
+        while pending or running:
+            ready = [name for name, (deps, _) in pending.items() if deps <= finished]
+            for name in ready:
+                _, fn = pending.pop(name)
+                running[pool.submit(call, name, fn)] = name
+            if not running:
+                break  # 剩余阶段的依赖已失败
+            completed, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    finished.add(name)
+                except Exception as e:
+                    print(f"❌ 阶段失败: {name}: {e}")
+                    errors.append(e)
+
+    if pending:
+        print(f"⏭️ 因依赖失败跳过阶段: {', '.join(pending)}")
+    if errors:
+        raise errors[0]
+    return finished
+
+
+def _fail_job(video_id, error):
+    try:
+        db.session.rollback()
+        job = db.session.get(PipelineJob, video_id)
+        if job is None:
+            return
+        job.status = JOB_FAILED
+        job.error = str(error)[:2000]
+        # 重试次数用尽后历史记录标记为失败，不再自动恢复
+        if job.attempts >= BaseConfig.PIPELINE_MAX_ATTEMPTS:
+            history_entry = History.query.filter_by(video_id=video_id).first()
+            if history_entry:
+                history_entry.status = JOB_FAILED
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"❌ 任务状态更新错误: {e}")
+
+
+def process_video_async(input_path, filename, original_video_id, user_id, enqueued_at=None,
+                        enforce_limit=False):
+    """⚡ 提交视频处理任务到调度器，返回 (状态, 排队位置, 预计等待秒数)
+
+    enforce_limit=True 时队列已满抛出 QueueFull（新上传使用，恢复的任务不受限制）
+    """
+    status = pipeline_scheduler.submit(
+        original_video_id, process_video,
+        input_path, filename, original_video_id, user_id,
+        enqueued_at=enqueued_at, enforce_limit=enforce_limit
+    )
+    if status and status[0] == 'queued':
+        progress.set_state(original_video_id, JOB_QUEUED)
+    return status
+
+
+def process_video(input_path, filename, original_video_id, user_id):
+    """处理视频的函数（使用ORM版本，支持断点续跑），由调度器在处理槽位中执行
+
+    阶段依赖关系：
+        detect ─┬─ frames
+                └─ pose ─┬─ action
+                         ├─ pose_frames
+                         └─ kinematics ── report
+    互不依赖的分支并发执行，例如帧提取与骨骼检测同时进行，报告在运动学索引生成后立即开始。
+    """
+    try:
+        job = _claim_job(original_video_id, user_id, input_path, filename)
+        if job is None:
+            print(f"⏭️ 任务已完成或正在其他进程处理: {original_video_id}")
+            return
 
-        # 原始视频帧目录（保持原物理路径）
-        frame_output_dir = frames_user_dir / filename.split('.')[0]
-        frame_output_dir.mkdir(parents=True, exist_ok=True)
-
-        # 骨骼视频帧目录（保持原物理路径）
-        pose_frame_dir = frames_user_dir / f"{filename.split('.')[0]}_pose"
-        pose_frame_dir.mkdir(parents=True, exist_ok=True)
+        # ================== 路径配置 ==================
+        paths = _pipeline_paths(filename, user_id)
+        output_path = paths['output_path']
+        pose_user_dir = paths['pose_user_dir']
+        pose_video_path = paths['pose_video_path']
+        result_user_dir = paths['result_user_dir']
+        frame_output_dir = paths['frame_output_dir']
+        pose_frame_dir = paths['pose_frame_dir']
+        stem = filename.split('.')[0]
+
+        done = {stage for stage in (STAGE_DETECT, STAGE_FRAMES, STAGE_POSE, STAGE_ACTION,
+                                    STAGE_POSE_FRAMES, STAGE_KINEMATICS, STAGE_REPORT)
+                if _stage_done(job, stage, paths)}
+
+        # 进度：逐帧阶段按输入视频帧数计算百分比
+        total_frames = count_video_frames(input_path)
+        progress.set_state(original_video_id, JOB_RUNNING)
+        for stage in done:
+            progress.stage_finished(original_video_id, stage)
+
+        def reporter(stage):
+            return progress.reporter(original_video_id, stage, total_frames)
 
         # ================== 视频处理阶段 ==================
-        print(f"\n🔵 开始处理视频: {filename} (ID: {original_video_id})")
-
-        # 调用检测脚本（保持原逻辑）
-        cmd = [
-            'python', 'project/backend/app/utils/balldetect_pos_vel/ball_detect.py',
-            '--model_path', 'project/backend/app/utils/balldetect_pos_vel/ball_detect.pt',
-            '--video_path', input_path,
-            '--video_out_path', output_path
-        ]
-        print(f"⚙️ 正在运行检测脚本: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-
-        if result.returncode != 0:
-            print(f"❌ 处理失败: {result.stderr}")
-            return
-        print(f"✅ 视频处理完成: {output_path}")
+        print(f"\n🔵 开始处理视频: {filename} (ID: {original_video_id}, 第{job.attempts}次)")
+        if done:
+            print(f"♻️ 跳过已完成阶段: {', '.join(sorted(done))}")
+
+        # 共享帧流模式：视频只解码一次，各阶段产物一次性生成，后续阶段只写数据库
+        # 断点续跑时只要有一个产物阶段未完成，就整体重跑共享帧流
+        produced = set()
+        if BaseConfig.PIPELINE_SHARED_DECODE and not {STAGE_DETECT, STAGE_FRAMES, STAGE_POSE,
+                                                      STAGE_POSE_FRAMES} <= done:
+            print(f"⚙️ 共享帧流模式处理: {input_path}")
+            progress.stage_started(original_video_id, 'shared', total_frames)
+            with stage_timer(original_video_id, 'shared') as record:
+                shared_results = pipeline_worker.process_shared(
+                    input_path, output_path, frame_output_dir,
+                    pose_user_dir, pose_frame_dir, result_user_dir, filename,
+                    progress=reporter('shared')
+                )
+                record.frames = total_frames
+            progress.stage_finished(original_video_id, 'shared')
+            # 共享帧流中失败的环节不计入已产出，由对应阶段重新执行
+            produced = {stage for stage in (STAGE_DETECT, STAGE_FRAMES, STAGE_POSE, STAGE_POSE_FRAMES, STAGE_ACTION)
+                        if shared_results.get(stage)}
+
+        def detect():
+            if STAGE_DETECT not in produced:
+                # 球检测（常驻模型，进程内执行）
+                print(f"⚙️ 正在运行球检测: {input_path}")
+                pipeline_worker.detect_ball(input_path, output_path, progress=reporter(STAGE_DETECT))
+            if BaseConfig.VIDEO_FASTSTART:
+                faststart_safe(output_path)
+            print(f"✅ 视频处理完成: {output_path}")
 
-        # ================== 数据库写入阶段 ==================
-        processed_video_id = f"{original_video_id.split('_')[-1]}"
-        try:
+            # ================== 数据库写入阶段 ==================
+            processed_video_id = f"{original_video_id.split('_')[-1]}"
             print(f"📝 写入处理视频记录: {processed_video_id}")
-            # ORM对象创建
-            processed_video = UserVideoProcess(
+            db.session.merge(UserVideoProcess(
                 video_id=processed_video_id,
                 user_id=user_id,
-                video_path_process=processed_relative
-            )
-            db.session.add(processed_video)
-            db.session.commit()
-
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            print(f"❌ 数据库错误: {e}")
-
-        # ================== 帧处理阶段 ==================
-        # 帧提取（保持原逻辑）
-        frame_script = [
-            'python', 'project/backend/app/utils/balldetect_pos_vel/video2frame.py',
-            '--video_path', output_path,
-            '--output_dir', str(frame_output_dir),
-            '--frame_interval', '1'
-        ]
-        print(f"🖼️ 开始提取帧到目录: {frame_output_dir}")
-        frame_result = subprocess.run(frame_script, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-
-        if frame_result.returncode != 0:
-            print(f"❌ 帧提取失败: {frame_result.stderr}")
-            return
-        frame_files = sorted(os.listdir(frame_output_dir))
-        print(f"✅ 帧提取完成，共 {len(frame_files)} 帧")
-
-        # ================== 数据库写入阶段 ==================
-        # 批量写入帧记录（ORM优化）
-        try:
+                video_path_process=paths['processed_relative']
+            ))
+            _finish_stage(original_video_id, STAGE_DETECT)
+            return total_frames
+
+        def frames():
+            if frame_output_dir is not None and STAGE_FRAMES not in produced:
+                print(f"🖼️ 开始提取帧到: {frame_output_dir}")
+                if not pipeline_worker.extract_frames(output_path, frame_output_dir,
+                                                      progress=reporter(STAGE_FRAMES)):
+                    raise RuntimeError(f"帧提取失败: {output_path}")
+            frame_files = _frame_records(frame_output_dir, f"user_{user_id}/{stem}",
+                                         output_path, paths['processed_relative'])
+            print(f"✅ 帧提取完成，共 {len(frame_files)} 帧")
+
+            # 批量写入帧记录（重跑时先清理上次的记录）
             print(f"📋 开始写入 {len(frame_files)} 条帧记录...")
-            frames = [
+            VideoFramesProcess.query.filter_by(video_id=original_video_id).delete()
+            db.session.bulk_save_objects([
                 VideoFramesProcess(
                     frame_id=f"{original_video_id}_{idx}",
                     video_id=original_video_id,
                     frame_index=idx,
-                    frame_path_process=f"user_{user_id}/{filename.split('.')[0]}/{frame_file}"
+                    frame_path_process=frame_file
                 )
                 for idx, frame_file in enumerate(frame_files, 1)
-            ]
-            db.session.bulk_save_objects(frames)
-            db.session.commit()
-
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            print(f"❌ 帧记录错误: {e}")
-
-        # ================== 骨骼检测阶段 ==================
-        print(f"🧍 开始人体骨骼检测: {filename}")
-        pose_cmd = [
-            'python', 'project/backend/app/utils/mmpose/predict.py',
-            'project/backend/app/utils/mmpose/utils/coco_person.py',
-            'project/backend/app/utils/mmpose/utils/model1.pth',
-            'project/backend/app/utils/mmpose/utils/config.py',
-            'project/backend/app/utils/mmpose/utils/model2.pth',
-            '--input', output_path,
-            '--output-root', str(pose_user_dir),
-            '--device', 'cuda:0',
-            '--save-predictions'
-        ]
-        print(f"⚙️ 正在运行骨骼检测脚本: {' '.join(pose_cmd)}")
-        pose_result = subprocess.run(pose_cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-
-        # ================== 动作识别阶段 ==================
-        print(f"🎬 开始动作识别: {filename}")
-
-        action_cmd = [
-            'python', 'project/backend/app/utils/mmaction/actionpredict.py',
-            '--config_path', 'project/backend/app/utils/mmaction/utils/configs.py',
-            '--checkpoint_path', 'project/backend/app/utils/mmaction/utils/model.pth',
-            '--label_map', 'project/backend/app/utils/mmaction/utils/label_map.txt',
-            '--video_path', pose_video_path,
-            '--output_dir', str(result_user_dir),
-            '--filename', filename
-        ]
-        print(f"⚙️ 正在运行动作识别脚本: {' '.join(action_cmd)}")
-        action_result = subprocess.Popen(action_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = action_result.communicate()
-
-        if action_result.returncode != 0:
-            print(f"❌ 动作识别失败: {action_result.stderr}")
-        else:
-            print(f"✅ 动作识别完成")
-
-        # ================== 骨骼帧处理阶段 ==================
-        if pose_result.returncode != 0:
-            print(f"❌ 骨骼检测失败: {pose_result.stderr}")
-        elif not os.path.exists(pose_video_path):
-            print(f"❌ 骨骼视频不存在: {pose_video_path}")
-        else:
-            # 骨骼帧处理（ORM批量操作）
-            pose_frame_script = [
-                'python', 'project/backend/app/utils/mmpose/video2frame.py',
-                '--video_path', pose_video_path,
-                '--output_dir', pose_frame_dir,
-                '--frame_interval', '1'
-            ]
-            print(f"🖼️ 开始提取骨骼帧到目录: {pose_frame_dir}")
-            pose_frame_result = subprocess.run(pose_frame_script, capture_output=True, text=True, encoding='utf-8',
-                                               errors='ignore')
-
-            print(f"子进程返回码: {pose_frame_result.returncode}")
-            print(f"标准错误输出:{pose_frame_result.stderr}")
-            print(f"标准输出:{pose_frame_result.stdout}")
-
-            # ================== 数据库写入阶段 ==================
-            if pose_frame_result.returncode == 0:
-                pose_frame_files = sorted(os.listdir(pose_frame_dir))
-
-                print(f"📋 开始写入 {len(pose_frame_files)} 条骨骼帧记录...")
-                pose_frames = [
-                    VideoFramesPose(
-                        frame_id=f"{original_video_id}_{idx}",
-                        video_id=original_video_id,
-                        frame_index=idx,
-                        frame_path=f"user_{user_id}/{filename.split('.')[0]}_pose/{frame_file}"
-                    )
-                    for idx, frame_file in enumerate(pose_frame_files, 1)
-                ]
-                db.session.bulk_save_objects(pose_frames)
-                db.session.commit()
-
-        pose_user_dir = Path(BaseConfig.POSE_FOLDER) / f"user_{user_id}"
-        file_path = f'{pose_user_dir}/results_' + f'{os.path.splitext(os.path.basename(filename))[0]}.json'
-        if not os.path.exists(file_path):
-            print(f"❌ 报告文件不存在: {file_path}")
-            return
-        else:
+            ])
+            _finish_stage(original_video_id, STAGE_FRAMES)
+            return len(frame_files)
+
+        def pose():
+            print(f"🧍 开始人体骨骼检测: {filename}")
+            if STAGE_POSE not in produced:
+                pipeline_worker.estimate_pose(output_path, pose_user_dir, progress=reporter(STAGE_POSE))
+            if not os.path.exists(pose_video_path):
+                raise RuntimeError(f"骨骼视频不存在: {pose_video_path}")
+            if BaseConfig.VIDEO_FASTSTART:
+                faststart_safe(pose_video_path)
+            try:
+                # 预先生成骨骼数据接口的压缩响应（失败时接口首次访问再生成）
+                build_pose_payload(paths['pose_data_path'])
+            except Exception as e:
+                print(f"⚠️ 骨骼数据响应预生成失败: {e}")
+            _finish_stage(original_video_id, STAGE_POSE)
+            return count_video_frames(pose_video_path)
+
+        def action():
+            # 动作识别失败不影响其他阶段，也不记录完成
+            print(f"🎬 开始动作识别: {filename}")
+            if STAGE_ACTION in produced:
+                action_ok = True
+            else:
+                action_ok = pipeline_worker.recognize_action(pose_video_path, result_user_dir, filename)
+            if not action_ok:
+                print(f"❌ 动作识别失败: {pose_video_path}")
+            else:
+                print(f"✅ 动作识别完成")
+                if BaseConfig.VIDEO_FASTSTART:
+                    faststart_safe(paths['result_video_path'])
+                _finish_stage(original_video_id, STAGE_ACTION)
+            return count_video_frames(pose_video_path)
+
+        def pose_frames():
+            if pose_frame_dir is not None and STAGE_POSE_FRAMES not in produced:
+                print(f"🖼️ 开始提取骨骼帧到: {pose_frame_dir}")
+                if not pipeline_worker.extract_frames(pose_video_path, pose_frame_dir,
+                                                      progress=reporter(STAGE_POSE_FRAMES)):
+                    raise RuntimeError(f"骨骼帧提取失败: {pose_video_path}")
+            pose_frame_files = _frame_records(pose_frame_dir, f"user_{user_id}/{stem}_pose",
+                                              pose_video_path, paths['processed_relative'])
+
+            print(f"📋 开始写入 {len(pose_frame_files)} 条骨骼帧记录...")
+            VideoFramesPose.query.filter_by(video_id=original_video_id).delete()
+            db.session.bulk_save_objects([
+                VideoFramesPose(
+                    frame_id=f"{original_video_id}_{idx}",
+                    video_id=original_video_id,
+                    frame_index=idx,
+                    frame_path=frame_file
+                )
+                for idx, frame_file in enumerate(pose_frame_files, 1)
+            ])
+            _finish_stage(original_video_id, STAGE_POSE_FRAMES)
+            return len(pose_frame_files)
+
+        def kinematics():
+            # 运动学索引失败不影响报告（没有运动学文件时报告退回逐帧骨骼点分析），也不记录完成
+            print(f"📐 开始计算运动学指标: {filename}")
+            try:
+                summaries = build_kinematics(paths['pose_data_path'], paths['kinematics_path'],
+                                             video_fps(output_path), BaseConfig.KINEMATICS_PLAYERS)
+                PlayerKinematics.query.filter_by(video_id=original_video_id).delete()
+                db.session.bulk_save_objects([PlayerKinematics.from_summary(original_video_id, summary)
+                                              for summary in summaries])
+                _finish_stage(original_video_id, STAGE_KINEMATICS)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ 运动学指标计算失败: {e}")
+
+        def report():
+            file_path = paths['pose_data_path']
+            if not os.path.exists(file_path):
+                raise RuntimeError(f"报告文件不存在: {file_path}")
             print(f"📄 开始生成报告: {filename}")
             report = auto_generate_report(file_path, user_id, filename)
             print(f"✅ 报告生成完成: {report}")
+            _finish_stage(original_video_id, STAGE_REPORT)
+
+        _run_stage_graph({
+            STAGE_DETECT: (set(), detect),
+            STAGE_FRAMES: ({STAGE_DETECT}, frames),
+            STAGE_POSE: ({STAGE_DETECT}, pose),
+            STAGE_ACTION: ({STAGE_POSE}, action),
+            STAGE_POSE_FRAMES: ({STAGE_POSE}, pose_frames),
+            STAGE_KINEMATICS: ({STAGE_POSE}, kinematics),
+            STAGE_REPORT: ({STAGE_KINEMATICS}, report),
+        }, finished=done, max_workers=BaseConfig.PIPELINE_STAGE_WORKERS, video_id=original_video_id)
 
         # ================== 状态更新阶段 ==================
-        try:
-            video_status = VideoStatus.query.filter_by(video_id=original_video_id).first()
-            if video_status:
-                video_status.status = 3
-
-            history_entry = History.query.filter_by(video_id=original_video_id).first()
-            if history_entry:
-                history_entry.status = "completed"
-                db.session.commit()
-                print(f"✅ 状态更新为已完成")
-
-
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            print(f"❌ 状态更新错误: {e}")
+        video_status = VideoStatus.query.filter_by(video_id=original_video_id).first()
+        if video_status:
+            video_status.status = 3
+
+        history_entry = History.query.filter_by(video_id=original_video_id).first()
+        if history_entry:
+            history_entry.status = "completed"
+        db.session.get(PipelineJob, original_video_id, populate_existing=True).status = JOB_COMPLETED
+        db.session.commit()
+        progress.set_state(original_video_id, JOB_COMPLETED)
+        print(f"✅ 状态更新为已完成")
 
     except Exception as e:
         print(f"❌ 异步处理异常: {e}")
+        _fail_job(original_video_id, e)
+        progress.set_state(original_video_id, JOB_FAILED, error=e)
     finally:
         db.session.close()
         print(f"🏁 处理任务结束: {filename}\n")
 
+
+def resume_pipeline_jobs():
+    """恢复未完成的任务（应用启动时调用，需在应用上下文中）
+
+    排队中、执行中（进程退出时中断）以及重试次数未用尽的失败任务会重新提交，
+    各任务从最后一个完成的阶段继续。多进程部署时可设置 PIPELINE_JOB_LEASE，
+    只恢复超过该秒数未更新的执行中任务，避免抢占其他进程正在处理的任务。
+    """
+    try:
+        stale_before = datetime.now() - timedelta(seconds=BaseConfig.PIPELINE_JOB_LEASE)
+        jobs = PipelineJob.query.filter(
+            db.or_(
+                PipelineJob.status == JOB_QUEUED,
+                db.and_(PipelineJob.status == JOB_RUNNING, PipelineJob.updated_at <= stale_before),
+                db.and_(PipelineJob.status == JOB_FAILED, PipelineJob.attempts < BaseConfig.PIPELINE_MAX_ATTEMPTS)
+            )
+        ).order_by(PipelineJob.created_at).all()
+    except SQLAlchemyError as e:
+        print(f"❌ 读取待恢复任务失败: {e}")
+        return 0
+    finally:
+        db.session.close()
+
+    for job in jobs:
+        print(f"♻️ 恢复视频处理任务: {job.video_id} (已完成阶段: {job.completed_stages or '无'})")
+        process_video_async(
+            input_path=job.input_path,
+            filename=job.filename,
+            original_video_id=job.video_id,
+            user_id=job.user_id,
+            enqueued_at=job.created_at.timestamp() if job.created_at else None
+        )
+    return len(jobs)
+
 def generate_report_async(filename, user_id):
     pose_user_dir = Path(BaseConfig.POSE_FOLDER) / f"user_{user_id}"
-    file_path = f'{pose_user_dir} /results_' + f'{os.path.splitext(os.path.basename(filename))[0]}.json'
-    if not os.path.exists(file_path):
-        print(f"❌ 报告文件不存在: {file_path}")
+    file_path = find_pose_data(pose_user_dir, os.path.splitext(os.path.basename(filename))[0])
+    if file_path is None:
+        print(f"❌ 骨骼数据不存在: {pose_user_dir}/results_{Path(filename).stem}")
         return
     else:
         print(f"📄 开始生成报告: {filename}")
@@ -0,0 +1,294 @@
+# worker.py
+# 常驻推理服务：球检测、人体检测、姿态估计、动作识别模型只加载一次并保持常驻，
+# process_video_async 直接在进程内提交任务，不再为每个视频启动子进程。
+
+import threading
+from pathlib import Path
+from ..config import BaseConfig
+from .progress import report_frames
+
+
+class PipelineWorker:
+    """常驻模型服务
+
+    模型在首次使用（或启动预热）时加载，之后所有视频复用同一份模型。
+    每组模型各持一把锁，同一模型同一时刻只处理一个视频，不同模型之间互不阻塞。
+    """
+
+    def __init__(self, config=BaseConfig):
+        self.config = config
+
+        # 骨骼视频、骨骼帧与动作识别都以绘制后的骨骼视频为输入，流水线不能跳过绘制
+        self.pose_render = config.POSE_RENDER
+        if self.pose_render == 'none':
+            print("⚠️ 流水线需要骨骼视频，POSE_RENDER=none 改为 pool")
+            self.pose_render = 'pool'
+
+        self._ball_model = None
+        self._pose_models = None
+        self._action_model = None
+
+        self._ball_lock = threading.Lock()
+        self._pose_lock = threading.Lock()
+        self._action_lock = threading.Lock()
+
+    # ================== 模型加载 ==================
+    def _load_ball_model(self):
+        if self._ball_model is None:
+            from .balldetect_pos_vel.ball_detect import load_model
+            print(f"⚙️ 加载球检测模型: {self.config.BALL_MODEL_PATH}")
+            self._ball_model = load_model(self.config.BALL_MODEL_PATH, device=self.config.PIPELINE_DEVICE)
+        return self._ball_model
+
+    def _pose_args(self, input_path='', output_root=''):
+        from .mmpose.predict import parse_args
+        argv = [
+            self.config.DET_CONFIG,
+            self.config.DET_CHECKPOINT,
+            self.config.POSE_CONFIG,
+            self.config.POSE_CHECKPOINT,
+            '--input', input_path,
+            '--output-root', output_root,
+            '--device', self.config.PIPELINE_DEVICE,
+            '--batch-size', str(self.config.POSE_BATCH_SIZE),
+            '--pose-batch-size', str(self.config.POSE_CROP_BATCH_SIZE),
+            '--det-interval', str(self.config.POSE_DET_INTERVAL),
+            '--redetect-thr', str(self.config.POSE_REDETECT_THR),
+            '--max-persons', str(self.config.POSE_MAX_PERSONS),
+            '--render', self.pose_render,
+            '--render-workers', str(self.config.POSE_RENDER_WORKERS),
+            '--save-predictions'
+        ]
+        return parse_args(argv)
+
+    def _load_pose_models(self):
+        if self._pose_models is None:
+            from .mmpose.predict import init_models
+            print(f"⚙️ 加载人体检测与姿态估计模型: {self.config.POSE_CHECKPOINT}")
+            self._pose_models = init_models(self._pose_args())
+        return self._pose_models
+
+    def _load_action_model(self):
+        if self._action_model is None:
+            from .mmaction.actionpredict import init_action_model
+            print(f"⚙️ 加载动作识别模型: {self.config.ACTION_CHECKPOINT}")
+            self._action_model = init_action_model(
+                self.config.ACTION_CONFIG,
+                self.config.ACTION_CHECKPOINT,
+                device=self.config.PIPELINE_DEVICE
+            )
+        return self._action_model
+
+    def warm_up(self):
+        """预加载全部模型"""
+        try:
+            with self._ball_lock:
+                self._load_ball_model()
+            with self._pose_lock:
+                self._load_pose_models()
+            with self._action_lock:
+                self._load_action_model()
+            print("✅ 模型预热完成")
+        except Exception as e:
+            print(f"❌ 模型预热失败: {e}")
+
+    def warm_up_async(self):
+        """在后台线程预热模型，不阻塞应用启动"""
+        thread = threading.Thread(target=self.warm_up, name='pipeline-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    # ================== 任务接口 ==================
+    def detect_ball(self, video_path, video_out_path, progress=None):
+        """球检测与轨迹绘制，轨迹CSV写入 BALL_TRACK_FOLDER；progress(已处理帧数) 为可选的进度回调"""
+        from .balldetect_pos_vel.ball_detect import track_video
+        with self._ball_lock:
+            model = self._load_ball_model()
+            track_video(model, video_path, video_out_path, csv_dir=self.config.BALL_TRACK_FOLDER,
+                        batch_size=self.config.BALL_BATCH_SIZE, postprocess_mode=self.config.BALL_POSTPROCESS,
+                        progress=progress)
+
+    def detect_ball_batch(self, video_paths, output_dir):
+        """批量球检测：同一个已加载的模型依次处理多个视频，返回 {视频路径: 轨迹}"""
+        from .balldetect_pos_vel.ball_detect import track_videos
+        with self._ball_lock:
+            model = self._load_ball_model()
+            return track_videos(model, [str(path) for path in video_paths], str(output_dir),
+                                csv_dir=self.config.BALL_TRACK_FOLDER, batch_size=self.config.BALL_BATCH_SIZE,
+                                postprocess_mode=self.config.BALL_POSTPROCESS)
+
+    def extract_frames(self, video_path, output_dir, frame_interval=1, progress=None):
+        """提取视频帧，返回是否成功；output_dir 以 .frames 结尾时写入帧归档"""
+        from .frame_archive import ARCHIVE_SUFFIX, write_frame_archive
+        from .frame_stream import VideoFrameSource
+        options = dict(quality=self.config.FRAME_JPEG_QUALITY, scale=self.config.FRAME_SCALE,
+                       workers=self.config.FRAME_ENCODE_WORKERS)
+        if not str(output_dir).endswith(ARCHIVE_SUFFIX):
+            from .balldetect_pos_vel.video2frame import extract_frames
+            return extract_frames(video_path=str(video_path), output_dir=str(output_dir),
+                                  frame_interval=frame_interval, **options)
+        try:
+            frames = report_frames(VideoFrameSource(video_path), progress)
+            frame_count, saved_count = write_frame_archive(frames, output_dir, frame_interval, **options)
+            print(f"✅ 帧归档写入完成: {output_dir} ({saved_count}/{frame_count} 帧)")
+            return True
+        except Exception as e:
+            print(f"❌ 帧归档写入失败: {e}")
+            return False
+
+    @staticmethod
+    def _frame_writer(output, stem):
+        """帧流写入函数：output 以 .frames 结尾时写入帧归档，否则逐帧写JPEG文件；output 为 None（按需抽帧）时不写入"""
+        if output is None:
+            return None
+        from .frame_archive import ARCHIVE_SUFFIX, write_frame_archive
+        from .balldetect_pos_vel.video2frame import write_frames
+        options = dict(quality=BaseConfig.FRAME_JPEG_QUALITY, scale=BaseConfig.FRAME_SCALE,
+                       workers=BaseConfig.FRAME_ENCODE_WORKERS)
+        if str(output).endswith(ARCHIVE_SUFFIX):
+            return lambda frames: write_frame_archive(frames, str(output), **options)
+        return lambda frames: write_frames(frames, str(output), stem, **options)
+
+    def estimate_pose(self, video_path, output_root, progress=None):
+        """人体检测 + 骨骼点估计，输出骨骼视频与 results_<name>.npz"""
+        from .mmpose.predict import run
+        args = self._pose_args(str(video_path), str(output_root))
+        with self._pose_lock:
+            detector, pose_estimator, visualizer = self._load_pose_models()
+            run(args, detector, pose_estimator, visualizer, progress=progress)
+
+    def recognize_action(self, video_path, output_dir, filename):
+        """动作识别，返回是否成功"""
+        from .mmaction.actionpredict import recognize_video
+        with self._action_lock:
+            model = self._load_action_model()
+            return recognize_video(
+                input_video=str(video_path),
+                output_dir=str(output_dir),
+                filename=filename,
+                config_path=self.config.ACTION_CONFIG,
+                checkpoint_path=self.config.ACTION_CHECKPOINT,
+                label_map=self.config.ACTION_LABEL_MAP,
+                model=model
+            )
+
+    def process_shared(self, input_path, output_path, frame_output_dir,
+                       pose_output_root, pose_frame_dir, result_dir, filename, progress=None):
+        """共享帧流模式：上传视频只解码一次（帧输出路径以 .frames 结尾时写入帧归档，为 None 时不导出帧）
+
+        球检测输出的标注帧直接分发给处理视频写入、缩略帧写入与骨骼检测；
+        骨骼检测的可视化帧再分发给骨骼视频写入、骨骼帧写入与动作片段构建。
+        产物与分阶段模式一致，返回各阶段是否成功；progress(已解码帧数) 为可选的进度回调。
+        """
+        from .balldetect_pos_vel.ball_detect import track_frames, save_track_to_csv
+        from .mmpose.predict import predict_frames, prediction_path, save_predictions
+        from .mmaction.actionpredict import LongVideoSplitter, split_dir_of, recognize_video
+        from .frame_stream import VideoFrameSource, broadcast, write_video
+
+        stem = Path(output_path).stem
+        pose_video_path = str(Path(pose_output_root) / Path(output_path).name)
+        source = VideoFrameSource(input_path)
+        fps = int(source.fps)
+
+        splitter = LongVideoSplitter(
+            input_path=pose_video_path,
+            output_dir=split_dir_of(str(result_dir)),
+            target_frames=8,
+            stride=8,
+            resize_size=(256, 256),
+            fps=25
+        )
+
+        failures = {}
+
+        def guarded(stage, label, consumer):
+            """消费者失败只影响对应阶段：打印失败的具体环节并记录，其余消费者继续接收帧"""
+            if consumer is None:
+                return None
+
+            def run(frames_iter):
+                try:
+                    return consumer(frames_iter)
+                except Exception as e:
+                    print(f"❌ {label}失败: {e}")
+                    failures.setdefault(stage, e)
+            return run
+
+        def pose_consumer(frames_iter):
+            # 模型与 _pose_lock 已由生产者线程在 broadcast 之前获取
+            args = self._pose_args(output_path, str(pose_output_root))
+            pred_instances_list = []
+            vis_frames = predict_frames(args, frames_iter, detector, pose_estimator,
+                                        visualizer, pred_instances_list)
+            broadcast(vis_frames, [consumer for consumer in (
+                guarded('pose', '骨骼视频写入', lambda f: write_video(f, pose_video_path, 25)),
+                guarded('pose_frames', '骨骼帧写入', self._frame_writer(pose_frame_dir, stem)),
+                guarded('action', '动作片段构建', splitter.process_stream)
+            ) if consumer is not None])
+            save_predictions(prediction_path(str(pose_output_root), output_path),
+                             pose_estimator, pred_instances_list)
+
+        # 锁顺序：当前线程在调用 broadcast 之前先取 _pose_lock 再取 _ball_lock。
+        # broadcast 先启动消费者线程再拉取第一帧，若骨骼检测消费者线程自行获取 _pose_lock，
+        # 两个任务可能分别持有 _ball_lock 与 _pose_lock，各自等待对方释放，互相阻塞在帧队列上（死锁）。
+        # 其他方法同一时刻只持有其中一把锁，不会与这里形成环。
+        # _ball_lock 在最后一帧标注帧产出后立即释放，_pose_lock 在骨骼检测消费完全部帧后释放。
+        ball_locked = False
+
+        def release_ball():
+            nonlocal ball_locked
+            if ball_locked:
+                ball_locked = False
+                self._ball_lock.release()
+
+        def tracked():
+            try:
+                yield from track_frames(report_frames(source, progress), model, fps, ball_track, dists,
+                                        self.config.BALL_BATCH_SIZE, self.config.BALL_POSTPROCESS)
+            finally:
+                release_ball()
+
+        # 球检测按3帧滑动窗口流式进行，标注帧边生成边分发，内存占用与视频长度无关
+        ball_track, dists = [], []
+        with self._pose_lock:
+            self._ball_lock.acquire()
+            ball_locked = True
+            annotated = tracked()
+            try:
+                detector, pose_estimator, visualizer = self._load_pose_models()
+                model = self._load_ball_model()
+                broadcast(annotated, [consumer for consumer in (
+                    guarded('detect', '处理视频写入', lambda f: write_video(f, output_path, fps)),
+                    guarded('frames', '帧写入', self._frame_writer(frame_output_dir, stem)),
+                    guarded('pose', '骨骼检测', pose_consumer)
+                ) if consumer is not None])
+            except Exception as e:
+                # 模型加载失败或帧流本身中断时所有产物都不完整，交给分阶段模式重新执行
+                print(f"❌ 共享帧流处理失败: {e}")
+                return {'detect': False, 'frames': False, 'pose': False, 'pose_frames': False, 'action': False}
+            finally:
+                annotated.close()
+                release_ball()
+        save_track_to_csv(ball_track, dists, input_path, fps, self.config.BALL_TRACK_FOLDER)
+
+        results = {stage: stage not in failures for stage in ('detect', 'frames', 'pose', 'pose_frames')}
+        results['pose_frames'] = results['pose'] and results['pose_frames']
+        results['action'] = False
+        if not results['pose'] or 'action' in failures:
+            return results
+
+        with self._action_lock:
+            results['action'] = recognize_video(
+                input_video=pose_video_path,
+                output_dir=str(result_dir),
+                filename=filename,
+                config_path=self.config.ACTION_CONFIG,
+                checkpoint_path=self.config.ACTION_CHECKPOINT,
+                label_map=self.config.ACTION_LABEL_MAP,
+                model=self._load_action_model(),
+                splitter=splitter
+            )
+        return results
+
+
+pipeline_worker = PipelineWorker()
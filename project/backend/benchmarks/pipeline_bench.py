@@ -0,0 +1,337 @@
+# pipeline_bench.py
+# 流水线离线性能评测：在合成视频上用随机权重模型逐阶段运行（默认 CPU），
+# 输出每个阶段的帧率与峰值内存（JSON），便于在没有 GPU 与真实素材的机器上对比优化前后的性能。
+#
+# 用法（在 project/backend 目录下）：
+#   python -m benchmarks.pipeline_bench --resolutions 640x360,1280x720 --lengths 90,300 --output bench.json
+#   python -m benchmarks.pipeline_bench --stages ball,frames --baseline bench.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import torch
+
+try:
+    import psutil
+except ImportError:  # 没有 psutil 时非 Windows 系统退化为进程级峰值内存（只增不减），Windows 下不记录内存
+    psutil = None
+
+from app.config import BaseConfig
+from benchmarks.synthetic import make_clip
+
+STAGES = ('ball', 'frames', 'pose', 'action', 'api')
+
+
+def rss_source():
+    """内存数据来源：psutil（当前 RSS）/ process_peak（进程生命周期内的峰值）/ None（不记录）"""
+    if psutil is not None:
+        return 'psutil'
+    return None if sys.platform == 'win32' else 'process_peak'
+
+
+def current_rss():
+    source = rss_source()
+    if source == 'psutil':
+        return psutil.Process().memory_info().rss
+    if source == 'process_peak':
+        import resource  # 仅 Unix 可用
+        scale = 1 if sys.platform == 'darwin' else 1024  # macOS 单位为字节，Linux 为 KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return None
+
+
+class PeakRss:
+    """后台采样进程 RSS，记录代码块运行期间的峰值"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.start = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        if self.start is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(fn, *args, **kwargs):
+    """运行 fn，返回 (结果, 耗时秒, 峰值RSS, RSS增量)；无法读取内存时后两项为 None"""
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        seconds = time.perf_counter() - start
+    if rss.start is None:
+        return result, seconds, None, None
+    return result, seconds, rss.peak, rss.peak - rss.start
+
+
+# ================== 模型（随机权重） ==================
+def load_ball_model(device):
+    from app.utils.balldetect_pos_vel.utils.model import BallTrackerNet
+    torch.manual_seed(0)
+    return BallTrackerNet().to(device).eval()
+
+
+def load_pose_models(device, batch_size=BaseConfig.POSE_BATCH_SIZE):
+    """参数与 PipelineWorker._pose_args 一致（检测跳帧、人数上限、绘制方式等），只替换设备与批大小"""
+    from app.utils.mmpose.predict import parse_args, init_models
+    from app.utils.worker import pipeline_worker
+    args = parse_args([
+        BaseConfig.DET_CONFIG, '', BaseConfig.POSE_CONFIG, '',
+        '--input', '', '--output-root', '', '--device', device,
+        '--batch-size', str(batch_size),
+        '--pose-batch-size', str(BaseConfig.POSE_CROP_BATCH_SIZE),
+        '--det-interval', str(BaseConfig.POSE_DET_INTERVAL),
+        '--redetect-thr', str(BaseConfig.POSE_REDETECT_THR),
+        '--max-persons', str(BaseConfig.POSE_MAX_PERSONS),
+        '--render', pipeline_worker.pose_render,
+        '--render-workers', str(BaseConfig.POSE_RENDER_WORKERS),
+        '--save-predictions'
+    ])
+    # 不加载权重，检测器与姿态模型均为随机初始化
+    args.det_checkpoint = None
+    args.pose_checkpoint = None
+    return args, init_models(args)
+
+
+def load_action_model(device):
+    from app.utils.mmaction.actionpredict import init_action_model
+    return init_action_model(BaseConfig.ACTION_CONFIG, None, device=device)
+
+
+# ================== 各阶段 ==================
+def bench_ball(clip, workdir, model, batch_size):
+    from app.utils.balldetect_pos_vel.ball_detect import iter_video, track_frames
+    frames, fps = iter_video(clip)
+    count = 0
+    for _ in track_frames(frames, model, fps, [], [], batch_size, BaseConfig.BALL_POSTPROCESS):
+        count += 1
+    return count
+
+
+def bench_frames(clip, workdir):
+    """与流水线 frames 阶段一致：FRAME_ARCHIVE 开启时写入 .frames 归档，否则逐帧写入目录"""
+    from app.utils.frame_archive import archive_path, open_frames
+    from app.utils.worker import pipeline_worker
+    frame_dir = workdir / 'frames'
+    shutil.rmtree(frame_dir, ignore_errors=True)
+    Path(archive_path(frame_dir)).unlink(missing_ok=True)
+    output = archive_path(frame_dir) if BaseConfig.FRAME_ARCHIVE else frame_dir
+    if not pipeline_worker.extract_frames(clip, output):
+        raise RuntimeError(f"帧提取失败: {clip}")
+    with open_frames(frame_dir) as frames:
+        return len(frames)
+
+
+def bench_pose(clip, workdir, pose_models):
+    from app.utils.mmpose.predict import predict_frames, read_frames
+    args, (detector, pose_estimator, visualizer) = pose_models
+    cap = cv2.VideoCapture(str(clip))
+    try:
+        count = 0
+        for _ in predict_frames(args, read_frames(cap), detector, pose_estimator, visualizer, []):
+            count += 1
+    finally:
+        cap.release()
+    return count
+
+
+def bench_action(clip, workdir, model):
+    from app.utils.mmaction.actionpredict import recognize_video
+    output_dir = workdir / 'action'
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True)
+    if not recognize_video(str(clip), str(output_dir), Path(clip).name, BaseConfig.ACTION_CONFIG,
+                           None, BaseConfig.ACTION_LABEL_MAP, model=model):
+        raise RuntimeError(f"动作识别失败: {clip}")
+    cap = cv2.VideoCapture(str(clip))
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def bench_api(clip, workdir, fmt='json'):
+    """按帧接口的方式读取全部帧（需先运行 frames 阶段），返回 (帧数, 响应字节数, 请求数)
+
+    json：按 FRAMES_PAGE_MAX 分页，沿 next_offset 逐页请求；
+    ndjson：单次流式返回，首行为分页信息，之后每行一帧。
+    """
+    from app.routes.frames import _data_url
+    from app.utils.frame_archive import open_frames
+    with open_frames(workdir / 'frames') as frames:
+        total = len(frames)
+
+        def page(offset, stop):
+            return [_data_url(data, frames.mime(index))
+                    for index, data in enumerate(frames.iter_range(offset, stop), offset)]
+
+        if fmt == 'ndjson':
+            size = len(json.dumps({"total": total, "offset": 0, "limit": None, "count": total,
+                                   "next_offset": None})) + 1
+            for index, data in enumerate(frames.iter_range(0, total)):
+                size += len(json.dumps({"index": index, "frame": _data_url(data, frames.mime(index))})) + 1
+            return total, size, 1
+
+        size = requests = 0
+        offset = 0
+        while True:
+            stop = min(offset + BaseConfig.FRAMES_PAGE_MAX, total)
+            next_offset = stop if stop < total else None
+            body = json.dumps({"success": True, "data": {
+                "total": total, "offset": offset, "limit": BaseConfig.FRAMES_PAGE_MAX,
+                "count": stop - offset, "next_offset": next_offset, "frames": page(offset, stop)
+            }})
+            size += len(body)
+            requests += 1
+            if next_offset is None:
+                return total, size, requests
+            offset = next_offset
+
+
+# ================== 主流程 ==================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of the video pipeline on synthetic clips')
+    parser.add_argument('--resolutions', default='640x360,1280x720', help='逗号分隔的 宽x高 列表')
+    parser.add_argument('--lengths', default='90,300', help='逗号分隔的帧数列表')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--stages', default=','.join(STAGES), help=f'逗号分隔的阶段列表，可选 {",".join(STAGES)}')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--ball-batch-size', type=int, default=BaseConfig.BALL_BATCH_SIZE)
+    parser.add_argument('--pose-batch-size', type=int, default=BaseConfig.POSE_BATCH_SIZE)
+    parser.add_argument('--workdir', default=None, help='中间文件目录（默认临时目录，结束后删除）')
+    parser.add_argument('--output', default=None, help='结果 JSON 输出路径')
+    parser.add_argument('--baseline', default=None, help='对比的历史结果 JSON')
+    return parser.parse_args(argv)
+
+
+def compare(results, baseline_path):
+    """打印与历史结果的帧率对比"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['clip'], r['stage']): r for r in json.load(f)['results']}
+    print(f"\n{'clip':<18}{'stage':<8}{'fps':>10}{'baseline':>10}{'speedup':>9}")
+    for result in results:
+        old = baseline.get((result['clip'], result['stage']))
+        if old is None or not old.get('fps') or not result.get('fps'):
+            continue
+        print(f"{result['clip']:<18}{result['stage']:<8}{result['fps']:>10.1f}{old['fps']:>10.1f}"
+              f"{result['fps'] / old['fps']:>8.2f}x")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [s for s in args.stages.split(',') if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"未知阶段: {', '.join(sorted(unknown))}")
+    if 'api' in stages and 'frames' not in stages:
+        raise SystemExit("api 阶段依赖 frames 阶段的输出")
+
+    resolutions = [tuple(int(v) for v in r.split('x')) for r in args.resolutions.split(',')]
+    lengths = [int(n) for n in args.lengths.split(',')]
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='pingpong-bench-'))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+
+    def record(clip_name, stage, frames, seconds, peak, delta, **extra):
+        result = {
+            "clip": clip_name,
+            "stage": stage,
+            "frames": frames,
+            "seconds": round(seconds, 4),
+            "fps": round(frames / seconds, 2) if frames and seconds > 0 else None,
+            "peak_rss_mb": round(peak / 2 ** 20, 1) if peak is not None else None,
+            "rss_delta_mb": round(delta / 2 ** 20, 1) if delta is not None else None,
+            **extra
+        }
+        results.append(result)
+        print(f"⏱️ {clip_name:<18}{stage:<12}{result['seconds']:>9.2f}s"
+              f"{result['fps'] or 0:>9.1f} fps{result['peak_rss_mb'] or 0:>9.0f}MB", file=sys.stderr)
+
+    # 模型只加载一次（与常驻推理服务一致），加载耗时单独记录
+    models = {}
+    loaders = {'ball': load_ball_model, 'pose': load_pose_models, 'action': load_action_model}
+    for stage in stages:
+        if stage in loaders:
+            options = {'batch_size': args.pose_batch_size} if stage == 'pose' else {}
+            models[stage], seconds, peak, delta = measure(loaders[stage], args.device, **options)
+            record('-', f'{stage}_load', None, seconds, peak, delta)
+
+    try:
+        for width, height in resolutions:
+            for length in lengths:
+                clip_name = f"{width}x{height}_{length}f"
+                clip_dir = workdir / clip_name
+                clip_dir.mkdir(parents=True, exist_ok=True)
+                clip = make_clip(clip_dir / 'clip.mp4', width, height, length, args.fps)
+
+                for stage in stages:
+                    if stage == 'ball':
+                        frames, seconds, peak, delta = measure(bench_ball, clip, clip_dir, models['ball'],
+                                                               args.ball_batch_size)
+                        record(clip_name, stage, frames, seconds, peak, delta, batch_size=args.ball_batch_size)
+                    elif stage == 'frames':
+                        frames, seconds, peak, delta = measure(bench_frames, clip, clip_dir)
+                        record(clip_name, stage, frames, seconds, peak, delta)
+                    elif stage == 'pose':
+                        frames, seconds, peak, delta = measure(bench_pose, clip, clip_dir, models['pose'])
+                        record(clip_name, stage, frames, seconds, peak, delta, batch_size=args.pose_batch_size)
+                    elif stage == 'action':
+                        frames, seconds, peak, delta = measure(bench_action, clip, clip_dir, models['action'])
+                        record(clip_name, stage, frames, seconds, peak, delta)
+                    elif stage == 'api':
+                        for fmt in ('json', 'ndjson'):
+                            (frames, size, requests), seconds, peak, delta = measure(bench_api, clip, clip_dir, fmt)
+                            record(clip_name, stage if fmt == 'json' else f'{stage}_{fmt}', frames, seconds,
+                                   peak, delta, response_bytes=size, requests=requests)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "opencv": cv2.__version__,
+            "device": args.device,
+            "rss_source": rss_source(),
+            "release": BaseConfig.APP_RELEASE
+        },
+        "results": results
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# synthetic.py
+# 合成乒乓球视频：球桌、球网、沿抛物线往返弹跳的小球与两个挥拍的火柴人，
+# 用于在没有真实素材与 GPU 的环境下评测流水线各阶段的性能。
+
+import math
+import os
+import cv2
+import numpy as np
+
+
+def _stick_figure(frame, center_x, ground_y, height, phase, color, facing=1):
+    """在 frame 上绘制一个挥拍的火柴人，facing=1 面向右侧，-1 面向左侧"""
+    scale = height / 170.0
+    head_r = int(12 * scale)
+    neck = (center_x, ground_y - int(140 * scale))
+    hip = (center_x, ground_y - int(80 * scale))
+    thickness = max(int(4 * scale), 1)
+
+    cv2.circle(frame, (neck[0], neck[1] - head_r), head_r, color, thickness)
+    cv2.line(frame, neck, hip, color, thickness)
+
+    # 双腿随步伐轻微摆动
+    stride = int(18 * scale * math.sin(phase))
+    for dx in (-stride - int(15 * scale), stride + int(15 * scale)):
+        cv2.line(frame, hip, (center_x + dx, ground_y), color, thickness)
+
+    # 持拍手臂挥动，另一只手臂保持平衡
+    shoulder = (neck[0], neck[1] + int(10 * scale))
+    swing = math.pi / 4 + math.sin(phase) * math.pi / 3
+    arm = int(60 * scale)
+    hand = (shoulder[0] + facing * int(arm * math.cos(swing)), shoulder[1] - int(arm * math.sin(swing)))
+    cv2.line(frame, shoulder, hand, color, thickness)
+    cv2.circle(frame, hand, int(9 * scale), (40, 40, 200), -1)
+    cv2.line(frame, shoulder, (shoulder[0] - facing * int(45 * scale), shoulder[1] + int(35 * scale)), color, thickness)
+
+
+def render_frame(idx, width, height, fps=30, rally_frames=45):
+    """渲染第 idx 帧（BGR）"""
+    frame = np.full((height, width, 3), (70, 60, 50), dtype=np.uint8)
+
+    # 球桌与球网
+    table_top = int(height * 0.62)
+    table_left, table_right = int(width * 0.18), int(width * 0.82)
+    cv2.rectangle(frame, (table_left, table_top), (table_right, int(height * 0.70)), (90, 60, 20), -1)
+    cv2.line(frame, (table_left, table_top), (table_right, table_top), (255, 255, 255), max(height // 180, 1))
+    net_x = width // 2
+    cv2.line(frame, (net_x, table_top), (net_x, table_top - int(height * 0.05)), (230, 230, 230),
+             max(height // 120, 2))
+
+    # 球员
+    ground_y = int(height * 0.95)
+    phase = 2 * math.pi * idx / rally_frames
+    _stick_figure(frame, int(width * 0.1), ground_y, int(height * 0.55), phase, (230, 230, 230))
+    _stick_figure(frame, int(width * 0.9), ground_y, int(height * 0.55), phase + math.pi, (200, 230, 230), facing=-1)
+
+    # 小球在两名球员之间往返，每个来回在对方半台弹跳一次
+    t = (idx % rally_frames) / rally_frames
+    direction = (idx // rally_frames) % 2
+    start_x, end_x = (int(width * 0.15), int(width * 0.85))[::1 if direction == 0 else -1]
+    ball_x = int(start_x + (end_x - start_x) * t)
+    bounce = abs(math.sin(math.pi * (t * 1.5)))
+    ball_y = int(table_top - height * 0.25 * bounce) - 4
+    cv2.circle(frame, (ball_x, ball_y), max(width // 200, 3), (255, 255, 255), -1)
+
+    return frame
+
+
+def make_clip(path, width, height, num_frames, fps=30):
+    """生成合成视频，返回输出路径"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        for idx in range(num_frames):
+            writer.write(render_frame(idx, width, height, fps))
+    finally:
+        writer.release()
+    return str(path)
@@ -48,6 +48,80 @@ LOCK TABLES `history` WRITE;
 /*!40000 ALTER TABLE `history` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `pipeline_jobs`
+--
+
+DROP TABLE IF EXISTS `pipeline_jobs`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `pipeline_jobs` (
+  `video_id` varchar(512) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '视频ID,主键',
+  `user_id` int NOT NULL COMMENT '用户ID，外键',
+  `input_path` varchar(512) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '上传视频路径',
+  `filename` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '视频文件名',
+  `status` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT 'queued' COMMENT '任务状态',
+  `completed_stages` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '已完成阶段',
+  `attempts` int NOT NULL DEFAULT '0' COMMENT '执行次数',
+  `error` text CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci COMMENT '最近一次错误',
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `updated_at` datetime DEFAULT NULL COMMENT '更新时间',
+  PRIMARY KEY (`video_id`) USING BTREE,
+  KEY `fk_pipeline_jobs_user` (`user_id`) USING BTREE,
+  KEY `idx_pipeline_jobs_status` (`status`) USING BTREE,
+  CONSTRAINT `fk_pipeline_jobs_video` FOREIGN KEY (`video_id`) REFERENCES `user_videos` (`video_id`) ON DELETE CASCADE ON UPDATE RESTRICT,
+  CONSTRAINT `fk_pipeline_jobs_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`) ON DELETE CASCADE ON UPDATE RESTRICT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci ROW_FORMAT=DYNAMIC;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `pipeline_stage_metrics`
+--
+
+DROP TABLE IF EXISTS `pipeline_stage_metrics`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `pipeline_stage_metrics` (
+  `metric_id` int NOT NULL AUTO_INCREMENT COMMENT '指标ID,主键',
+  `video_id` varchar(512) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '视频ID',
+  `stage` varchar(32) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '处理阶段',
+  `success` tinyint(1) NOT NULL DEFAULT '1' COMMENT '是否成功',
+  `wall_seconds` double NOT NULL COMMENT '耗时(秒)',
+  `cpu_seconds` double NOT NULL COMMENT 'CPU时间(秒)',
+  `peak_rss_mb` double DEFAULT NULL COMMENT '峰值内存(MB)',
+  `frames` int DEFAULT NULL COMMENT '处理帧数',
+  `fps` double DEFAULT NULL COMMENT '处理帧率',
+  `release` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT 'dev' COMMENT '版本号',
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '记录时间',
+  PRIMARY KEY (`metric_id`) USING BTREE,
+  KEY `idx_pipeline_stage_metrics_video` (`video_id`) USING BTREE,
+  KEY `idx_pipeline_stage_metrics_release` (`release`,`stage`) USING BTREE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci ROW_FORMAT=DYNAMIC;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `player_kinematics`
+--
+
+DROP TABLE IF EXISTS `player_kinematics`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `player_kinematics` (
+  `record_id` int NOT NULL AUTO_INCREMENT COMMENT '记录ID,主键',
+  `video_id` varchar(512) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '视频ID，外键',
+  `player` int NOT NULL COMMENT '运动员序号(从1开始)',
+  `track_id` int NOT NULL DEFAULT '-1' COMMENT '跟踪ID',
+  `frames` int NOT NULL DEFAULT '0' COMMENT '可见帧数',
+  `stroke_count` int NOT NULL DEFAULT '0' COMMENT '击球次数',
+  `max_wrist_speed` double DEFAULT NULL COMMENT '最大手腕速度(像素/秒)',
+  `mean_wrist_speed` double DEFAULT NULL COMMENT '平均手腕速度(像素/秒)',
+  `summary` text CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '完整摘要(JSON)',
+  PRIMARY KEY (`record_id`) USING BTREE,
+  KEY `ix_player_kinematics_video_id` (`video_id`) USING BTREE,
+  CONSTRAINT `fk_player_kinematics_video` FOREIGN KEY (`video_id`) REFERENCES `user_videos` (`video_id`) ON DELETE CASCADE ON UPDATE RESTRICT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci ROW_FORMAT=DYNAMIC;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `user_videos`
 --
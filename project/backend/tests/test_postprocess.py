@@ -0,0 +1,77 @@
+# test_postprocess.py
+# 用已知位置的合成高斯光斑热图对比 centroid 与 hough 两种后处理，
+# 运行：在 project/backend 下执行 python -m pytest tests
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')  # general_back 顶层依赖 torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app', 'utils', 'balldetect_pos_vel'))
+from utils.general_back import compare_postprocess, postprocess_batch  # noqa: E402
+
+HEIGHT, WIDTH = 360, 640
+# 光斑中心（x, y），覆盖画面中部与靠近边缘的位置
+CENTERS = [(320, 180), (100.5, 60.5), (600, 300), (45, 320)]
+
+
+def gaussian_heatmap(x, y, sigma=1.5):
+    """模型输出格式的热图：argmax 类别值 0~255，光斑内为 1~128，背景为 0
+
+    sigma=1.5 时前景半径约 5 像素，落在 hough 的 minRadius~maxRadius（2~7）内。
+    """
+    cols, rows = np.meshgrid(np.arange(WIDTH), np.arange(HEIGHT))
+    blob = np.exp(-((cols - x) ** 2 + (rows - y) ** 2) / (2 * sigma ** 2))
+    return np.round(blob * 128).astype(np.int64).reshape(-1)
+
+
+@pytest.fixture
+def heatmaps():
+    maps = [gaussian_heatmap(x, y) for x, y in CENTERS]
+    maps.append(np.zeros(HEIGHT * WIDTH, dtype=np.int64))  # 空热图：未检测到
+    return np.stack(maps)
+
+
+def test_centroid_finds_known_positions(heatmaps):
+    results = postprocess_batch(heatmaps, 1, 1, mode='centroid')
+    for (x, y), (cx, cy) in zip(CENTERS, results):
+        assert cx == pytest.approx(x, abs=0.5)
+        assert cy == pytest.approx(y, abs=0.5)
+    assert results[-1] == (None, None)
+
+
+def test_centroid_applies_scale(heatmaps):
+    results = postprocess_batch(heatmaps[:1], 2.0, 3.0, mode='centroid')
+    x, y = CENTERS[0]
+    assert results[0][0] == pytest.approx(x * 2.0, abs=1.0)
+    assert results[0][1] == pytest.approx(y * 3.0, abs=1.5)
+
+
+def test_centroid_agrees_with_hough(heatmaps):
+    tolerance = 2.0
+    hough = postprocess_batch(heatmaps, 1, 1, mode='hough')
+    centroid = postprocess_batch(heatmaps, 1, 1, mode='centroid')
+    for (hx, hy), (cx, cy) in zip(hough, centroid):
+        assert (hx is None) == (cx is None)
+        if hx is not None:
+            assert np.hypot(hx - cx, hy - cy) <= tolerance
+
+    report = compare_postprocess(heatmaps, tolerance=tolerance)
+    assert report['frames'] == len(heatmaps)
+    assert report['detection_mismatch'] == 0
+    assert report['position_mismatch'] == 0
+    assert report['agreement'] == 1.0
+    assert report['max_error'] <= tolerance
+
+
+def test_hough_does_not_modify_input(heatmaps):
+    before = heatmaps.copy()
+    postprocess_batch(heatmaps, 1, 1, mode='hough')
+    np.testing.assert_array_equal(heatmaps, before)
+
+
+def test_unknown_mode(heatmaps):
+    with pytest.raises(ValueError):
+        postprocess_batch(heatmaps, 1, 1, mode='argmax')
@@ -0,0 +1,86 @@
+# test_video.py
+# 视频文件接口的 Range 分段请求（206/416）与 ETag 协商缓存（304），
+# 运行：在 project/backend 下执行 python -m pytest tests
+import pytest
+
+flask = pytest.importorskip('flask')
+# app 包导入时会加载全部路由及其依赖，依赖未装全时跳过
+video_bp = pytest.importorskip('app.routes.video').video_bp
+
+from app.config import BaseConfig  # noqa: E402
+
+CONTENT = bytes(range(256)) * 4  # 1024 字节
+FILENAME = 'output/user_1/clip.mp4'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    video = tmp_path / FILENAME
+    video.parent.mkdir(parents=True)
+    video.write_bytes(CONTENT)
+    monkeypatch.setattr(BaseConfig, 'UTILS_FOLDER', str(tmp_path))
+    monkeypatch.setattr(BaseConfig, 'VIDEO_SENDFILE', '')
+
+    app = flask.Flask(__name__)
+    app.register_blueprint(video_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def get(client, **headers):
+    return client.get(f'/api/get_video/{FILENAME}', headers=headers)
+
+
+def test_full_response(client):
+    response = get(client)
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag']
+
+
+def test_closed_range(client):
+    response = get(client, Range='bytes=100-199')
+    assert response.status_code == 206
+    assert response.data == CONTENT[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(CONTENT)}'
+    assert response.headers['Content-Length'] == '100'
+
+
+def test_open_ended_range(client):
+    response = get(client, Range='bytes=1000-')
+    assert response.status_code == 206
+    assert response.data == CONTENT[1000:]
+    assert response.headers['Content-Range'] == f'bytes 1000-{len(CONTENT) - 1}/{len(CONTENT)}'
+
+
+def test_unsatisfiable_range(client):
+    response = get(client, Range=f'bytes={len(CONTENT)}-')
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+
+def test_etag_not_modified(client):
+    etag = get(client).headers['ETag']
+    response = get(client, **{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_etag_changes_with_file(client, tmp_path):
+    etag = get(client).headers['ETag']
+    (tmp_path / FILENAME).write_bytes(CONTENT * 2)
+    response = get(client, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.data == CONTENT * 2
+
+
+def test_missing_file(client):
+    assert client.get('/api/get_video/output/user_1/missing.mp4').status_code == 404
+
+
+def test_x_accel_headers(client, monkeypatch):
+    monkeypatch.setattr(BaseConfig, 'VIDEO_SENDFILE', 'x-accel')
+    response = get(client, Range='bytes=0-99')
+    assert response.headers['X-Accel-Redirect'] == BaseConfig.VIDEO_ACCEL_PREFIX + FILENAME
+    assert response.data == b''
+    assert get(client, **{'If-None-Match': response.headers['ETag']}).status_code == 304